@@ -0,0 +1,714 @@
+import os
+import sys
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+
+from scripts import imagecache, loader, utils
+from scripts.utils import load_imgs
+from scripts.imagecache import ASSETS, surface_bytes
+from scripts.tilemap import Tilemap, PHYSICS_TILES, CHUNK_SIZE
+from scripts.mapfile import compiled_map, read_json
+from scripts.streaming import write_chunked
+
+MAPS = [3, 4, 5]
+FRAMES = 300
+TILE_SETS = ['grass', 'grass_new', 'spawners', 'dungeon', 'cave', 'sign', 'slab']
+
+class CountingSurface(pygame.Surface):
+  """
+  A surface that counts the blits made onto it, to report draw calls per frame.
+  """
+  blits_count = 0
+
+  def blit(self, *args, **kwargs):
+    self.blits_count += 1
+    return super().blit(*args, **kwargs)
+
+class BenchGame:
+  def __init__(self):
+    """
+    Stand-in for the Game object: a hidden display and the tile assets the tilemap renders with.
+    """
+    pygame.init()
+    self.screen = pygame.display.set_mode((1280, 720))
+    self.display = CountingSurface((1280, 720))
+    self.assets = {}
+    for tile_set in TILE_SETS:
+      self.assets[tile_set] = load_imgs('tiles/' + tile_set)
+    self.assets['objects'] = load_imgs('objects')
+    self.assets['boss'] = load_imgs('tiles/boss', (200, 200))
+
+def timed(func, frames=FRAMES):
+  """
+  Run func once per frame and return the mean cost of a frame in milliseconds.
+  """
+  start = time.perf_counter()
+  for frame in range(frames):
+    func(frame)
+  return (time.perf_counter() - start) * 1000 / frames
+
+def bench_tilemap(game, map_ids=MAPS):
+  """
+  Measure the per-frame cost of collision and render lookups on the given maps,
+  and the cost of finding the spawners with extract.
+
+  Collision replays what Entity.update does for every spawned entity in a frame: two
+  physics_rects_in passes and one solid_check. Render sweeps the camera across the map,
+  once to warm up any caches and once timed.
+  """
+  print('map  entities  solid tiles  merged rects  collision ms/frame  render ms/frame  blits/frame  extract ms')
+  for map_id in map_ids:
+    tilemap = Tilemap(game, size=50)
+    tilemap.load('data/maps/map' + str(map_id) + '.json')
+    spawners = [('spawners', variant) for variant in range(9)] + [('boss', 0)]
+    positions = [spawner['pos'] for spawner in tilemap.extract(spawners, keep=True)]
+
+    def collide(frame):
+      for pos in positions:
+        tilemap.physics_rects_in(pygame.Rect(pos[0] + 5, pos[1], 50, 50))
+        tilemap.physics_rects_in(pygame.Rect(pos[0], pos[1] + 1, 50, 50))
+        tilemap.solid_check((pos[0] + 25, pos[1] + 50))
+
+    xs = [tile['pos'][0] for tile in tilemap.tilemap.values()]
+    ys = [tile['pos'][1] for tile in tilemap.tilemap.values()]
+    span = (max(xs) - min(xs) + 1) * tilemap.size
+    top = min(ys) * tilemap.size
+    def render(frame):
+      offset = (min(xs) * tilemap.size + (frame * 8) % span, top + (frame * 3) % 400)
+      tilemap.render(game.display, offset=offset)
+
+    timed(render)
+    game.display.blits_count = 0
+    render_ms = timed(render)
+    blits = game.display.blits_count / FRAMES
+    solid = sum(1 for tile in tilemap.tilemap.values() if tile['type'] in PHYSICS_TILES)
+    merged = sum(len(rects) for rects in tilemap.merged.values())
+    extract_ms = timed(lambda frame: tilemap.extract(spawners, keep=True))
+    print('%3d  %8d  %11d  %12d  %18.3f  %15.3f  %11.1f  %10.4f' % (map_id, len(positions), solid, merged,
+                                                                   timed(collide), render_ms, blits, extract_ms))
+
+def bench_mapload(game, map_ids=MAPS, loads=20):
+  """
+  Compare level load time and memory of the JSON and binary map formats.
+
+  Load time is the mean of Tilemap.load. Resident memory is what the loaded
+  tilemap still holds afterwards, peak is the most allocated while loading.
+  """
+  print('map  format  file KB  load ms  resident KB  peak KB')
+  for map_id in map_ids:
+    json_path = 'data/maps/map' + str(map_id) + '.json'
+    for path in [json_path, compiled_map(json_path)]:
+      start = time.perf_counter()
+      for i in range(loads):
+        Tilemap(game, size=50).load(path)
+      load_ms = (time.perf_counter() - start) * 1000 / loads
+
+      tracemalloc.start()
+      tilemap = Tilemap(game, size=50)
+      tilemap.load(path)
+      resident, peak = tracemalloc.get_traced_memory()
+      tracemalloc.stop()
+      print('%3d  %6s  %7.1f  %7.2f  %11.1f  %7.1f' % (map_id, os.path.splitext(path)[1][1:], os.path.getsize(path) / 1024,
+                                                      load_ms, resident / 1024, peak / 1024))
+
+def bench_streaming(game, repeat=10, frames=3000):
+  """
+  Stream a map repeat x repeat times the size of map5 while the camera crosses it.
+
+  Chunks are streamed through Game.stream_level, so entities are spawned as their chunks come in
+  and parked when they are evicted. Reports the resident chunks, the entities updated each frame
+  and parked, traced memory and frame times of stream_level plus render, sampled along the way,
+  to show the tiles take flat memory and frames do not hitch, while the parked entities grow with
+  the spawners of the chunks visited. Frame times in the memory pass are slowed down by tracemalloc.
+  """
+  from game import Game
+  size, tilemap, offgrid = read_json('data/maps/map5.json')
+  width = max(loc[0] for loc in tilemap) - min(loc[0] for loc in tilemap) + 1
+  height = max(loc[1] for loc in tilemap) - min(loc[1] for loc in tilemap) + 1
+  big_tilemap = {}
+  big_offgrid = []
+  for i in range(repeat):
+    for j in range(repeat):
+      for loc in tilemap:
+        x, y = loc[0] + i * width, loc[1] + j * height
+        big_tilemap[(x, y)] = {'type': tilemap[loc]['type'], 'variant': tilemap[loc]['variant'], 'pos': [x, y]}
+      for tile in offgrid:
+        if tile['type'] != 'spawners' or tile['variant'] != 0 or i + j == 0:
+          big_offgrid.append({'type': tile['type'], 'variant': tile['variant'],
+                              'pos': [tile['pos'][0] + i * width * size, tile['pos'][1] + j * height * size]})
+
+  # A level of map5 for the assets, the player and the sounds the entities use
+  level = object.__new__(Game)
+  level.screen = game.screen
+  level.load_game()
+  level.load_level(5)
+  path = tempfile.mkdtemp()
+  try:
+    write_chunked(path, size, big_tilemap, big_offgrid, CHUNK_SIZE)
+    print('%d tiles, %d offgrid tiles, %d chunks on disk' % (len(big_tilemap), len(big_offgrid), len(os.listdir(path)) - 1))
+    del big_tilemap, big_offgrid
+
+    span = (width * repeat * size - 1280, height * repeat * size - 720)
+    print('pass    frame  resident chunks  entities  parked  traced KB  max frame ms  mean frame ms')
+    for traced in [False, True]:
+      # Frame times are taken with tracemalloc off, memory in a second pass with it on
+      if traced:
+        tracemalloc.start()
+      level.tilemap.close()
+      level.tilemap = Tilemap(level, size=size)
+      level.tilemap.load(path)
+      level.enemies = []
+      level.parked = {}
+      view = pygame.Rect(0, 0, 1280, 720)
+      # Sweep back and forth across the map at 24 px per frame while drifting up and down
+      view.topleft = (span[0], span[1])
+      level.tilemap.stream_around(view, wait=True)
+      level.spawn_entities()
+      level.tilemap.bake_view(view)
+      worst = total = 0
+      for frame in range(1, frames + 1):
+        view.x = abs((frame * 24) % (span[0] * 2) - span[0])
+        view.y = abs((frame * 6) % (span[1] * 2) - span[1])
+        start = time.perf_counter()
+        level.stream_level(view)
+        level.tilemap.render(game.display, offset=view.topleft)
+        elapsed = (time.perf_counter() - start) * 1000
+        # Idle time of a frame, when Game.run waits on the clock and the loader thread runs
+        time.sleep(0.002)
+        worst = max(worst, elapsed)
+        total += elapsed
+        if frame % (frames // 6) == 0:
+          memory = '%9.0f' % (tracemalloc.get_traced_memory()[0] / 1024) if traced else '        -'
+          parked = sum(len(entities) for entities in level.parked.values())
+          print('%-6s  %5d  %15d  %8d  %6d  %s  %12.2f  %13.2f' % ('memory' if traced else 'timing', frame,
+                                                                 len(level.tilemap.loaded), len(level.enemies), parked,
+                                                                 memory, worst, total / (frames // 6)))
+          worst = total = 0
+      if traced:
+        tracemalloc.stop()
+  finally:
+    level.tilemap.close()
+    shutil.rmtree(path)
+
+def bench_arraymap(game, map_ids=MAPS, queries=1000):
+  """
+  Compare the region queries of ArrayTilemap with its arrays and held sparse,
+  where they fall back to looking up the tile dicts cell by cell.
+
+  Solid and visible cells are queried over a camera view, column heights over the whole map.
+  Needs NumPy.
+  """
+  try:
+    from scripts.tilemap_np import ArrayTilemap
+  except ImportError:
+    print('NumPy is not installed, skipping')
+    return
+  print('map  backend  grid cells  solid cells us  visible cells us  column heights us')
+  for map_id in map_ids:
+    for name, sparse_ratio in [('arrays', 16), ('sparse', 0)]:
+      tilemap = ArrayTilemap(game, size=50, sparse_ratio=sparse_ratio)
+      tilemap.load('data/maps/map' + str(map_id) + '.json')
+      xs = [loc[0] for loc in tilemap.tilemap]
+      ys = [loc[1] for loc in tilemap.tilemap]
+      view = pygame.Rect(min(xs) * tilemap.size, min(ys) * tilemap.size, 1280, 720)
+      def cycle(frame):
+        view.x = min(xs) * tilemap.size + (frame * 8) % ((max(xs) - min(xs) + 1) * tilemap.size)
+      solid_us = timed(lambda frame: (cycle(frame), tilemap.solid_cells_in(view)), queries) * 1000
+      visible_us = timed(lambda frame: (cycle(frame), tilemap.visible_cells(view)), queries) * 1000
+      heights_us = timed(lambda frame: tilemap.column_heights(min(xs), max(xs) + 1), queries) * 1000
+      cells = 0 if tilemap.types is None else tilemap.types.size
+      print('%3d  %7s  %10d  %14.1f  %16.1f  %17.1f' % (map_id, name, cells, solid_us, visible_us, heights_us))
+
+def bench_assets(game, map_ids=MAPS):
+  """
+  Time level loads through Game.load_level: the first one decodes every image from disk,
+  the ones after it, including loading the same level again as RETRY does, reuse the asset cache.
+  """
+  from game import Game
+  level = object.__new__(Game)
+  level.screen = game.screen
+  level.load_game()
+  ASSETS.clear()
+  imagecache.SPRITES = imagecache.SpriteCache(None)
+  print('load  map  load ms  hits  misses  images  cache KB')
+  for i, map_id in enumerate([map_ids[0]] + list(map_ids)):
+    start = time.perf_counter()
+    level.load_level(map_id)
+    load_ms = (time.perf_counter() - start) * 1000
+    stats = ASSETS.stats()
+    print('%4d  %3d  %7.1f  %4d  %6d  %6d  %8.0f' % (i + 1, map_id, load_ms, stats['hits'], stats['misses'],
+                                                   stats['images'], stats['bytes'] / 1024))
+  imagecache.SPRITES = imagecache.SpriteCache()
+  level.tilemap.close()
+
+def bench_manifest(game, map_ids=MAPS, repeat=5):
+  """
+  Compare loading every level asset, as load_level used to, with loading only the assets
+  in the manifest of each map. Loads are cold (asset cache cleared, sprite cache off).
+  """
+  from game import Game
+  from scripts.assets import load_assets, level_manifest, LevelAssets, LEVEL_IMAGES, LEVEL_ANIMATIONS
+  level = object.__new__(Game)
+  level.screen = game.screen
+  level.load_game()
+  imagecache.SPRITES = imagecache.SpriteCache(None)
+
+  def cold(load):
+    total = 0
+    for i in range(repeat):
+      ASSETS.clear()
+      start = time.perf_counter()
+      load()
+      total += time.perf_counter() - start
+    return total * 1000 / repeat, ASSETS.bytes / 1024
+
+  print('map  all keys  all ms  all KB  manifest keys  manifest ms  manifest KB')
+  for map_id in map_ids:
+    level.load_level(map_id)
+    keys = level_manifest(level.tilemap, level.background)
+    all_ms, all_kb = cold(lambda: load_assets(LEVEL_IMAGES, LEVEL_ANIMATIONS))
+    manifest_ms, manifest_kb = cold(lambda: LevelAssets(LEVEL_IMAGES, LEVEL_ANIMATIONS).load(keys))
+    print('%3d  %8d  %6.1f  %6.0f  %13d  %11.1f  %11.0f' % (map_id, len(LEVEL_IMAGES) + len(LEVEL_ANIMATIONS), all_ms, all_kb,
+                                                          len(keys), manifest_ms, manifest_kb))
+  imagecache.SPRITES = imagecache.SpriteCache()
+  ASSETS.clear()
+  level.tilemap.close()
+
+class DirectSounds:
+  """
+  Plays every request straight through Sound.play, as the game did before VoiceManager,
+  counting the requests and the ones lost because no mixer channel was free.
+  """
+  def __init__(self, sounds):
+    self.sounds = sounds
+    self.requests = 0
+    self.lost = 0
+
+  def __getitem__(self, name):
+    return self.sounds[name]
+
+  def listen(self, pos):
+    pass
+
+  def play(self, name, pos=None, loops=0):
+    self.requests += 1
+    channel = self.sounds[name].play(loops)
+    if channel is None:
+      self.lost += 1
+    return channel
+
+def bench_voices(game, map_id=5, frames=180):
+  """
+  Run a level at FPS frames per second with the player running right and jumping, playing its
+  sounds straight through Sound.play and through VoiceManager. Reports the play requests,
+  the sounds started, the requests lost for want of a free channel and the busiest frame.
+  """
+  from game import Game, FPS
+  from scripts.audio import VoiceManager
+  level = object.__new__(Game)
+  level.screen = game.screen
+  level.load_game()
+  print('sounds   requests  started  lost  dropped (voices/cooldown/distance)  most channels busy')
+  for name in ['direct', 'managed']:
+    pygame.mixer.stop()
+    level.load_level(map_id)
+    sounds = level.sfx.sounds
+    level.sfx = DirectSounds(sounds) if name == 'direct' else VoiceManager(sounds)
+    clock = pygame.time.Clock()
+    busy = 0
+    for frame in range(frames):
+      offset = (level.player.pos[0] - 640, level.player.pos[1] - 360)
+      level.sfx.listen((offset[0] + 640, offset[1] + 360))
+      for enemy in level.enemies.copy():
+        enemy.update(level.tilemap, (0, 0))
+      level.player.update(level.tilemap, (1, 0))
+      if frame % 40 == 0:
+        level.player.jump()
+      busy = max(busy, sum(pygame.mixer.Channel(i).get_busy() for i in range(pygame.mixer.get_num_channels())))
+      clock.tick(FPS)
+    if name == 'direct':
+      print('%-7s  %8d  %7d  %4d  %33s  %18d' % (name, level.sfx.requests, level.sfx.requests - level.sfx.lost,
+                                                 level.sfx.lost, '-', busy))
+    else:
+      stats = level.sfx.stats()
+      requests = stats['played'] + stats['voices'] + stats['cooldown'] + stats['distance'] + stats['channels']
+      dropped = '%d/%d/%d' % (stats['voices'], stats['cooldown'], stats['distance'])
+      print('%-7s  %8d  %7d  %4d  %33s  %18d' % (name, requests, stats['played'], stats['channels'], dropped, busy))
+  pygame.mixer.stop()
+  level.tilemap.close()
+
+def bench_soundbank(game, loads=10):
+  """
+  Time getting the sound effects of a level ready, reading every file again as load_level
+  used to, and through the process-wide SoundBank.
+  """
+  from scripts.audio import SoundBank, SOUNDS, SFX_PATH
+
+  def reread():
+    for name in SOUNDS:
+      pygame.mixer.Sound(SFX_PATH + SOUNDS[name][0]).set_volume(SOUNDS[name][1])
+
+  bank = SoundBank()
+  print('sounds     first ms  again ms  files read')
+  start = time.perf_counter()
+  reread()
+  first_ms = (time.perf_counter() - start) * 1000
+  again_ms = timed(lambda frame: reread(), loads)
+  print('%-9s  %8.2f  %8.2f  %10d' % ('reread', first_ms, again_ms, len(SOUNDS) * (loads + 1)))
+  start = time.perf_counter()
+  bank.load()
+  first_ms = (time.perf_counter() - start) * 1000
+  again_ms = timed(lambda frame: bank.load(), loads)
+  print('%-9s  %8.2f  %8.2f  %10d' % ('soundbank', first_ms, again_ms, bank.reads))
+
+def bench_text(game, frames=FRAMES):
+  """
+  Time drawing a frame of the HUD and the buttons of the pause menu, opening the font and
+  rendering every string each frame as they used to (a TextCache that keeps nothing), and
+  through the TEXT cache.
+  """
+  import game as game_module
+  from scripts import UI
+  level = object.__new__(game_module.Game)
+  level.screen = game.screen
+  level.load_game()
+  level.load_level(MAPS[0])
+  menu_surf = pygame.Surface((320, 460))
+  labels = ['RESUME', 'RETRY', 'MAIN MENU', 'QUIT']
+
+  def draw(frame):
+    level.coin = frame // 10
+    level.draw_hub()
+    UI.Menu(menu_surf, (0, 0), (320, 460), labels).draw()
+    level.display.blit(UI.TEXT.render('PAUSE', 64, 'white'), (0, 0))
+
+  print('text     hud + pause ms/frame  fonts opened  strings rendered')
+  shared = UI.TEXT
+  for name, text in [('uncached', UI.TextCache(font_limit=0, text_limit=0)), ('cached', UI.TextCache())]:
+    game_module.TEXT = UI.TEXT = text
+    print('%-8s  %20.3f  %12d  %16d' % (name, timed(draw, frames), text.opened, text.misses))
+  game_module.TEXT = UI.TEXT = shared
+  level.tilemap.close()
+
+def profiled_ms(node, name):
+  """
+  Sum the milliseconds of every section with the given name in a profiler tree.
+  """
+  ms = node['ms'] if node['name'] == name else 0
+  return ms + sum(profiled_ms(child, name) for child in node['children'])
+
+def bench_loading(game, map_ids=(1, 2, 3, 4, 5)):
+  """
+  Time loading each map through Game.load_level as profiled by PROFILER: cold as in a new
+  process without the sprite cache, as in a new process with the sprite cache filled on disk,
+  and warm, loading the same map again. The cold load is split into its main sections.
+  """
+  from game import Game
+  from scripts.audio import SOUND_BANK
+  from scripts.profiler import PROFILER
+  level = object.__new__(Game)
+  level.screen = game.screen
+  level.load_game()
+  path = tempfile.mkdtemp()
+  print('map  cold ms  (sounds    map  decode  convert)  sprite cache ms  warm ms')
+  try:
+    for map_id in map_ids:
+      loads = []
+      for cache_path in [None, path, path]:
+        if cache_path is None or len(loads) == 1:
+          ASSETS.clear()
+          SOUND_BANK.sounds.clear()
+          imagecache.SPRITES = imagecache.SpriteCache(cache_path)
+        if len(loads) == 1:
+          # Fill the sprite cache, then load again as a new process would
+          level.load_level(map_id)
+          ASSETS.clear()
+          SOUND_BANK.sounds.clear()
+          imagecache.SPRITES = imagecache.SpriteCache(cache_path)
+        PROFILER.clear()
+        level.load_level(map_id)
+        loads.append(PROFILER.root['children'][-1])
+      cold = loads[0]
+      print('%3d  %7.1f  (%6.1f  %5.1f  %6.1f  %7.1f)  %15.1f  %7.1f' % (
+        map_id, cold['ms'], profiled_ms(cold, 'sounds'), profiled_ms(cold, 'map'), profiled_ms(cold, 'decode'),
+        profiled_ms(cold, 'convert and scale'), loads[1]['ms'], loads[2]['ms']))
+  finally:
+    imagecache.SPRITES.close()
+    imagecache.SPRITES = imagecache.SpriteCache()
+    ASSETS.clear()
+    shutil.rmtree(path)
+    level.tilemap.close()
+
+def bench_atlas(game, blits=50):
+  """
+  Compare loading the level and menu images from their own files and from atlas sheets
+  built by scripts/atlas.py into a temporary directory.
+
+  Reports the files read, the cold load time, the pixel memory held (sheets count whole)
+  and the cost of drawing every loaded image once.
+  """
+  from scripts.atlas import build
+  from scripts.assets import load_assets, LEVEL_IMAGES, LEVEL_ANIMATIONS, MENU_IMAGES
+  path = tempfile.mkdtemp()
+  imagecache.SPRITES = imagecache.SpriteCache(None)
+  try:
+    build(path)
+    print('images  files  load ms  pixels KB  draw all ms')
+    for name, atlas_path in [('files', os.path.join(path, 'none')), ('atlas', path)]:
+      ASSETS.clear()
+      imagecache.ATLAS = imagecache.Atlas(atlas_path)
+      start = time.perf_counter()
+      assets = load_assets(LEVEL_IMAGES, LEVEL_ANIMATIONS)
+      assets.update(load_assets(MENU_IMAGES))
+      load_ms = (time.perf_counter() - start) * 1000
+      files = len(imagecache.ATLAS.surfaces) + ASSETS.misses - imagecache.ATLAS.served
+      pixels = sum(surface_bytes(sheet) for sheet in imagecache.ATLAS.surfaces.values())
+      pixels += sum(surface_bytes(img) for img in ASSETS.images.values() if img.get_parent() is None)
+      imgs = [img for img in ASSETS.images.values() if img.get_width() <= 256]
+      def draw(frame):
+        for img in imgs:
+          game.display.blit(img, (frame % 100, 0))
+      print('%6s  %5d  %7.1f  %9.0f  %11.3f' % (name, files, load_ms, pixels / 1024, timed(draw, blits)))
+  finally:
+    imagecache.ATLAS = imagecache.Atlas()
+    imagecache.SPRITES = imagecache.SpriteCache()
+    ASSETS.clear()
+    shutil.rmtree(path)
+
+def bench_decode(game, repeat=5):
+  """
+  Time a cold load of the level images: one after another on the main thread as load_img
+  does, then through load_many with different numbers of loader threads.
+  """
+  from scripts.assets import load_assets, LEVEL_IMAGES, LEVEL_ANIMATIONS
+  from scripts.utils import load_img, img_paths
+  imgs = []
+  for path, size in list(LEVEL_IMAGES.values()) + [spec[:2] for spec in LEVEL_ANIMATIONS.values()]:
+    imgs += [(path, size)] if path.endswith('.png') else [(img_path, size) for img_path in img_paths(path)]
+  imagecache.ATLAS = imagecache.Atlas(os.path.join(tempfile.gettempdir(), 'no-atlas'))
+  imagecache.SPRITES = imagecache.SpriteCache(None)
+
+  def cold(load):
+    total = 0
+    for i in range(repeat):
+      ASSETS.clear()
+      start = time.perf_counter()
+      load()
+      total += time.perf_counter() - start
+    return total * 1000 / repeat
+
+  print('%d cores, %d images' % (os.cpu_count() or 1, len(imgs)))
+  print('loader           cold load ms')
+  print('main thread      %12.1f' % cold(lambda: [load_img(path, size) for path, size in imgs]))
+  for threads in sorted({1, 2, 4, os.cpu_count() or 1}):
+    if loader.LOADER is not None:
+      loader.LOADER.shutdown()
+    loader.LOADER, loader.LOADER_THREADS = None, threads
+    print('%-2d threads       %12.1f' % (threads, cold(lambda: load_assets(LEVEL_IMAGES, LEVEL_ANIMATIONS))))
+  imagecache.ATLAS = imagecache.Atlas()
+  imagecache.SPRITES = imagecache.SpriteCache()
+  ASSETS.clear()
+
+def bench_spritecache(game, repeat=5):
+  """
+  Time loading the menu and level images without the sprite cache, into an empty cache
+  (decoding them and writing the pack), from the cache as the next run would, and after
+  one image file changed. Uses a cache in a temporary directory and no atlas.
+  """
+  from scripts.assets import load_assets, LEVEL_IMAGES, LEVEL_ANIMATIONS, MENU_IMAGES
+  path = tempfile.mkdtemp()
+  imagecache.ATLAS = imagecache.Atlas(os.path.join(path, 'no-atlas'))
+  touched = imagecache.BASE_IMG_PATH + utils.img_paths('entities/hero/hero_idle')[0]
+
+  def load(cache_path, fresh=False, touch=False):
+    total = 0
+    for i in range(repeat):
+      if fresh:
+        imagecache.SpriteCache(cache_path).clear()
+      if touch:
+        os.utime(touched)
+      ASSETS.clear()
+      imagecache.SPRITES = imagecache.SpriteCache(cache_path)
+      start = time.perf_counter()
+      load_assets(MENU_IMAGES)
+      load_assets(LEVEL_IMAGES, LEVEL_ANIMATIONS)
+      total += time.perf_counter() - start
+    return total * 1000 / repeat
+
+  try:
+    print('cache    load ms  decoded  from cache  pack KB')
+    for name, cache_path, fresh, touch in [('none', None, False, False), ('empty', path, True, False),
+                                           ('warm', path, False, False), ('touched', path, False, True)]:
+      load_ms = load(cache_path, fresh, touch)
+      pack_kb = imagecache.SPRITES.size / 1024
+      print('%-7s  %7.1f  %7d  %10d  %7.0f' % (name, load_ms, ASSETS.misses - imagecache.SPRITES.served,
+                                               imagecache.SPRITES.served, pack_kb))
+  finally:
+    imagecache.SPRITES.close()
+    imagecache.ATLAS = imagecache.Atlas()
+    imagecache.SPRITES = imagecache.SpriteCache()
+    ASSETS.clear()
+    shutil.rmtree(path)
+
+def bench_sprites(game, map_ids=MAPS):
+  """
+  Time drawing every entity of a level each frame, half of them facing left, mirroring
+  the frame with pygame.transform.flip on every draw as Entity.render used to, and
+  through the mirrored frames Animation.img keeps.
+  """
+  from game import Game
+  level = object.__new__(Game)
+  level.screen = game.screen
+  level.load_game()
+  print('map  entities  flip every draw ms/frame  kept mirrored ms/frame')
+  for map_id in map_ids:
+    level.load_level(map_id)
+    entities = level.enemies + [level.player]
+    for i in range(len(entities)):
+      entities[i].flip = i % 2 == 1
+
+    def flip_each(frame):
+      for entity in entities:
+        entity.animation.update()
+        game.display.blit(pygame.transform.flip(entity.animation.img(), entity.flip, False), entity.pos)
+
+    def kept(frame):
+      for entity in entities:
+        entity.animation.update()
+        game.display.blit(entity.animation.img(entity.flip), entity.pos)
+
+    print('%3d  %8d  %24.3f  %22.3f' % (map_id, len(entities), timed(flip_each), timed(kept)))
+  level.tilemap.close()
+
+def bench_dirty(game, map_ids=MAPS, frames=FRAMES):
+  """
+  Time updating, drawing and presenting frames of a level through Game.frame, presenting
+  every frame whole and through the dirty rects of a DirtyRenderer, with the player standing
+  still and running. Presenting on the dummy video driver costs less than on a real window,
+  the pixels presented per frame tell the rest.
+  """
+  from game import Game
+  from scripts.render import DirtyRenderer
+  level = object.__new__(Game)
+  level.screen = game.screen
+  level.load_game()
+  print('map  player    full ms/frame  dirty ms/frame  full px/frame  dirty px/frame')
+  for map_id in map_ids:
+    for name, movement in [('still', [False, False]), ('running', [False, True])]:
+      results = []
+      for enabled in [False, True]:
+        level.load_level(map_id)
+        level.movement = list(movement)
+        renderer = DirtyRenderer(level.screen, level.display, enabled)
+
+        def draw(frame):
+          level.frame(renderer)
+          renderer.present()
+
+        results.append((timed(draw, frames), renderer.presented / frames))
+      print('%3d  %-7s  %14.3f  %14.3f  %13d  %14d' % (
+        map_id, name, results[0][0], results[1][0], results[0][1], results[1][1]))
+  level.tilemap.close()
+
+def bench_menus(game, frames=FRAMES):
+  """
+  Time a frame of the pause menu and of the main menu, drawn whole every frame as they used to
+  (the world darkened again and every menu made again), and kept across frames, drawing only
+  what changed. The mouse moves over a button every 10 frames.
+  """
+  from scripts.UI import UI
+  labels = ['RESUME', 'RETRY', 'MAIN MENU', 'QUIT']
+  get_pos = pygame.mouse.get_pos
+  print('menu   mode      ms/frame  px/frame')
+  try:
+    for menu in ['pause', 'main']:
+      for name, whole in [('whole', True), ('retained', False)]:
+        ui = UI(game.screen if menu == 'pause' else game.display)
+        ui.freeze(game.display)
+        presented = [0]
+
+        def draw(frame):
+          pygame.mouse.get_pos = lambda: (640, 300) if frame // 10 % 2 else (0, 0)
+          if whole:
+            ui.thaw()
+            ui.menus.clear()
+            ui.freeze(game.display)
+          if menu == 'pause':
+            ui.pause((320, 460), labels)
+          else:
+            ui.main_menu(labels)
+          pygame.display.update(ui.drawn)
+          presented[0] += sum(rect.width * rect.height for rect in ui.drawn)
+
+        print('%-5s  %-8s  %8.3f  %8d' % (menu, name, timed(draw, frames), presented[0] / frames))
+  finally:
+    pygame.mouse.get_pos = get_pos
+
+def bench_activation(game, map_ids=(1, 3, 4, 5), frames=FRAMES):
+  """
+  Time updating and drawing frames of a level through Game.frame with the player running,
+  updating and drawing every entity every frame, as levels used to, and through the default
+  ActivationRegions. Also counts the entity updates and draws per frame.
+  """
+  import random
+  from game import Game
+  from scripts.activation import ActivationRegions
+  from scripts.render import DirtyRenderer
+  level = object.__new__(Game)
+  level.screen = game.screen
+  level.load_game()
+  everywhere = 10 ** 6
+  print('map  entities  all ms/frame  updates  draws  regions ms/frame  updates  draws')
+  for map_id in map_ids:
+    results = []
+    for activation in [ActivationRegions(everywhere, everywhere, 1, everywhere), ActivationRegions()]:
+      random.seed(1)
+      level.load_level(map_id)
+      level.activation = activation
+      level.movement = [False, True]
+      entities = len(level.enemies)
+      renderer = DirtyRenderer(level.screen, level.display, False)
+
+      def draw(frame):
+        level.frame(renderer)
+        renderer.present()
+
+      ms = timed(draw, frames)
+      counts = activation.counts
+      results.append((ms, (counts['active'] + counts['idle']) / frames, counts['rendered'] / frames))
+    print('%3d  %8d  %12.3f  %7.1f  %5.1f  %16.3f  %7.1f  %5.1f' % ((map_id, entities) + results[0] + results[1]))
+  level.tilemap.close()
+
+BENCHMARKS = {
+  'tilemap': bench_tilemap,
+  'mapload': bench_mapload,
+  'streaming': bench_streaming,
+  'arraymap': bench_arraymap,
+  'assets': bench_assets,
+  'manifest': bench_manifest,
+  'atlas': bench_atlas,
+  'decode': bench_decode,
+  'spritecache': bench_spritecache,
+  'sprites': bench_sprites,
+  'voices': bench_voices,
+  'soundbank': bench_soundbank,
+  'text': bench_text,
+  'loading': bench_loading,
+  'dirty': bench_dirty,
+  'menus': bench_menus,
+  'activation': bench_activation,
+}
+
+if __name__ == '__main__':
+  names = sys.argv[1:] or list(BENCHMARKS)
+  game = BenchGame()
+  for name in names:
+    print('== ' + name)
+    BENCHMARKS[name](game)
@@ -1,7 +1,8 @@
 import sys
 import pygame
-from scripts.utils import load_imgs
+from scripts.assets import load_assets, EDITOR_IMAGES
 from scripts.tilemap import Tilemap
+from scripts.autosave import AutoSaver
 class Editor:
   def __init__(self):
     """
@@ -24,6 +25,7 @@ class Editor:
     right_clicking: A boolean indicating whether the right mouse button is clicked.
     ongrid: A boolean indicating whether the tiles are placed on a grid.
     map: The current map ID.
+    saver: The AutoSaver writing the map in the background after edits.
 
     Methods:
     ----------
@@ -36,17 +38,7 @@ class Editor:
     self.display = pygame.Surface((1280, 720))
 
     self.clock = pygame.time.Clock()
-    self.assets = {
-      'grass': load_imgs('tiles/grass'),
-      'cave': load_imgs('tiles/cave'),
-      'dungeon': load_imgs('tiles/dungeon'),
-      'sign': load_imgs('tiles/sign'),
-      'slab': load_imgs('tiles/slab'),
-      'objects': load_imgs('objects'),
-      'grass_new': load_imgs('tiles/grass_new'),
-      'spawners': load_imgs('tiles/spawners'),   
-      'boss': load_imgs('tiles/boss', (200,200)), 
-    }
+    self.assets = load_assets(EDITOR_IMAGES)
     self.movement = [False, False, False, False]
     self.tilemap = Tilemap(self, size=50)
     self.scroll = [0,0]
@@ -60,6 +52,7 @@ class Editor:
     self.ongrid = True
     self.map = '1'
     self.load_level(self.map) # replce 0 to n map
+    self.saver = AutoSaver(self.tilemap, f'data/maps/map{self.map}.json')
 
   def load_level(self, map_id):
     """
@@ -80,14 +73,15 @@ class Editor:
     Run the editor.
     """
     while True:
-      self.tilemap.save(f'data/maps/map{self.map}.json')
+      self.saver.update()
       self.display.fill('black')
       self.scroll = (self.scroll[0] + (self.movement[1] - self.movement[0]), self.scroll[1] + (self.movement[3]-self.movement[2]))
       render_scroll = (int(self.scroll[0]*50), int(self.scroll[1])*50)
 
       self.tilemap.render(self.display, offset=render_scroll)
 
-      current_tile_img = self.assets[self.tile_list[self.tile_group]][self.tile_variant]
+      # Copy so the translucent preview does not leak into the baked chunks
+      current_tile_img = self.assets[self.tile_list[self.tile_group]][self.tile_variant].copy()
       current_tile_img.set_alpha(100)
       mpos = pygame.mouse.get_pos()
       tilepos = ((int(mpos[0]) // self.tilemap.size), (int(mpos[1]) // self.tilemap.size))
@@ -99,21 +93,17 @@ class Editor:
         self.display.blit(current_tile_img, (tilepos[0] * self.tilemap.size, tilepos[1] * self.tilemap.size))
 
       if self.clicking and self.ongrid:
-        self.tilemap.tilemap[str(tilepos[0]+ render_scroll[0]//self.tilemap.size) + ';' + str(tilepos[1]+render_scroll[1]//self.tilemap.size)] = {
+        self.tilemap.set_tile((tilepos[0]+ render_scroll[0]//self.tilemap.size, tilepos[1]+render_scroll[1]//self.tilemap.size), {
           'type': self.tile_list[self.tile_group], 
           'variant': self.tile_variant, 
-          'pos': (tilepos[0] + render_scroll[0]//self.tilemap.size, tilepos[1] + render_scroll[1]//self.tilemap.size)}
+          'pos': (tilepos[0] + render_scroll[0]//self.tilemap.size, tilepos[1] + render_scroll[1]//self.tilemap.size)})
         
       if self.right_clicking:
-        tile_loc = str(str(tilepos[0]+ render_scroll[0]//self.tilemap.size) + ';' + str(tilepos[1]+render_scroll[1]//self.tilemap.size))
-        if tile_loc in self.tilemap.tilemap:
-          del self.tilemap.tilemap[tile_loc]
-        for tile in self.tilemap.offgrid:
-          tile_img = self.assets[tile['type']][tile['variant']]
-          tile_r = pygame.Rect(tile['pos'][0] - self.scroll[0]*self.tilemap.size, tile['pos'][1] - self.scroll[1]*self.tilemap.size, tile_img.get_width(), tile_img.get_height())
-          pos = [tilepos[0]*50, tilepos[1]*50]
-          if tile_r.collidepoint(pos):
-            self.tilemap.offgrid.remove(tile)
+        tile_loc = (tilepos[0]+ render_scroll[0]//self.tilemap.size, tilepos[1]+render_scroll[1]//self.tilemap.size)
+        self.tilemap.remove_tile(tile_loc)
+        pos = (tilepos[0] * self.tilemap.size + render_scroll[0], tilepos[1] * self.tilemap.size + render_scroll[1])
+        for tile in self.tilemap.offgrid_at(pos):
+          self.tilemap.remove_offgrid(tile)
 
 
       # Render current tile in left-top corner 
@@ -123,6 +113,7 @@ class Editor:
       keys = pygame.key.get_pressed()
       for event in pygame.event.get():  
         if event.type == pygame.QUIT:
+          self.saver.close()
           pygame.quit() 
           sys.exit()  
         
@@ -131,7 +122,7 @@ class Editor:
           if event.button == 1:
             self.clicking = True
             if not self.ongrid:
-              self.tilemap.offgrid.append({
+              self.tilemap.add_offgrid({
                 'type': self.tile_list[self.tile_group], 
                 'variant': self.tile_variant, 
                 'pos': (tilepos[0] * self.tilemap.size+render_scroll[0], tilepos[1] * self.tilemap.size + render_scroll[1])
@@ -160,12 +151,13 @@ class Editor:
         # Keyboard down events processing
         if event.type == pygame.KEYDOWN:
           if event.key == pygame.K_ESCAPE:
+            self.saver.close()
             pygame.quit()
             sys.exit()
           if event.key == pygame.K_LSHIFT:
             self.shift = True
           if event.key == pygame.K_RETURN:  
-            self.tilemap.save(f'data/maps/map{self.map}.json')
+            self.saver.flush()
           if event.key == pygame.K_a or event.key == pygame.K_LEFT:
             self.movement[0] = True
           if event.key == pygame.K_d or event.key == pygame.K_RIGHT:
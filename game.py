@@ -1,12 +1,24 @@
+import os
 import sys
 import json
+import struct
 import pygame
 
-from scripts.tilemap import Tilemap
+from scripts.tilemap import Tilemap, CHUNK_SIZE
+from scripts.mapfile import built_map
+from scripts.loader import save_sprites
+from scripts.profiler import PROFILER
 from scripts.utils import *
+from scripts.assets import *
+from scripts.activation import ActivationRegions
+from scripts.audio import SOUND_BANK, VoiceManager
+from scripts.render import DirtyRenderer
 from scripts.entities import *
 from scripts.UI import *
 FPS = 60
+DIRTY_RENDERING = True  # present only the changed parts of frames while the camera stands still
+LOAD_STEP_ASSETS = 4  # assets loaded between two frames of the loading screen
+LOAD_PROFILE = os.environ.get('HERO_LOAD_PROFILE')  # JSON file the load profile is written to after each level load
 
 class Game:
   def __init__(self):
@@ -14,16 +26,21 @@ class Game:
     Initializes a NEW GAME object.
   
     """
-    pygame.init()
-    pygame.display.set_caption("The Hero")
-    pygame.display.set_icon(pygame.image.load("data/imgs/hub/life.png"))
-    self.screen = pygame.display.set_mode((1280, 720), pygame.RESIZABLE)
+    run = PROFILER.run('startup')
+    with PROFILER.section('display', run):
+      pygame.init()
+      pygame.display.set_caption("The Hero")
+      pygame.display.set_icon(pygame.image.load("data/imgs/hub/life.png"))
+      self.screen = pygame.display.set_mode((1280, 720), pygame.RESIZABLE)
     self.clock = pygame.time.Clock()
     self.label = ''
-    self.load_game()
-    pygame.mixer.music.load('data/sfx/bg_music.wav')
-    pygame.mixer.music.set_volume(0.1)
-    pygame.mixer.music.play(-1)
+    with PROFILER.section('save game', run):
+      self.load_game()
+    with PROFILER.section('music', run):
+      pygame.mixer.music.load('data/sfx/bg_music.wav')
+      pygame.mixer.music.set_volume(0.1)
+      pygame.mixer.music.play(-1)
+    PROFILER.end(run)
 
   def load_level(self, map_id):
     """
@@ -33,116 +50,131 @@ class Game:
     ----------
     map_id : int or string
     """
-    self.assets = { 
-      'grass': load_imgs('tiles/grass'), 
-      'grass_new': load_imgs('tiles/grass_new'),
-      'spawners': load_imgs('tiles/spawners'),
-      'dungeon': load_imgs('tiles/dungeon'),
-      'cave': load_imgs('tiles/cave'),
-      'sign': load_imgs('tiles/sign'),
-      'slab': load_imgs('tiles/slab'),
-      'objects': load_imgs('objects'),
-
-      'potion': load_img('hub/potion.png', (30,30)),
-      'background1': load_img('background/background.png', (1280,720)),
-      'background2': load_img('background/bg.png', (1280,720)),
-      'hud_health': load_img('hub/hud_health.png', (300, 100)),
-      'cooldown': load_img('hub/cooldown.png', (50,15)),
-      'coin': load_img('hub/coin.png', (30,30)),
-
-      'spike/idle': Animation(load_imgs('entities/spike/spike_idle'), duration=1),
-      'spike/attack': Animation(load_imgs('entities/spike/spike_attack'), duration=6),
-      'spike_fall/idle': Animation(load_imgs('entities/spike_fall/spike_fall_idle'), duration=4),
-      'spike_fall/attack': Animation(load_imgs('entities/spike_fall/spike_fall_attack'), duration=4),
-      
-      'waterfall/idle': Animation(load_imgs('entities/waterfall'), duration=8),
-      'save/idle': Animation(load_imgs('entities/save/save_idle'), duration=8),
-      'save/save': Animation(load_imgs('entities/save/save_saving'), duration=8),
-      'coin/idle': Animation(load_imgs('entities/coin/coin_idle', (30,30)), duration=8),
-      'coin/pickup': Animation(load_imgs('entities/coin/coin_pickup', (30,30)), duration=8),
-      'orb/idle': Animation(load_imgs('entities/orb/orb_idle', (30,30)), duration=8),
-      'orb/pickup': Animation(load_imgs('entities/orb/orb_pickup', (30,30)), duration=8),
-      'vase/idle': Animation(load_imgs('entities/vase/vase_idle'), duration=4),
-      'vase/break': Animation(load_imgs('entities/vase/vase_breaking'), duration=8),
-
-      'player/idle': Animation(load_imgs('entities/hero/hero_idle'), duration=8), 
-      'player/hit': Animation(load_imgs('entities/hero/hero_hit'), duration=4),
-      'player/run': Animation(load_imgs('entities/hero/hero_run'), duration=6),
-      'player/death': Animation(load_imgs('entities/hero/hero_death'), duration=8),
-      'player/jump_up': Animation(load_imgs('entities/hero/hero_jump_up'), duration = 3),
-      'player/jump_down': Animation(load_imgs('entities/hero/hero_jump_down'), duration = 3),
-      'player/jump_double': Animation(load_imgs('entities/hero/hero_jump_double'), duration = 6),
-      'player/flash': Animation(load_imgs('entities/hero/hero_dust'), duration=4),
-      'player/spawn': Animation(load_imgs('entities/hero/hero_spawn'), duration=4),
-      'player/attack': Animation(load_imgs('entities/hero/hero_attack'), duration=4),
-      'sword/idle': Animation(load_imgs('entities/hero/hero_sword'), duration=4),
-
-      'bomber/idle': Animation(load_imgs('entities/bomber/bomber_goblin_idle'), duration=8),
-      'bomber/hit': Animation(load_imgs('entities/bomber/bomber_goblin_hit'), duration=4),
-      'bomber/attack': Animation(load_imgs('entities/bomber/bomber_goblin_attack'), duration=8),
-      'bomber/death': Animation(load_imgs('entities/bomber/bomber_goblin_death'), duration=6),
-      'bomb/idle': Animation(load_imgs('entities/bomb/bomb_idle'), duration=4),
-      'bomb/explode': Animation(load_imgs('entities/bomb/bomb_explode', (100,100)), duration=4),
-
-      'goblin/idle': Animation(load_imgs('entities/goblin/goblin_idle'), duration=4),
-      'goblin/run': Animation(load_imgs('entities/goblin/goblin_run'), duration=6),
-      'goblin/hit': Animation(load_imgs('entities/goblin/goblin_hit'), duration=4),
-      'goblin/attack': Animation(load_imgs('entities/goblin/goblin_attack'), duration=8),
-      'goblin/death': Animation(load_imgs('entities/goblin/goblin_death'), duration=4),
-
-      'slime/idle': Animation(load_imgs('entities/slime/slime_idle'), duration=4),
-      'slime/run': Animation(load_imgs('entities/slime/slime_run'), duration=4),
-      'slime/hit': Animation(load_imgs('entities/slime/slime_hit'), duration=4),
-      'slime/death': Animation(load_imgs('entities/slime/slime_death'), duration=8),
-
-      'minotaur/idle': Animation(load_imgs('entities/minotaur/minotaur_idle', (200,200)), duration=8),
-      'minotaur/run': Animation(load_imgs('entities/minotaur/minotaur_run', (200,200)), duration=16),
-      'minotaur/hit': Animation(load_imgs('entities/minotaur/minotaur_hit', (200,200)), duration=8),
-      'minotaur/attack': Animation(load_imgs('entities/minotaur/minotaur_attack4', (200,200)), duration=4),
-      'minotaur/death': Animation(load_imgs('entities/minotaur/minotaur_death', (200,200)), duration=62),
-    }
-
-    self.sfx = {
-      'jump': pygame.mixer.Sound('data/sfx/jump.wav'),
-      'explosion': pygame.mixer.Sound('data/sfx/explosion.wav'),
-      'sword': pygame.mixer.Sound('data/sfx/sword.wav'),
-      'hit': pygame.mixer.Sound('data/sfx/hit.wav'),
-      'spawn': pygame.mixer.Sound('data/sfx/spawn.mp3'),
-      'coin': pygame.mixer.Sound('data/sfx/coin.wav'),
-      'end': pygame.mixer.Sound('data/sfx/end.wav'),
-      'grass': pygame.mixer.Sound('data/sfx/grass_1.wav'),
-    }
-    
-    self.sfx['jump'].set_volume(0.5)
-    self.sfx['explosion'].set_volume(0.025)
-    self.sfx['sword'].set_volume(0.2)
-    self.sfx['hit'].set_volume(0.5) 
-    self.sfx['spawn'].set_volume(0.3)
-    self.sfx['coin'].set_volume(0.8)
-    self.sfx['end'].set_volume(0.5)
-    self.sfx['grass'].set_volume(0.1)
+    for progress in self.load_steps(map_id):
+      pass
 
-    self.display = pygame.Surface((1280, 720))
-    self.player = Player(self, (50, 500))
-    self.tilemap = Tilemap(self, size=50)
-    self.scroll = [0,0]
-    self.movement = [False, False]
-    self.map_id = map_id
-    self.is_pause = False
-    self.is_retry = False
-    self.complete_level = False
-    self.shop = False
-    self.offset = [0, 0]
+  def load_steps(self, map_id):
+    """
+    Loads a level from a file one step at a time, see `load_level`.
 
-    try:
-      self.tilemap.load('data/maps/map' + str(map_id) + '.json')
-      self.tilemap.load('data/maps/map' + str(map_id) + '.json')
-    except:
-      print('Error loading map')
-      pass
-    self.enemies = []
+    Yields the fraction of the level loaded and the name of the last step after each step,
+    so a loading screen can draw frames in between. Every step is timed in PROFILER,
+    in a run named after the map.
+
+    Parameters
+    ----------
+    map_id : int or string
+    """
+    run = PROFILER.run('map' + str(map_id))
+
+    # Only the assets the map uses are loaded below, anything else on first use
+    self.assets = LevelAssets(LEVEL_IMAGES, LEVEL_ANIMATIONS)
+    self.background = {3: None, 4: 'background2'}.get(map_id, 'background1')
+
+    # The sounds are read once per process, every level plays them through its own voice limits
+    with PROFILER.section('sounds', run):
+      SOUND_BANK.load()
+      self.sfx = VoiceManager(SOUND_BANK)
+    yield 0.1, 'sounds'
+
+    with PROFILER.section('map', run):
+      self.display = pygame.Surface((1280, 720))
+      if getattr(self, 'tilemap', None):
+        self.tilemap.close()
+      self.tilemap = Tilemap(self, size=50)
+      self.scroll = [0,0]
+      self.movement = [False, False]
+      self.map_id = map_id
+      self.is_pause = False
+      self.is_retry = False
+      self.complete_level = False
+      self.shop = False
+      self.offset = [0, 0]
+
+      path = 'data/maps/map' + str(map_id)
+      try:
+        if os.path.isdir(path):
+          self.tilemap.load(path)
+        else:
+          with PROFILER.section('read'):
+            try:
+              self.tilemap.load(built_map(path + '.json'))
+            except (OSError, ValueError, struct.error):
+              # A broken binary copy, the JSON map it was built from is still there
+              self.tilemap.load(path + '.json')
+      except (OSError, ValueError) as e:
+        print('Error loading map', path, e)
+      self.enemies = []
+      self.parked = {}
+      self.activation = ActivationRegions()
+      if self.tilemap.stream is not None:
+        # Read the chunks around the player spawner before the first frame, they are baked
+        # once the level assets are loaded and the spawners extracted
+        view = pygame.Rect(0, 0, self.display.get_width(), self.display.get_height())
+        view.center = self.tilemap.stream.start
+        with PROFILER.section('stream'):
+          self.tilemap.stream_around(view, wait=True)
+    yield 0.2, 'map'
+
+    # A few assets per step, so the loading screen keeps drawing on a cold load
+    keys = level_manifest(self.tilemap, self.background)
+    for i in range(0, len(keys), LOAD_STEP_ASSETS):
+      with PROFILER.section('assets', run):
+        self.assets.load(keys[i:i + LOAD_STEP_ASSETS])
+      yield 0.2 + 0.7 * min(i + LOAD_STEP_ASSETS, len(keys)) / len(keys), 'assets'
+
+    with PROFILER.section('entities', run):
+      self.player = Player(self, (50, 500))
+      if self.tilemap.stream is not None:
+        self.player.pos = list(self.tilemap.stream.start)
+      self.spawn_entities()
+    if self.tilemap.stream is not None:
+      with PROFILER.section('bake', run):
+        self.tilemap.bake_view(view)
+    with PROFILER.section('sprite cache write', run):
+      save_sprites()
+    PROFILER.end(run)
+    if LOAD_PROFILE:
+      PROFILER.dump(LOAD_PROFILE)
+    yield 1.0, 'entities'
+
+  def loading_screen(self, steps):
+    """
+    Draw a loading screen with a progress bar while running the steps of a load, and keep
+    handling window events in between so the window does not freeze.
+
+    Parameters
+    ----------
+    steps : generator
+        Yields the fraction loaded and the name of the step after each step, like `load_steps`.
+    """
+    for progress, step in steps:
+      for event in pygame.event.get():
+        if event.type == pygame.QUIT:
+          pygame.quit()
+          sys.exit()
+      width, height = self.screen.get_size()
+      self.screen.fill((0, 0, 0))
+      text = TEXT.render('LOADING', 64, 'white')
+      self.screen.blit(text, text.get_rect(center=(width // 2, height // 2 - 60)))
+      bar = pygame.Rect(0, 0, width // 2, 24)
+      bar.center = (width // 2, height // 2 + 20)
+      pygame.draw.rect(self.screen, 'white', bar, 2)
+      pygame.draw.rect(self.screen, 'white', (bar.x + 4, bar.y + 4, (bar.width - 8) * progress, bar.height - 8))
+      pygame.display.update()
+
+  def spawn_entities(self):
+    """
+    Extract the spawners from the tilemap and create their entities.
+
+    Called once when a level is loaded, and on a streamed map whenever new chunks come in.
+    """
     spawners = [('spawners', 0), ('spawners', 1), ('spawners', 2), ('spawners', 3), ('spawners', 4), ('spawners', 5), ('spawners', 6), ('spawners', 7), ('spawners', 8)]
-    for spawner in self.tilemap.extract(spawners):
+    spawners = self.tilemap.extract(spawners)
+    bosses = self.tilemap.extract([('boss',0)])
+    # Chunks streamed in later can hold entities the level has not loaded yet
+    self.assets.load(entity_assets(spawner_entity((spawner['type'], spawner['variant'])) for spawner in spawners + bosses))
+    for spawner in spawners:
       if spawner['variant'] == 0:
         self.player.pos = spawner['pos']
         self.player.air_time = 0
@@ -165,9 +197,52 @@ class Game:
       else:
         pass
 
-    for spawner in self.tilemap.extract([('boss',0)]):
+    for spawner in bosses:
       self.enemies.append(Minotaur(self, spawner['pos'], (200,200)))
 
+  def stream_level(self, view):
+    """
+    Load and evict the chunks of a streamed map around the camera view, then park the entities
+    over the evicted chunks and spawn the ones of the chunks loaded for the first time.
+
+    Parameters
+    ----------
+    view : pygame.Rect
+        The camera view, in pixel coordinates.
+
+    Returns
+    -------
+    bool
+        Whether any chunk was loaded.
+    """
+    if not self.tilemap.stream_around(view):
+      return False
+    self.park_entities()
+    self.spawn_entities()
+    return True
+
+  def park_entities(self):
+    """
+    Set aside the entities whose center is over a chunk of a streamed map that was evicted,
+    and bring back the parked entities of the chunks loaded again.
+
+    Parked entities keep their state, but are not updated, drawn or even looked at each frame.
+    They are still kept in memory, like the spawners extracted from the map (see Tilemap.removed),
+    so the memory they take grows with the spawners of the chunks visited, up to every spawner of the map.
+    """
+    chunk_px = CHUNK_SIZE * self.tilemap.size
+    for chunk in [chunk for chunk in self.parked if chunk in self.tilemap.loaded]:
+      self.enemies.extend(self.parked.pop(chunk))
+    staying = []
+    for enemy in self.enemies:
+      center = enemy.rect().center
+      chunk = (center[0] // chunk_px, center[1] // chunk_px)
+      if chunk in self.tilemap.stream.chunks and chunk not in self.tilemap.loaded:
+        self.parked.setdefault(chunk, []).append(enemy)
+      else:
+        staying.append(enemy)
+    self.enemies[:] = staying
+
   def draw_hub(self, offset = (0,0)):
     """ 
     Draw a hub 
@@ -175,34 +250,87 @@ class Game:
     Parameters
     ----------
 
+    Returns
+    -------
+    list
+        The areas of the display drawn on, as pygame.Rect.
     """
-    FONT36 = pygame.font.Font('data/font/Pixellari.ttf', 36)
-    FONT24 = pygame.font.Font('data/font/Pixellari.ttf', 24)
-
-    self.display.blit(self.assets['potion'], (48,35))
-    potion_text = FONT24.render(str(self.potions), True, 'white')
+    drawn = [self.display.blit(self.assets['potion'], (48,35))]
+    potion_text = TEXT.render(str(self.potions), 24, 'white')
     potion_Rect = potion_text.get_rect()
     potion_Rect.center = (62, 83)
-    self.display.blit(potion_text, potion_Rect)
+    drawn.append(self.display.blit(potion_text, potion_Rect))
 
     hp_percent = self.player.hp/100
     hp_percent = 0 if hp_percent < 0 else hp_percent
     if hp_percent < 0.25:
       pygame.draw.rect(self.display, 'red', (110, 25, 190*hp_percent, 32), 0, 8)
-      pygame.draw.rect(self.display, 'red', (0, 0, self.display.get_width(), self.display.get_height()), 10)
+      border = pygame.draw.rect(self.display, 'red', (0, 0, self.display.get_width(), self.display.get_height()), 10)
+      # Only the edges of the screen are drawn on, not what they surround
+      drawn += [pygame.Rect(border.topleft, (border.width, 10)), pygame.Rect(border.topleft, (10, border.height)),
+                pygame.Rect(border.right - 10, border.top, 10, border.height), pygame.Rect(border.left, border.bottom - 10, border.width, 10)]
     else:
       pygame.draw.rect(self.display, 'green', (110, 25, 190*hp_percent, 32), 0, 8)
-    self.display.blit(self.assets['hud_health'], (10,10))
+    drawn.append(self.display.blit(self.assets['hud_health'], (10,10)))
     
-    coin_text = FONT36.render(str(self.coin), True, 'yellow')
+    coin_text = TEXT.render(str(self.coin), 36, 'yellow')
     coin_Rect = coin_text.get_rect()
     coin_Rect.topleft = (160, 65)
-    self.display.blit(coin_text,coin_Rect)
+    drawn.append(self.display.blit(coin_text,coin_Rect))
 
     mana_percent = (self.player.mana)/100
     cooldown_pos = (self.player.pos[0] - offset[0], self.player.pos[1] - offset[1] - 20)
     pygame.draw.rect(self.display, (150,150,250), (cooldown_pos[0]+ 2, cooldown_pos[1] + 4, 46 * mana_percent, 7), 0, 4)
-    self.display.blit(self.assets['cooldown'], cooldown_pos)
+    drawn.append(self.display.blit(self.assets['cooldown'], cooldown_pos))
+    return drawn
+
+  def draw_scene(self, surf):
+    """
+    Draw what the camera sees behind the entities: the background and the tiles.
+
+    Parameters
+    ----------
+    surf : pygame.Surface
+        The surface to draw on, the display or the static layer of the renderer.
+    """
+    if self.background is None:
+      surf.fill((0,0,0))
+    else:
+      surf.blit(self.assets[self.background], (0,0))
+    self.tilemap.render(surf, offset=self.offset)
+
+  def frame(self, renderer):
+    """
+    Update the level and draw a frame of it on the display, recording what changed on the renderer.
+
+    Parameters
+    ----------
+    renderer : DirtyRenderer
+        The renderer the frame is presented with.
+    """
+    # camera
+    if self.player.pos[0] > self.display.get_width()/2:
+      self.scroll[0] += (self.player.rect().centerx - self.display.get_width()/2 - self.scroll[0])
+    self.scroll[1] += (self.player.rect().centery - self.display.get_height()/2 - self.scroll[1]) - 150
+    
+    self.offset = ((self.scroll[0], (self.scroll[1])))
+    self.sfx.listen((self.offset[0] + self.display.get_width() / 2, self.offset[1] + self.display.get_height() / 2))
+    if self.tilemap.stream is not None:
+      if self.stream_level(pygame.Rect(self.offset, self.display.get_size())):
+        renderer.forget()
+    # The tiles seen only change when the camera moves or the map is edited
+    renderer.begin((self.offset, self.tilemap.version), self.draw_scene)
+
+    self.activation.focus(pygame.Rect(self.offset, self.display.get_size()))
+    for enemy in self.enemies.copy(): 
+      if self.activation.updates(enemy, self.tilemap):
+        enemy.update(self.tilemap, (0,0))
+      if self.activation.renders(enemy):
+        renderer.mark(enemy.render(self.display, offset=self.offset))
+
+    self.player.update(tilemap=self.tilemap, movement=(self.movement[1] - self.movement[0], 0))
+    renderer.mark(self.player.render(self.display, offset=self.offset))
+    renderer.mark(self.draw_hub(offset=self.offset))
 
   def run(self, id_map):
     """ 
@@ -213,38 +341,18 @@ class Game:
     id_map : int or string
 
     """    
-    self.load_level(id_map)
+    self.loading_screen(self.load_steps(id_map))
     self.labels1 = ['RESUME', 'RETRY', 'MAIN MENU', 'QUIT']
     self.labels2 = ['RETRY', 'MAIN MENU', 'QUIT']
     self.labels3 = ['NEXT LEVEL', 'SHOP', 'MAIN MENU', 'QUIT']
     ui = UI(self.screen)
+    renderer = DirtyRenderer(self.screen, self.display, DIRTY_RENDERING)
 
     while True:
       self.label = ''
 
       if not self.is_pause:
-        if self.map_id == 3:
-          self.display.fill((0,0,0))
-        elif self.map_id == 4:
-          self.display.blit(self.assets['background2'], (0,0))
-        else:
-          self.display.blit(self.assets['background1'], (0,0))
-
-        # camera
-        if self.player.pos[0] > self.display.get_width()/2:
-          self.scroll[0] += (self.player.rect().centerx - self.display.get_width()/2 - self.scroll[0])
-        self.scroll[1] += (self.player.rect().centery - self.display.get_height()/2 - self.scroll[1]) - 150
-        
-        self.offset = ((self.scroll[0], (self.scroll[1])))
-        self.tilemap.render(self.display, offset=self.offset)
-
-        for enemy in self.enemies.copy(): 
-          enemy.update(self.tilemap, (0,0))
-          enemy.render(self.display, offset=self.offset)
-
-        self.player.update(tilemap=self.tilemap, movement=(self.movement[1] - self.movement[0], 0))
-        self.player.render(self.display, offset=self.offset)          
-        self.draw_hub( offset=self.offset)
+        self.frame(renderer)
 
       for event in pygame.event.get():  
         if event.type == pygame.QUIT:
@@ -274,9 +382,11 @@ class Game:
           if event.key == pygame.K_d or event.key == pygame.K_RIGHT:
             self.movement[1] = False
         
-        if event.type == pygame.MOUSEBUTTONDOWN:
+        if self.is_pause:
+          ui.handle(event)
+        elif event.type == pygame.MOUSEBUTTONDOWN:
           if event.button == 1:
-            self.player.attack(self.enemies, self.display, self.offset)
+            renderer.mark(self.player.attack(self.enemies, self.display, self.offset))
           if event.button == 2:
             self.player.regen()
           if event.button == 3:
@@ -286,8 +396,10 @@ class Game:
         self.is_retry = True
         self.is_pause = True
       
-      self.screen.blit(pygame.transform.scale(self.display, self.screen.get_size()), (0, 0))
       if self.is_pause:
+        # The menus draw straight on the screen, over the last frame frozen
+        ui.freeze(self.display)
+        renderer.invalidate()
         if self.is_retry:
           self.label = ui.retry((320,400), self.labels2)
         elif self.shop:
@@ -301,7 +413,11 @@ class Game:
 
       if self.complete_level:
         self.is_pause = True
-      pygame.display.update()
+      if self.is_pause:
+        pygame.display.update(ui.drawn)
+      else:
+        ui.thaw()
+        renderer.present()
       self.clock.tick(FPS)
 
       if self.label == 'QUIT':
@@ -334,29 +450,29 @@ class Game:
     Parameters
     ----------
     """
-    text_size = (100, 100)
-    self.assets = {
-      'background': load_img('background/background.png', (1280, 720)),
-      't': load_img('text/t.png', text_size),
-      'h': load_img('text/h.png', text_size),
-      'e': load_img('text/e.png', text_size),
-      'r': load_img('text/r.png', text_size),
-      'o': load_img('text/o.png', text_size),
-    }
+    run = PROFILER.run('main menu')
+    with PROFILER.section('images', run):
+      self.assets = load_assets(MENU_IMAGES)
+    PROFILER.end(run)
     self.display = pygame.Surface((1280, 720))
 
-    font = pygame.font.Font('data/font/Pixellari.ttf', 128)
-    gameName_text = font.render('THE HERO', True, (40,40,40))
+    gameName_text = TEXT.render('THE HERO', 128, (40,40,40))
     textRect = gameName_text.get_rect()
     textRect.centerx = 1280//2
     textRect.top = 50
 
-    description_font = pygame.font.Font('data/font/Pixellari.ttf', 24)
-    description = description_font.render('@Made by Hagu Bian', True, (200,200,200,10))
+    description = TEXT.render('@Made by Hagu Bian', 24, (200,200,200,10))
     descriptionRect = description.get_rect()
     descriptionRect.bottomright = (1250, 720)
     self.labels = ['CONTINUE', 'NEW GAME', 'SELECT LEVEL', 'QUIT']
+
+    def draw_scene(surf):
+      surf.blit(self.assets['background'], (0, 0))
+      surf.blit(description, descriptionRect)
+      UI(surf).game_name(self.assets)
+
     ui = UI(self.display)
+    renderer = DirtyRenderer(self.screen, self.display, DIRTY_RENDERING)
     while True:
       self.label = ''
       for event in pygame.event.get():
@@ -367,15 +483,15 @@ class Game:
           if event.key == pygame.K_ESCAPE:
             pygame.quit()
             sys.exit()
+        ui.handle(event)
 
-      self.display.blit(self.assets['background'], (0, 0))
-      self.display.blit(description, descriptionRect)
-      ui.game_name(self.assets)
+      renderer.begin('main_menu', draw_scene)
+      if renderer.full:
+        ui.invalidate()
       self.label = ui.main_menu(self.labels)
-
-      self.screen.blit(pygame.transform.scale(self.display, self.screen.get_size()), (0, 0))
-      pygame.display.update()
-      self.clock.tick(60)
+      renderer.mark(ui.drawn, keep=True)
+      renderer.present()
+      self.clock.tick(FPS)
 
       if self.label == 'QUIT':
         pygame.quit()
@@ -403,27 +519,27 @@ class Game:
     """
     Run the select level menu.
     """
-    text_size = (100, 100)
-    self.assets = {
-      'background': load_img('background/background.png', (1280, 720)),
-      't': load_img('text/t.png', text_size),
-      'h': load_img('text/h.png', text_size),
-      'e': load_img('text/e.png', text_size),
-      'r': load_img('text/r.png', text_size),
-      'o': load_img('text/o.png', text_size),
-      }
+    run = PROFILER.run('select level')
+    with PROFILER.section('images', run):
+      self.assets = load_assets(MENU_IMAGES)
+    PROFILER.end(run)
     
     self.display = pygame.Surface((1280, 720))
-    description_font = pygame.font.Font('data/font/Pixellari.ttf', 24)
-    description = description_font.render('@Made by Hagu Bian', False, (200,200,200,10))
+    description = TEXT.render('@Made by Hagu Bian', 24, (200,200,200,10), antialias=False)
     descriptionRect = description.get_rect()
     descriptionRect.bottomright = (1250, 720)
     self.labels = ['Level 1(lock)', 'Level 2(lock)', 'Level 3(lock)', 'Level 4(lock)', 'Level 5(lock)', 'Back']
     for map in self.maps:
       if self.maps[map]:
         self.labels[int(map)-1] = self.labels[int(map)-1].split('(')[0]
-    
+
+    def draw_scene(surf):
+      surf.blit(self.assets['background'], (0, 0))
+      surf.blit(description, descriptionRect)
+      UI(surf).game_name(self.assets)
+
     ui = UI(self.display)
+    renderer = DirtyRenderer(self.screen, self.display, DIRTY_RENDERING)
     while True:
       self.label = ''
       for event in pygame.event.get():
@@ -434,15 +550,15 @@ class Game:
           if event.key == pygame.K_ESCAPE:
             pygame.quit()
             sys.exit()
+        ui.handle(event)
 
-      self.display.blit(self.assets['background'], (0, 0))
-      self.display.blit(description, descriptionRect)
-      ui.game_name(self.assets)
+      renderer.begin('select_level', draw_scene)
+      if renderer.full:
+        ui.invalidate()
       self.label = ui.select_level(self.labels)
-
-      self.screen.blit(pygame.transform.scale(self.display, self.screen.get_size()), (0, 0))
-      pygame.display.update()
-      self.clock.tick(30)
+      renderer.mark(ui.drawn, keep=True)
+      renderer.present()
+      self.clock.tick(FPS)
 
       if self.label in ['Level 1', 'Level 2', 'Level 3', 'Level 4', 'Level 5', 'Back']:
         break 
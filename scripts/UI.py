@@ -1,14 +1,110 @@
+import collections
 import pygame
+
+FONT_PATH = 'data/font/Pixellari.ttf'
+FONT_CACHE_LIMIT = 8     # most font sizes kept open by the text cache
+TEXT_CACHE_LIMIT = 256   # most rendered strings kept by the text cache
+BUTTON_COLORS = {'normal': (203, 81, 16), 'hover': (226, 104, 38), 'pressed': (168, 60, 8)}
+
+class TextCache:
+  def __init__(self, path=FONT_PATH, font_limit=FONT_CACHE_LIMIT, text_limit=TEXT_CACHE_LIMIT):
+    """
+    Keep the fonts and the rendered strings of the HUD and the menus, so drawing a frame
+    neither parses the font file nor rasterizes glyphs again.
+
+    Fonts are keyed by size and rendered strings by (text, size, color, antialias), each
+    dropping the least recently used ones past their limit. A string whose value changes,
+    like the coin count, is rendered once per value.
+    The rendered surfaces are shared, so they must not be drawn on or changed. Copy them first.
+
+    Parameters:
+    ----------
+    path (str): The font file.
+    font_limit (int): The most font sizes to keep.
+    text_limit (int): The most rendered strings to keep.
+    fonts (OrderedDict): The pygame.font.Font of each size, least recently used first.
+    texts (OrderedDict): The rendered surfaces keyed by (text, size, color, antialias), least recently used first.
+    hits (int): The strings found in the cache.
+    misses (int): The strings rendered.
+    opened (int): The times the font file was read.
+    """
+    self.path = path
+    self.font_limit = font_limit
+    self.text_limit = text_limit
+    self.fonts = collections.OrderedDict()
+    self.texts = collections.OrderedDict()
+    self.hits = 0
+    self.misses = 0
+    self.opened = 0
+
+  def font(self, size):
+    """
+    Get the font at a size, reading the font file only the first time.
+    """
+    font = self.fonts.get(size)
+    if font is None:
+      font = pygame.font.Font(self.path, size)
+      self.opened += 1
+      self.fonts[size] = font
+      if len(self.fonts) > self.font_limit:
+        self.fonts.popitem(last=False)
+    else:
+      self.fonts.move_to_end(size)
+    return font
+
+  def render(self, text, size, color='white', antialias=True):
+    """
+    Get a string rendered in the font, like pygame.font.Font.render, rendering it only the first time.
+
+    Parameters:
+    ----------
+    text (str): The string to render.
+    size (int): The font size.
+    color (str or tuple): The color of the text.
+    antialias (bool, optional): Whether to render the text with smooth edges. Defaults to True.
+
+    Returns:
+    ----------
+    pygame.Surface: The rendered string.
+    """
+    key = (text, size, tuple(color) if isinstance(color, list) else color, antialias)
+    img = self.texts.get(key)
+    if img is None:
+      self.misses += 1
+      img = self.font(size).render(text, antialias, color)
+      self.texts[key] = img
+      if len(self.texts) > self.text_limit:
+        self.texts.popitem(last=False)
+    else:
+      self.hits += 1
+      self.texts.move_to_end(key)
+    return img
+
+  def stats(self):
+    """
+    Get the counters of the cache.
+    """
+    return {'fonts': len(self.fonts), 'texts': len(self.texts), 'hits': self.hits,
+            'misses': self.misses, 'opened': self.opened}
+
+TEXT = TextCache()
+
 class Button:
   def __init__(self, surf, pos, size, text=''):
     """
     Initialize a Button object.
 
+    The button is drawn once to an image of its own, kept until its text or its state changes,
+    and blitted from there.
+
     Parameters:
     surf (pygame.Surface): The surface on which the button will be drawn.
     pos (tuple): The position of the top-left corner of the button on the surface.
     size (tuple): The size of the button as (width, height).
     text (str, optional): The text to be displayed on the button. Default is an empty string.
+    state (str): 'normal', 'hover' or 'pressed', the key of its color in BUTTON_COLORS.
+    image (pygame.Surface): The button as last drawn, or None if it must be drawn again.
+    dirty (bool): Whether the button changed since it was last blitted on the surface.
 
     Returns:
     None
@@ -17,29 +113,59 @@ class Button:
     self.pos = pos
     self.size = size
     self.text = text
+    self.state = 'normal'
+    self.image = None
+    self.dirty = True
+    self.button_rect = self.rect()
 
-  def draw(self):
+  def set_text(self, text):
     """
-    Draws the button on the surface.
+    Change the text of the button, drawing it again only if it differs.
+    """
+    if text != self.text:
+      self.text = text
+      self.image = None
+      self.dirty = True
 
-    The button is drawn with a black border, a lighter shade of green, 
-    a darker shade of green, and a darker shade of brown. The text on the button is rendered 
-    using the 'data/font/Pixellari.ttf' font with a size of 32 and white color.
-    """
-    pygame.draw.rect(self.surf, 'black',         (self.pos[0], self.pos[1], self.size[0], self.size[1]))
-    pygame.draw.rect(self.surf, (224, 236, 23),  (self.pos[0] + 3, self.pos[1] + 3, self.size[0]-6, self.size[1]-6))
-    pygame.draw.rect(self.surf, 'black',         (self.pos[0] + 8, self.pos[1] + 8, self.size[0]-16, self.size[1]-16))
-    pygame.draw.rect(self.surf, (203, 81, 16),   (self.pos[0] + 11, self.pos[1] + 11, self.size[0]-22, self.size[1]-22))
-    if len(self.text) < 16:
-      font = pygame.font.Font('data/font/Pixellari.ttf', 32)
-    else:
-      font = pygame.font.Font('data/font/Pixellari.ttf', 24)
+  def set_state(self, state):
+    """
+    Change the state of the button, drawing it again only if it differs.
+    """
+    if state != self.state:
+      self.state = state
+      self.image = None
+      self.dirty = True
 
-    text = font.render(self.text, True, 'white')
+  def render(self):
+    """
+    Draws the image of the button.
+
+    The button is drawn with a black border, a lighter shade of green, 
+    a darker shade of green, and a darker shade of brown, lighter while hovered and darker while
+    pressed. The text on the button is rendered through the TEXT cache, in the
+    'data/font/Pixellari.ttf' font with a size of 32 (24 for long labels) and white color.
+    """
+    self.image = pygame.Surface(self.size).convert()
+    pygame.draw.rect(self.image, 'black',         (0, 0, self.size[0], self.size[1]))
+    pygame.draw.rect(self.image, (224, 236, 23),  (3, 3, self.size[0]-6, self.size[1]-6))
+    pygame.draw.rect(self.image, 'black',         (8, 8, self.size[0]-16, self.size[1]-16))
+    pygame.draw.rect(self.image, BUTTON_COLORS[self.state], (11, 11, self.size[0]-22, self.size[1]-22))
+    text = TEXT.render(self.text, 32 if len(self.text) < 16 else 24, 'white')
     textRect = text.get_rect()
-    textRect.center = (self.pos[0] + self.size[0]//2, self.pos[1] + self.size[1]//2 + 3)
-    self.surf.blit(text, textRect)
-    self.button_rect = self.rect()
+    textRect.center = (self.size[0]//2, self.size[1]//2 + 3)
+    self.image.blit(text, textRect)
+
+  def draw(self):
+    """
+    Draws the button on the surface, from its image.
+
+    Returns:
+    pygame.Rect: The area of the surface drawn on.
+    """
+    if self.image is None:
+      self.render()
+    self.dirty = False
+    return self.surf.blit(self.image, self.pos)
  
   def rect(self):
     """
@@ -59,12 +185,18 @@ class Menu:
     """
     Initialize a Menu object.
 
+    A menu is kept across frames: it draws everything the first time, then only the buttons
+    that changed, see `draw`.
+
     Parameters:
     surf (pygame.Surface): The surface on which the menu will be drawn.
     pos (tuple): The position of the top-left corner of the menu on the surface.
     size (tuple): The size of the menu as (width, height).
     labels (list): A list of strings representing the labels for the buttons in the menu.
     collumns (int, optional): The number of columns in the menu. Default is 1.
+    image (pygame.Surface): The frame of the menu behind the buttons, or None until first drawn.
+    full (bool): Whether the next draw draws the whole menu.
+    pressed (Button): The button the left mouse button went down on, until it goes up, or None.
     """
     self.surf= surf
     self.pos = pos
@@ -73,10 +205,9 @@ class Menu:
     self.num_buttons = len(labels)
     self.buttons = []
     self.collumns = collumns
-
-    Button(self.surf, self.pos, self.size).draw()
-    pygame.draw.rect(self.surf, 'black',        (self.pos[0] + 16, self.pos[1] + 16, self.size[0]-32, self.size[1]-32))
-    pygame.draw.rect(self.surf, (236, 140, 88), (self.pos[0] + 19, self.pos[1] + 19, self.size[0]-38, self.size[1]-38))
+    self.image = None
+    self.full = True
+    self.pressed = None
     
     blank_space = [self.size[0] - 50, self.size[1] - 50]
     button_size = [blank_space[0] if self.collumns == 1 else (blank_space[0]/2 - 5), 80]
@@ -102,51 +233,247 @@ class Menu:
         if i+1 < self.num_buttons:
           self.buttons.append(Button(self.surf, (button_pos[0] + offset[0], button_pos[1]), button_size, self.labels[i+1]))
         button_pos = [button_pos[0], button_pos[1] + offset[1]]
+
+  def render(self):
+    """
+    Draws the image of the frame of the menu.
+    """
+    self.image = pygame.Surface(self.size).convert()
+    Button(self.image, (0, 0), self.size).draw()
+    pygame.draw.rect(self.image, 'black',        (16, 16, self.size[0]-32, self.size[1]-32))
+    pygame.draw.rect(self.image, (236, 140, 88), (19, 19, self.size[0]-38, self.size[1]-38))
+
+  def invalidate(self):
+    """
+    Draw the whole menu on the next draw, after something else drew over it.
+    """
+    self.full = True
+
+  def set_labels(self, labels):
+    """
+    Change the labels of the buttons, one per button, drawing again only the ones that changed.
+    """
+    self.labels = labels
+    for button, label in zip(self.buttons, labels):
+      button.set_text(label)
   
   def draw(self):
     """
     Draws the menu on the surface.
 
-    The menu is drawn with a background color, and each button is drawn using the Button class.
+    The first time, or after `invalidate`, the frame of the menu and every button are drawn.
+    Otherwise only the buttons whose text or state changed since are drawn again.
+
+    Returns:
+    list: The areas of the surface drawn on, as pygame.Rect.
+    """
+    if self.full:
+      if self.image is None:
+        self.render()
+      self.full = False
+      drawn = [self.surf.blit(self.image, self.pos)]
+      for button in self.buttons:
+        button.draw()
+      return drawn
+    return [button.draw() for button in self.buttons if button.dirty]
+
+  def mouse_pos(self, pos = None):
     """
+    Get a position on the surface of the menu from a position in the window.
+
+    Parameters:
+    ----------
+    pos (tuple, optional): The position in the window, like the pos of a mouse event.
+        Defaults to where the mouse is.
+    """
+    width, height = pygame.display.get_surface().get_width(), pygame.display.get_surface().get_height()
+    mpos = pygame.mouse.get_pos() if pos is None else pos
+    scale = [self.surf.get_width()/width, self.surf.get_height()/height]
+    return (mpos[0]*scale[0], mpos[1]*scale[1])
+
+  def button_at(self, pos):
+    """
+    Get the button at a position on the surface of the menu, or None if there is none.
+    """
+    rect = pygame.Rect(pos, (1, 1))
     for button in self.buttons:
-      button.draw() 
+      if rect.colliderect(button.button_rect):
+        return button
+    return None
 
-  def is_click(self, x = 0, y = 0):
+  def hover(self):
     """
-    Checks if a button in the menu is clicked.
+    Set the state of every button from the mouse: hovered if it is over the button, pressed if
+    the mouse button also went down on it.
+    """
+    hovered = self.button_at(self.mouse_pos())
+    for button in self.buttons:
+      if button is not hovered:
+        button.set_state('normal')
+      else:
+        button.set_state('pressed' if button is self.pressed else 'hover')
+
+  def click(self, events):
+    """
+    Checks if a button in the menu is clicked by the given events.
+
+    A click is the left mouse button going down on a button, then up on the same button, so
+    holding the mouse button clicks only once, and a press that started elsewhere, like on
+    the menu shown before, clicks nothing.
 
     Parameters:
     ----------
-    x (int, optional): The x-coordinate offset for the mouse position. Default is 0.
-    y (int, optional): The y-coordinate offset for the mouse position. Default is 0.
+    events (list): The pygame events of the frame, others than mouse button events are ignored.
 
     Returns:
     str: The label of the clicked button, or None if no button is clicked.
     """
-    width, height = pygame.display.get_surface().get_width(), pygame.display.get_surface().get_height()
-    pygame.time.delay(75)
-    mpos = pygame.mouse.get_pos()
-    scale = [1280/width, 720/height]
-    # rect = pygame.Rect(mpos[0]*scale[0], mpos[1]*scale[1], 1, 1)
-    rect = pygame.Rect((mpos[0]-x)*scale[0], (mpos[1]-y)*scale[1], 1, 1)
-    buttons = pygame.mouse.get_pressed()
-    if buttons[0]:
-      for button in self.buttons:
-        # print(button.button_rect, rect)
-        if rect.colliderect(button.button_rect):
+    for event in events:
+      if event.type not in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP) or event.button != 1:
+        continue
+      button = self.button_at(self.mouse_pos(event.pos))
+      if event.type == pygame.MOUSEBUTTONDOWN:
+        self.pressed = button
+      else:
+        pressed = self.pressed
+        self.pressed = None
+        if button is not None and button is pressed:
           return button.text
+    return None
 
 class UI(Menu):
   def __init__(self, surf):
     """
     Initialize a UI object.
 
+    The menus are kept across the frames they are shown, by name, and the world behind the
+    pause menus is frozen: darkened once when the game pauses, then left as is.
+
     Parameters:
     ----------
     surf (pygame.Surface): The surface on which the UI will be drawn.
+    drawn (list): The rects of the surface drawn on by the last menu shown, as pygame.Rect.
+    menus (dict): The Menu of each menu shown so far, by name.
+    world (pygame.Surface): The frame of the game the pause menus are shown over, or None.
+    frozen (pygame.Surface): The world scaled to the surface and darkened, or None until drawn.
+    scene (str): The name of the pause menu drawn over the frozen world, or None.
+    counts (tuple): The coins and potions shown by the shop, or None until drawn.
+    events (list): The mouse button events for the next menu shown, see `handle`.
     """
     self.surf = surf
+    self.drawn = []
+    self.menus = {}
+    self.world = None
+    self.frozen = None
+    self.scene = None
+    self.counts = None
+    self.events = []
+
+  def handle(self, event):
+    """
+    Keep a mouse button event of the event loop for the next menu shown.
+    """
+    if event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP):
+      self.events.append(event)
+
+  def clicked(self, menu):
+    """
+    Checks if a button of the given menu is clicked by the events kept since the last menu shown.
+    """
+    events = self.events
+    self.events = []
+    return menu.click(events)
+
+  def menu(self, name, pos, size, labels, collumns = 1):
+    """
+    Get the Menu of the given name, making it if it was not shown before or its layout changed.
+    """
+    menu = self.menus.get(name)
+    if menu is None or menu.pos != pos or menu.size != size or menu.collumns != collumns \
+        or menu.num_buttons != len(labels) or menu.surf is not self.surf:
+      menu = Menu(self.surf, pos, size, labels, collumns)
+      self.menus[name] = menu
+    else:
+      menu.set_labels(labels)
+    return menu
+
+  def invalidate(self):
+    """
+    Draw the whole menus on their next show, after something else drew over them.
+    """
+    for menu in self.menus.values():
+      menu.invalidate()
+    self.scene = None
+
+  def freeze(self, world):
+    """
+    Show the pause menus over the given frame of the game, until `thaw`.
+    """
+    if world is not self.world:
+      self.world = world
+      self.frozen = None
+      self.scene = None
+
+  def thaw(self):
+    """
+    Forget the frozen world, once the game runs again.
+    """
+    self.world = None
+    self.frozen = None
+    self.scene = None
+    self.events = []
+
+  def overlay(self, name, title, size, labels):
+    """
+    Displays a menu over the frozen world, with a title above it.
+
+    The frozen world, the title and the whole menu are drawn when the menu shows up, and then
+    only the buttons that changed. Without a frozen world, the menu shows over what is on the
+    surface.
+
+    Parameters:
+    ----------
+    name : str
+        The name the menu is kept by.
+    title : str
+        The text above the menu.
+    size : tuple
+        The size of the menu as (width, height).
+    labels : list
+        A list of strings representing the labels for the buttons in the menu.
+
+    Returns:
+    ----------
+    str
+        The label of the clicked button, or None if no button is clicked.
+    """
+    width, height = self.surf.get_width(), self.surf.get_height()
+    pos = (width/2 - size[0]/2, height/2 - size[1]/2 + height/10)
+    menu = self.menu(name, pos, size, labels)
+    self.drawn = []
+    if self.frozen is None or self.frozen.get_size() != self.surf.get_size():
+      world = self.surf.copy() if self.world is None else self.world
+      self.world = world
+      self.frozen = pygame.transform.scale(world, (width, height))
+      overlay = pygame.Surface((width, height))
+      overlay.set_alpha(128)
+      overlay.fill('black')
+      self.frozen.blit(overlay, (0, 0))
+      self.scene = None
+    if self.scene != name:
+      self.drawn.append(self.surf.blit(self.frozen, (0, 0)))
+      text = TEXT.render(title, 64, 'white')
+      textRect = text.get_rect()
+      textRect.center = (width/2, height/5)
+      self.surf.blit(text, textRect)
+      menu.invalidate()
+      menu.pressed = None
+      self.scene = name
+      self.counts = None
+    label = self.clicked(menu)
+    menu.hover()
+    self.drawn += menu.draw()
+    return label
 
   def pause(self, size, labels):
     """
@@ -165,30 +492,10 @@ class UI(Menu):
         The label of the clicked button, or None if no button is clicked.
 
     Note:
-    This method creates an overlay surface, draws a menu surface on top of the overlay,
-    and then blits the menu surface onto the main surface. It also handles mouse clicks
-    to determine which button is clicked.
+    This method shows the menu over the frozen world through `overlay`. It also handles mouse
+    clicks to determine which button is clicked.
     """
-    width, height = self.surf.get_width(), self.surf.get_height()
-    overlay = pygame.Surface((width, height))
-    overlay.set_alpha(128)
-    overlay.fill('black')
-    self.surf.blit(overlay, (0, 0))
- 
-    font = pygame.font.Font('data/font/Pixellari.ttf', 64)
-    text = font.render('PAUSE', True, 'white')
-    textRect = text.get_rect()
-    textRect.center = (width/2, height/5)
-
-    menu_surf = pygame.Surface(size)
-    menu = Menu(menu_surf, (0,0), size, labels)
-    menu.draw()
-    pos = (width/2 - size[0]/2, height/2 - size[1]/2 + height/10)
-    self.surf.blit(menu_surf, pos)
-    label = menu.is_click(pos[0], pos[1])
-    self.surf.blit(text, textRect)
-
-    return label
+    return self.overlay('pause', 'PAUSE', size, labels)
   def complete(self, size, labels):
     """
     Displays a pause menu on the screen.
@@ -206,30 +513,10 @@ class UI(Menu):
         The label of the clicked button, or None if no button is clicked.
 
     Note:
-    This method creates an overlay surface, draws a menu surface on top of the overlay,
-    and then blits the menu surface onto the main surface. It also handles mouse clicks
-    to determine which button is clicked.
+    This method shows the menu over the frozen world through `overlay`. It also handles mouse
+    clicks to determine which button is clicked.
     """
-    width, height = self.surf.get_width(), self.surf.get_height()
-    overlay = pygame.Surface((width, height))
-    overlay.set_alpha(128)
-    overlay.fill('black')
-    self.surf.blit(overlay, (0, 0))
- 
-    font = pygame.font.Font('data/font/Pixellari.ttf', 64)
-    text = font.render('COMPLETE LEVEL', True, 'white')
-    textRect = text.get_rect()
-    textRect.center = (width/2, height/5)
-
-    menu_surf = pygame.Surface(size)
-    menu = Menu(menu_surf, (0,0), size, labels)
-    menu.draw()
-    pos = (width/2 - size[0]/2, height/2 - size[1]/2 + height/10)
-    self.surf.blit(menu_surf, pos)
-    label = menu.is_click(pos[0], pos[1])
-    self.surf.blit(text, textRect)
-
-    return label
+    return self.overlay('complete', 'COMPLETE LEVEL', size, labels)
   
   def retry(self, size, labels):
     """
@@ -248,29 +535,10 @@ class UI(Menu):
         The label of the clicked button, or None if no button is clicked.
 
     Note:
-    This method creates an overlay surface, draws a menu surface on top of the overlay,
-    and then blits the menu surface onto the main surface. It also handles mouse clicks
-    to determine which button is clicked.
+    This method shows the menu over the frozen world through `overlay`. It also handles mouse
+    clicks to determine which button is clicked.
     """
-    width, height = self.surf.get_width(), self.surf.get_height()
-    overlay = pygame.Surface((width, height))
-    overlay.set_alpha(128)
-    overlay.fill('black')
-    self.surf.blit(overlay, (0, 0))
-
-    font = pygame.font.Font('data/font/Pixellari.ttf', 64)
-    text = font.render('RETRY', True, 'white')
-    textRect = text.get_rect()
-    textRect.center = (width/2, height/5)
-
-    menu_surf = pygame.Surface(size)
-    menu = Menu(menu_surf, (0,0), size, labels)
-    menu.draw()
-    pos = (width/2 - size[0]/2, height/2 - size[1]/2 + height/10)
-    self.surf.blit(menu_surf, pos)
-    label = menu.is_click(pos[0], pos[1])
-    self.surf.blit(text, textRect)
-    return label
+    return self.overlay('retry', 'RETRY', size, labels)
 
   def main_menu(self, labels):
     """
@@ -287,14 +555,16 @@ class UI(Menu):
         The label of the clicked button, or None if no button is clicked.
 
     Note:
-    This method creates a Menu object with the given parameters, draws the menu on the surface,
-    and then handles mouse clicks to determine which button is clicked.
+    This method keeps a Menu object with the given parameters, draws what changed of the menu on
+    the surface, and then handles mouse clicks to determine which button is clicked.
     """
     width, height = self.surf.get_width(), self.surf.get_height()
 
-    menu = Menu(self.surf, (width//3, 200), (width//3, height//1.5), labels)
-    menu.draw()
-    return menu.is_click()
+    menu = self.menu('main menu', (width//3, 200), (width//3, height//1.5), labels)
+    label = self.clicked(menu)
+    menu.hover()
+    self.drawn = menu.draw()
+    return label
 
   def select_level(self, labels):
     """
@@ -311,39 +581,41 @@ class UI(Menu):
         The label of the clicked level button, or None if no button is clicked.
 
     Note:
-    This method creates a Menu object with the given parameters, draws the menu on the surface,
-    and then handles mouse clicks to determine which level button is clicked.
+    This method keeps a Menu object with the given parameters, draws what changed of the menu on
+    the surface, and then handles mouse clicks to determine which level button is clicked.
     The menu is positioned at (320, 200) with a size of (640, height//1.5) and displays the labels in 2 columns.
     """
     width, height = self.surf.get_width(), self.surf.get_height()
-    menu = Menu(self.surf, 
-                pos=  (320, 200), 
-                size= (640, height//1.5), 
-                labels= labels, 
-                collumns= 2)
-    menu.draw()
-    return menu.is_click()
+    menu = self.menu('select level',
+                     pos=  (320, 200), 
+                     size= (640, height//1.5), 
+                     labels= labels, 
+                     collumns= 2)
+    label = self.clicked(menu)
+    menu.hover()
+    self.drawn = menu.draw()
+    return label
   
   def shop(self, size, game):
-    width, height = self.surf.get_width(), self.surf.get_height()
-    overlay = pygame.Surface((width, height))
-    overlay.set_alpha(128)
-    overlay.fill('black')
-    self.surf.blit(overlay, (0, 0))
+    """
+    Displays the shop menu over the frozen world, with the coins and potions of the player
+    in a side panel, drawn again only when they change.
 
-    menu_surf = pygame.Surface(size)
+    Parameters:
+    ----------
+    size : tuple
+        The size of the shop menu as (width, height).
+    game : Game
+        The game, whose coins are spent on potions.
+
+    Returns:
+    ----------
+    str
+        The label of the clicked button, or None if no button is clicked.
+    """
+    width, height = self.surf.get_width(), self.surf.get_height()
     labels = ['Buy 1 potion\n(50 Coin)', 'Buy 5 potion\n(225 Coin)', 'Back']
-    menu = Menu(menu_surf, (0,0), size, labels)
-    menu.draw()
-    pos = (width/2 - size[0]/2, height/2 - size[1]/2 + height/10)
-    self.surf.blit(menu_surf, pos)
-    label = menu.is_click(pos[0], pos[1])
-    
-    font64 = pygame.font.Font('data/font/Pixellari.ttf', 64)
-    text = font64.render('Shop', True, 'white')
-    textRect = text.get_rect()
-    textRect.center = (width/2, height/5)
-    self.surf.blit(text, textRect)
+    label = self.overlay('shop', 'Shop', size, labels)
     
     if label == labels[0]:
       if game.coin >= 50:
@@ -356,17 +628,20 @@ class UI(Menu):
         game.potions += 5
         game.save_game()
 
+    if self.counts == (game.coin, game.potions):
+      return label
+    self.counts = (game.coin, game.potions)
+    pos = (width/2 - size[0]/2, height/2 - size[1]/2 + height/10)
     sidepanel_pos = (pos[0]/4, pos[1])
     sidepanel_size = (pos[0]/2, size[1]/2)
-    Button(self.surf, sidepanel_pos, sidepanel_size).draw()
+    self.drawn.append(Button(self.surf, sidepanel_pos, sidepanel_size).draw())
     coin_pos = [sidepanel_pos[0] * 1.2, sidepanel_pos[1] * 1.2]
     potions_pos = [sidepanel_pos[0] * 1.2, sidepanel_pos[1] * 1.4]
-    font32 = pygame.font.Font('data/font/Pixellari.ttf', 32)
-    coin_text = font32.render(str(game.coin), True, 'white')
+    coin_text = TEXT.render(str(game.coin), 32, 'white')
     coin_Rect = coin_text.get_rect()
     coin_Rect.topleft = [coin_pos[0]*1.25, coin_pos[1]]
 
-    potions_text = font32.render(str(game.potions), True, 'white')
+    potions_text = TEXT.render(str(game.potions), 32, 'white')
     potions_Rect = potions_text.get_rect()
     potions_Rect.topleft = [potions_pos[0]*1.25, potions_pos[1]]
 
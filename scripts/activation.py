@@ -0,0 +1,91 @@
+import pygame
+
+# Margins in pixels around the camera view
+ACTIVE_MARGIN = 200  # entities within it are updated every frame
+IDLE_MARGIN = 600    # entities within it are updated every IDLE_TICKS frames, frozen beyond it
+IDLE_TICKS = 4
+RENDER_MARGIN = 100  # entities are drawn only within it, their images overflow their rects
+
+class ActivationRegions:
+  def __init__(self, active_margin=ACTIVE_MARGIN, idle_margin=IDLE_MARGIN, idle_ticks=IDLE_TICKS, render_margin=RENDER_MARGIN):
+    """
+    Decide which entities of a level are updated and drawn each frame, from how far they are
+    from the camera view.
+
+    Entities near the view are updated every frame. Entities further away but within the idle
+    margin are updated every few frames, so they keep moving slowly, and entities beyond it are
+    frozen until the camera comes back. Only the entities around the view are drawn.
+    Entities whose class sets `always_active`, like the bosses and the flying bombs, are always
+    updated and drawn.
+    On a streamed map, no entity is updated over a chunk that is not loaded, even an always
+    active one: unloaded chunks collide as one solid rect, which would push it to the chunk edge.
+    The idle margin should stay within the chunks a streamed map keeps loaded around the view,
+    see STREAM_MARGIN, so idle entities never fall through tiles that are not loaded.
+
+    Parameters:
+    ----------
+    active_margin (int): The pixels around the view within which entities are updated every frame.
+    idle_margin (int): The pixels around the view within which entities are updated every idle_ticks frames.
+    idle_ticks (int): The frames between two updates of an idle entity.
+    render_margin (int): The pixels around the view within which entities are drawn.
+    active (pygame.Rect): The view grown by the active margin.
+    idle (pygame.Rect): The view grown by the idle margin.
+    visible (pygame.Rect): The view grown by the render margin.
+    frame (int): The frames seen so far.
+    counts (dict): Over the frames so far, the entities updated every frame ('active'), updated on
+        their idle turn ('idle'), not updated ('skipped') and drawn ('rendered').
+    """
+    self.active_margin = active_margin
+    self.idle_margin = idle_margin
+    self.idle_ticks = idle_ticks
+    self.render_margin = render_margin
+    self.active = None
+    self.idle = None
+    self.visible = None
+    self.frame = 0
+    self.counts = {'active': 0, 'idle': 0, 'skipped': 0, 'rendered': 0}
+
+  def focus(self, view):
+    """
+    Center the regions on the camera view, once per frame before the entities are updated.
+
+    Parameters:
+    ----------
+    view (pygame.Rect): The area the camera sees, in pixel coordinates.
+    """
+    self.active = view.inflate(self.active_margin * 2, self.active_margin * 2)
+    self.idle = view.inflate(self.idle_margin * 2, self.idle_margin * 2)
+    self.visible = view.inflate(self.render_margin * 2, self.render_margin * 2)
+    self.frame += 1
+
+  def updates(self, entity, tilemap):
+    """
+    Whether the entity is updated this frame.
+
+    Parameters:
+    ----------
+    entity (Entity): The entity.
+    tilemap (Tilemap): The tilemap the entity is on.
+    """
+    rect = entity.rect()
+    if not tilemap.resident(rect):
+      self.counts['skipped'] += 1
+      return False
+    if entity.always_active or self.active.colliderect(rect):
+      self.counts['active'] += 1
+      return True
+    # Idle entities take their turn on different frames, to spread their updates evenly
+    if self.idle.colliderect(rect) and (self.frame + id(entity) // 16) % self.idle_ticks == 0:
+      self.counts['idle'] += 1
+      return True
+    self.counts['skipped'] += 1
+    return False
+
+  def renders(self, entity):
+    """
+    Whether the entity is drawn this frame.
+    """
+    if entity.always_active or self.visible.colliderect(entity.rect()):
+      self.counts['rendered'] += 1
+      return True
+    return False
@@ -0,0 +1,254 @@
+from scripts.loader import load_many
+from scripts.utils import img_paths, Animation, DEFFAULT_SIZE
+
+# The images of each screen, key -> (path, size). A path to a directory loads every image in it as a list.
+LEVEL_IMAGES = {
+  'grass': ('tiles/grass', DEFFAULT_SIZE),
+  'grass_new': ('tiles/grass_new', DEFFAULT_SIZE),
+  'spawners': ('tiles/spawners', DEFFAULT_SIZE),
+  'dungeon': ('tiles/dungeon', DEFFAULT_SIZE),
+  'cave': ('tiles/cave', DEFFAULT_SIZE),
+  'sign': ('tiles/sign', DEFFAULT_SIZE),
+  'slab': ('tiles/slab', DEFFAULT_SIZE),
+  'objects': ('objects', DEFFAULT_SIZE),
+
+  'potion': ('hub/potion.png', (30,30)),
+  'background1': ('background/background.png', (1280,720)),
+  'background2': ('background/bg.png', (1280,720)),
+  'hud_health': ('hub/hud_health.png', (300, 100)),
+  'cooldown': ('hub/cooldown.png', (50,15)),
+  'coin': ('hub/coin.png', (30,30)),
+}
+
+# The animations of a level, key -> (path, size, duration)
+LEVEL_ANIMATIONS = {
+  'spike/idle': ('entities/spike/spike_idle', DEFFAULT_SIZE, 1),
+  'spike/attack': ('entities/spike/spike_attack', DEFFAULT_SIZE, 6),
+  'spike_fall/idle': ('entities/spike_fall/spike_fall_idle', DEFFAULT_SIZE, 4),
+  'spike_fall/attack': ('entities/spike_fall/spike_fall_attack', DEFFAULT_SIZE, 4),
+
+  'waterfall/idle': ('entities/waterfall', DEFFAULT_SIZE, 8),
+  'save/idle': ('entities/save/save_idle', DEFFAULT_SIZE, 8),
+  'save/save': ('entities/save/save_saving', DEFFAULT_SIZE, 8),
+  'coin/idle': ('entities/coin/coin_idle', (30,30), 8),
+  'coin/pickup': ('entities/coin/coin_pickup', (30,30), 8),
+  'orb/idle': ('entities/orb/orb_idle', (30,30), 8),
+  'orb/pickup': ('entities/orb/orb_pickup', (30,30), 8),
+  'vase/idle': ('entities/vase/vase_idle', DEFFAULT_SIZE, 4),
+  'vase/break': ('entities/vase/vase_breaking', DEFFAULT_SIZE, 8),
+
+  'player/idle': ('entities/hero/hero_idle', DEFFAULT_SIZE, 8),
+  'player/hit': ('entities/hero/hero_hit', DEFFAULT_SIZE, 4),
+  'player/run': ('entities/hero/hero_run', DEFFAULT_SIZE, 6),
+  'player/death': ('entities/hero/hero_death', DEFFAULT_SIZE, 8),
+  'player/jump_up': ('entities/hero/hero_jump_up', DEFFAULT_SIZE, 3),
+  'player/jump_down': ('entities/hero/hero_jump_down', DEFFAULT_SIZE, 3),
+  'player/jump_double': ('entities/hero/hero_jump_double', DEFFAULT_SIZE, 6),
+  'player/flash': ('entities/hero/hero_dust', DEFFAULT_SIZE, 4),
+  'player/spawn': ('entities/hero/hero_spawn', DEFFAULT_SIZE, 4),
+  'player/attack': ('entities/hero/hero_attack', DEFFAULT_SIZE, 4),
+  'sword/idle': ('entities/hero/hero_sword', DEFFAULT_SIZE, 4),
+
+  'bomber/idle': ('entities/bomber/bomber_goblin_idle', DEFFAULT_SIZE, 8),
+  'bomber/hit': ('entities/bomber/bomber_goblin_hit', DEFFAULT_SIZE, 4),
+  'bomber/attack': ('entities/bomber/bomber_goblin_attack', DEFFAULT_SIZE, 8),
+  'bomber/death': ('entities/bomber/bomber_goblin_death', DEFFAULT_SIZE, 6),
+  'bomb/idle': ('entities/bomb/bomb_idle', DEFFAULT_SIZE, 4),
+  'bomb/explode': ('entities/bomb/bomb_explode', (100,100), 4),
+
+  'goblin/idle': ('entities/goblin/goblin_idle', DEFFAULT_SIZE, 4),
+  'goblin/run': ('entities/goblin/goblin_run', DEFFAULT_SIZE, 6),
+  'goblin/hit': ('entities/goblin/goblin_hit', DEFFAULT_SIZE, 4),
+  'goblin/attack': ('entities/goblin/goblin_attack', DEFFAULT_SIZE, 8),
+  'goblin/death': ('entities/goblin/goblin_death', DEFFAULT_SIZE, 4),
+
+  'slime/idle': ('entities/slime/slime_idle', DEFFAULT_SIZE, 4),
+  'slime/run': ('entities/slime/slime_run', DEFFAULT_SIZE, 4),
+  'slime/hit': ('entities/slime/slime_hit', DEFFAULT_SIZE, 4),
+  'slime/death': ('entities/slime/slime_death', DEFFAULT_SIZE, 8),
+
+  'minotaur/idle': ('entities/minotaur/minotaur_idle', (200,200), 8),
+  'minotaur/run': ('entities/minotaur/minotaur_run', (200,200), 16),
+  'minotaur/hit': ('entities/minotaur/minotaur_hit', (200,200), 8),
+  'minotaur/attack': ('entities/minotaur/minotaur_attack4', (200,200), 4),
+  'minotaur/death': ('entities/minotaur/minotaur_death', (200,200), 62),
+}
+
+# The images of a level drawn every frame, whatever the map
+LEVEL_HUD = ['potion', 'hud_health', 'cooldown']
+
+# The entity each spawner variant spawns, and the entity the boss tile spawns
+SPAWNER_ENTITIES = {0: 'player', 1: 'bomber', 2: 'goblin', 3: 'slime', 4: 'save', 5: 'waterfall', 6: 'spike', 7: 'spike_fall', 8: 'vase'}
+BOSS_ENTITY = 'minotaur'
+
+# The entities each entity can create while the level runs, whose animations are loaded with it
+ENTITY_SPAWNS = {
+  'player': ['sword'],
+  'bomber': ['bomb', 'coin'],
+  'goblin': ['coin'],
+  'slime': ['coin'],
+  'minotaur': ['coin'],
+  'vase': ['coin'],
+  'coin': ['orb'],
+}
+
+MENU_IMAGES = {
+  'background': ('background/background.png', (1280, 720)),
+  't': ('text/t.png', (100, 100)),
+  'h': ('text/h.png', (100, 100)),
+  'e': ('text/e.png', (100, 100)),
+  'r': ('text/r.png', (100, 100)),
+  'o': ('text/o.png', (100, 100)),
+}
+
+# The tiles the editor places, in the order it cycles through them
+EDITOR_IMAGES = {
+  'grass': ('tiles/grass', DEFFAULT_SIZE),
+  'cave': ('tiles/cave', DEFFAULT_SIZE),
+  'dungeon': ('tiles/dungeon', DEFFAULT_SIZE),
+  'sign': ('tiles/sign', DEFFAULT_SIZE),
+  'slab': ('tiles/slab', DEFFAULT_SIZE),
+  'objects': ('objects', DEFFAULT_SIZE),
+  'grass_new': ('tiles/grass_new', DEFFAULT_SIZE),
+  'spawners': ('tiles/spawners', DEFFAULT_SIZE),
+  'boss': ('tiles/boss', (200,200)),
+}
+
+def load_assets(images, animations={}):
+  """
+  Load the images and animations of a spec, all in one `load_many` call so they decode in parallel.
+
+  Parameters:
+  ----------
+  images (dict): The images to load, key -> (path, size). Paths ending in .png load one image,
+      any other path every image of a directory, as a list.
+  animations (dict): The animations to load, key -> (path, size, duration).
+
+  Returns:
+  ----------
+  dict: The loaded images and Animation objects by key, in the order of the spec.
+  """
+  # key, image paths, size, whether it is a single image, animation duration or None
+  entries = []
+  for key in images:
+    path, size = images[key]
+    if path.endswith('.png'):
+      entries.append((key, [path], size, True, None))
+    else:
+      entries.append((key, img_paths(path), size, False, None))
+  for key in animations:
+    path, size, duration = animations[key]
+    entries.append((key, img_paths(path), size, False, duration))
+
+  imgs = load_many([(img_path, size) for key, paths, size, single, duration in entries for img_path in paths])
+  assets = {}
+  i = 0
+  for key, paths, size, single, duration in entries:
+    frames = imgs[i:i + len(paths)]
+    i += len(paths)
+    if duration is not None:
+      assets[key] = Animation(frames, duration=duration)
+    else:
+      assets[key] = frames[0] if single else frames
+  return assets
+
+def image_size(key):
+  """
+  Get the size the images of a key of LEVEL_IMAGES or EDITOR_IMAGES are scaled to, without
+  loading them, or None if neither spec has the key.
+  """
+  for images in (LEVEL_IMAGES, EDITOR_IMAGES):
+    if key in images:
+      return tuple(images[key][1])
+  return None
+
+def spawner_entity(kind):
+  """
+  Get the entity type a spawner tile spawns, from its (type, variant), or None if it is not a spawner.
+  """
+  if kind[0] == 'spawners':
+    return SPAWNER_ENTITIES.get(kind[1])
+  if kind[0] == 'boss':
+    return BOSS_ENTITY
+  return None
+
+def entity_assets(entity_types):
+  """
+  Get the keys of LEVEL_ANIMATIONS used by some entity types and by the entities they create.
+
+  Parameters:
+  ----------
+  entity_types (iterable): The entity types, None ones are skipped.
+
+  Returns:
+  ----------
+  list: The animation keys, in the order of LEVEL_ANIMATIONS.
+  """
+  types = set()
+  stack = [entity_type for entity_type in entity_types if entity_type is not None]
+  while stack:
+    entity_type = stack.pop()
+    if entity_type not in types:
+      types.add(entity_type)
+      stack += ENTITY_SPAWNS.get(entity_type, [])
+  return [key for key in LEVEL_ANIMATIONS if key.split('/')[0] in types]
+
+def level_manifest(tilemap, background=None):
+  """
+  List the assets a loaded map uses: the HUD, its background, the tile sets it draws and
+  the animations of the player and of the entities its spawners spawn.
+
+  On a streamed map only the chunks loaded so far are looked at.
+
+  Parameters:
+  ----------
+  tilemap (Tilemap): The loaded map.
+  background (str): The key of the background image the level draws, or None.
+
+  Returns:
+  ----------
+  list: The keys of LEVEL_IMAGES and LEVEL_ANIMATIONS to load.
+  """
+  kinds = set(tilemap.kinds) | {kind for kind in tilemap.offgrid_kinds if tilemap.offgrid_kinds[kind]}
+  keys = list(LEVEL_HUD) + ([background] if background is not None else [])
+  # Spawner tiles become entities and are never drawn
+  keys += sorted({kind[0] for kind in kinds if kind[0] in LEVEL_IMAGES and kind[0] != 'spawners'})
+  return keys + entity_assets(['player'] + [spawner_entity(kind) for kind in kinds])
+
+class LevelAssets(dict):
+  def __init__(self, images, animations={}):
+    """
+    The assets of a level, loaded from their specs only when the level asks for them.
+
+    `load` loads a list of keys at once, like the manifest of a map. Any other key of the specs
+    is loaded on its own the first time it is looked up, so nothing the manifest missed is ever
+    absent. `in` is true for every key of the specs, loaded or not.
+
+    Parameters:
+    ----------
+    images (dict): The images that can be loaded, key -> (path, size), see `load_assets`.
+    animations (dict): The animations that can be loaded, key -> (path, size, duration).
+    lazy (int): The keys loaded on their own, on first use, instead of by `load`.
+    """
+    super().__init__()
+    self.images = images
+    self.animations = animations
+    self.lazy = 0
+
+  def __contains__(self, key):
+    return super().__contains__(key) or key in self.images or key in self.animations
+
+  def __missing__(self, key):
+    if key not in self.images and key not in self.animations:
+      raise KeyError(key)
+    self.lazy += 1
+    self.load([key])
+    return super().__getitem__(key)
+
+  def load(self, keys):
+    """
+    Load the given keys not loaded yet, all in one `load_assets` call.
+    """
+    keys = [key for key in keys if not dict.__contains__(self, key)]
+    self.update(load_assets({key: self.images[key] for key in keys if key in self.images},
+                            {key: self.animations[key] for key in keys if key in self.animations}))
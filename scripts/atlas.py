@@ -0,0 +1,117 @@
+import json
+import os
+import sys
+import time
+import pygame
+
+from scripts.imagecache import BASE_IMG_PATH, ATLAS_PATH, ATLAS_MANIFEST
+from scripts.assets import LEVEL_IMAGES, LEVEL_ANIMATIONS, MENU_IMAGES, EDITOR_IMAGES
+
+SHEET_SIZE = 1024  # width and most height of a sheet
+MAX_FRAME = 256    # images larger than this on either side, like the backgrounds, are left in their own file
+SHEET_EXT = '.bmp' # sheets hold the scaled pixels, uncompressed they read several times faster than as PNG
+
+def spec_frames(specs):
+  """
+  List every image the given asset specs load, with the size they load it at.
+
+  Parameters:
+  ----------
+  specs : list of dict
+      Asset specs, see `scripts.assets`.
+
+  Returns:
+  ----------
+  list: The (path, size) of each image, once each, in spec order.
+  """
+  frames = []
+  for spec in specs:
+    for entry in spec.values():
+      path, size = entry[0], tuple(entry[1])
+      if path.endswith('.png'):
+        paths = [path]
+      else:
+        paths = [path + '/' + name for name in sorted(os.listdir(BASE_IMG_PATH + path))]
+      for frame_path in paths:
+        if (frame_path, size) not in frames:
+          frames.append((frame_path, size))
+  return frames
+
+def pack(sizes, sheet_size=SHEET_SIZE):
+  """
+  Place rects on sheets, in rows of decreasing height.
+
+  Parameters:
+  ----------
+  sizes : list of tuple
+      The (width, height) of each rect. None of them may be larger than a sheet.
+  sheet_size : int
+      The width and most height of a sheet.
+
+  Returns:
+  ----------
+  tuple: The (sheet, x, y) of each rect in the order given, and the used height of each sheet.
+  """
+  order = sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0]))
+  places = [None] * len(sizes)
+  heights = [0]
+  x = row_y = row_height = 0
+  for i in order:
+    w, h = sizes[i]
+    if x + w > sheet_size:
+      x, row_y, row_height = 0, row_y + row_height, 0
+    if row_y + h > sheet_size:
+      heights.append(0)
+      x = row_y = row_height = 0
+    places[i] = (len(heights) - 1, x, row_y)
+    x += w
+    row_height = max(row_height, h)
+    heights[-1] = max(heights[-1], row_y + row_height)
+  return places, heights
+
+def build(path=ATLAS_PATH, specs=(LEVEL_IMAGES, LEVEL_ANIMATIONS, MENU_IMAGES, EDITOR_IMAGES)):
+  """
+  Pack the images of the asset specs into sheets and write them with their manifest.
+
+  Each image is loaded and scaled exactly as load_img does, so a frame read from a sheet
+  has the same pixels. Needs a display mode set, for convert.
+
+  Parameters:
+  ----------
+  path : str
+      The directory to write the sheets and the manifest to.
+  specs : list of dict
+      The asset specs whose images are packed.
+
+  Returns:
+  ----------
+  dict: The manifest written, see `scripts.imagecache.Atlas`.
+  """
+  frames = [frame for frame in spec_frames(specs) if frame[1][0] <= MAX_FRAME and frame[1][1] <= MAX_FRAME]
+  places, heights = pack([size for frame_path, size in frames])
+  built = time.time()
+
+  sheets = [pygame.Surface((SHEET_SIZE, height)).convert() for height in heights]
+  for sheet in sheets:
+    sheet.fill((0, 0, 0))
+  manifest = {'built': built, 'sheets': [], 'frames': {}}
+  for (frame_path, size), (sheet, x, y) in zip(frames, places):
+    img = pygame.transform.scale(pygame.image.load(BASE_IMG_PATH + frame_path).convert(), size)
+    sheets[sheet].blit(img, (x, y))
+    manifest['frames'][frame_path + '@' + str(size[0]) + 'x' + str(size[1])] = [sheet, x, y, size[0], size[1]]
+
+  os.makedirs(path, exist_ok=True)
+  for i in range(len(sheets)):
+    manifest['sheets'].append('sheet' + str(i) + SHEET_EXT)
+    pygame.image.save(sheets[i], os.path.join(path, manifest['sheets'][-1]))
+  f = open(os.path.join(path, ATLAS_MANIFEST), 'w')
+  json.dump(manifest, f)
+  f.close()
+  return manifest
+
+if __name__ == '__main__':
+  # python -m scripts.atlas [data/atlas/]
+  pygame.init()
+  pygame.display.set_mode((1, 1), pygame.HIDDEN)
+  manifest = build(*sys.argv[1:2])
+  print(len(manifest['frames']), 'images packed into', len(manifest['sheets']), 'sheets')
@@ -0,0 +1,164 @@
+import math
+import time
+import pygame
+
+SFX_PATH = 'data/sfx/'
+
+# name -> (file within SFX_PATH, volume)
+SOUNDS = {
+  'jump': ('jump.wav', 0.5),
+  'explosion': ('explosion.wav', 0.025),
+  'sword': ('sword.wav', 0.2),
+  'hit': ('hit.wav', 0.5),
+  'spawn': ('spawn.mp3', 0.3),
+  'coin': ('coin.wav', 0.8),
+  'end': ('end.wav', 0.5),
+  'grass': ('grass_1.wav', 0.1),
+}
+
+# name -> (most voices of the sound playing at once, least seconds between two plays of it,
+#          most pixels from the listener it is heard from, or None if it is always heard)
+SOUND_LIMITS = {
+  'jump': (2, 0.05, None),
+  'explosion': (3, 0.1, 1000),
+  'sword': (2, 0.1, None),
+  'hit': (4, 0.03, 1000),
+  'spawn': (1, 0, None),
+  'coin': (3, 0.04, 1000),
+  'end': (1, 0, None),
+  'grass': (1, 0.25, None),
+}
+DEFAULT_LIMIT = (4, 0, None)
+DROP_REASONS = ('voices', 'cooldown', 'distance', 'channels')
+
+class SoundBank:
+  def __init__(self, specs=SOUNDS):
+    """
+    The sound effects of the game, each read from its file once per process and kept.
+
+    pygame.mixer.Sound decodes the whole file into the sample format the mixer was opened with,
+    so a kept sound plays without reading or converting anything again. Levels share the bank,
+    and loading a level again does no audio file I/O.
+    The kept Sound objects are shared, so their volume must not be changed for one level only.
+
+    Parameters:
+    ----------
+    specs (dict): The (file, volume) of each sound name, see SOUNDS.
+    sounds (dict): The loaded pygame.mixer.Sound of each sound name.
+    reads (int): The sound files read.
+    """
+    self.specs = specs
+    self.sounds = {}
+    self.reads = 0
+
+  def __getitem__(self, name):
+    if name not in self.sounds:
+      self.load([name])
+    return self.sounds[name]
+
+  def load(self, names=None):
+    """
+    Load the given sounds, or every sound of the specs, that are not loaded yet.
+    """
+    for name in self.specs if names is None else names:
+      if name not in self.sounds:
+        path, volume = self.specs[name]
+        sound = pygame.mixer.Sound(SFX_PATH + path)
+        sound.set_volume(volume)
+        self.sounds[name] = sound
+        self.reads += 1
+
+SOUND_BANK = SoundBank()
+
+class VoiceManager:
+  def __init__(self, sounds, limits=SOUND_LIMITS):
+    """
+    Play the sound effects of a level through per-sound limits, instead of calling
+    Sound.play directly.
+
+    Code that asks for a sound every frame, like the player footsteps, would otherwise start
+    a new copy each frame until every mixer channel is busy, then every other sound is lost.
+    A play request is dropped when the sound already plays on its most voices, when it was
+    started less than its least interval ago, or when it comes from further than its range
+    from the listener, usually the center of the camera. Requests that find every mixer channel
+    busy are counted as dropped too.
+
+    Parameters:
+    ----------
+    sounds (dict): The pygame.mixer.Sound of each sound name, or a SoundBank.
+    limits (dict): The (voices, interval, range) of each sound name, see SOUND_LIMITS.
+        Sounds not in it use DEFAULT_LIMIT.
+    listener (tuple): The position sounds are heard from, in pixel coordinates, or None to hear them everywhere.
+    last (dict): The time.monotonic() each sound was last started.
+    played (int): The play requests that started a sound.
+    dropped (dict): The play requests dropped, by sound name and then by reason, see DROP_REASONS.
+    """
+    self.sounds = sounds
+    self.limits = limits
+    self.listener = None
+    self.last = {}
+    self.played = 0
+    self.dropped = {}
+
+  def __getitem__(self, name):
+    return self.sounds[name]
+
+  def listen(self, pos):
+    """
+    Move the listener, once per frame after the camera moved.
+    """
+    self.listener = pos
+
+  def drop(self, name, reason):
+    """
+    Count a dropped play request.
+    """
+    if name not in self.dropped:
+      self.dropped[name] = dict.fromkeys(DROP_REASONS, 0)
+    self.dropped[name][reason] += 1
+
+  def play(self, name, pos=None, loops=0):
+    """
+    Play a sound, unless one of its limits drops the request.
+
+    Parameters:
+    ----------
+    name (str): The name of the sound.
+    pos (tuple, optional): Where the sound comes from, in pixel coordinates. None for sounds
+        that are always heard, like the ones of the player.
+    loops (int, optional): How many times to repeat the sound after it first plays.
+
+    Returns:
+    ----------
+    pygame.mixer.Channel: The channel the sound plays on, or None if it was dropped
+        or no channel was free.
+    """
+    sound = self.sounds[name]
+    voices, interval, reach = self.limits.get(name, DEFAULT_LIMIT)
+    now = time.monotonic()
+    if sound.get_num_channels() >= voices:
+      self.drop(name, 'voices')
+      return None
+    if name in self.last and now - self.last[name] < interval:
+      self.drop(name, 'cooldown')
+      return None
+    if reach is not None and pos is not None and self.listener is not None:
+      if math.hypot(pos[0] - self.listener[0], pos[1] - self.listener[1]) > reach:
+        self.drop(name, 'distance')
+        return None
+    channel = sound.play(loops)
+    if channel is None:
+      self.drop(name, 'channels')
+      return None
+    self.last[name] = now
+    self.played += 1
+    return channel
+
+  def stats(self):
+    """
+    Get the counters of the manager, the dropped requests summed by reason.
+    """
+    stats = {'played': self.played}
+    for reason in DROP_REASONS:
+      stats[reason] = sum(dropped[reason] for dropped in self.dropped.values())
+    return stats
@@ -0,0 +1,112 @@
+import queue
+import threading
+import time
+
+from scripts.mapfile import MAP_EXT, write_map, write_json
+
+AUTOSAVE_DELAY = 1.0  # seconds without edits before a changed map is saved
+
+class AutoSaver:
+  def __init__(self, tilemap, path, delay=AUTOSAVE_DELAY):
+    """
+    Save a tilemap in the background once it has been left unedited for a while.
+
+    The tilemap is copied on the main thread and written on a background thread,
+    so editing never waits on serializing the map or on the disk. Writes go through
+    `scripts.mapfile`, which replaces the file atomically.
+
+    Parameters:
+    ----------
+    tilemap (Tilemap): The tilemap to save.
+    path (str): The map file to save to, binary if it ends in MAP_EXT, JSON otherwise.
+    delay (float): The seconds without edits to wait before saving.
+    saved (int): The tilemap version last handed to the background thread.
+    seen (int): The tilemap version at the last call to `update`.
+    changed (float): The time of the first update that saw the latest edit, or None if there is nothing to save.
+    failed (bool): Whether the last write failed, so the tilemap is saved again even without new edits.
+    """
+    self.tilemap = tilemap
+    self.path = path
+    self.delay = delay
+    self.saved = tilemap.version
+    self.seen = tilemap.version
+    self.changed = None
+    self.failed = False
+    self.requests = queue.Queue()
+    self.thread = threading.Thread(target=self.work, daemon=True)
+    self.thread.start()
+
+  def work(self):
+    """
+    Write the requested copies of the map until `close` is called. Runs on the background thread.
+
+    When several copies are queued only the newest is written.
+    """
+    while True:
+      request = self.requests.get()
+      done = 1
+      closing = request is None
+      while not closing:
+        try:
+          newer = self.requests.get_nowait()
+        except queue.Empty:
+          break
+        done += 1
+        if newer is None:
+          closing = True
+        else:
+          request = newer
+      if request is not None:
+        try:
+          if self.path.endswith(MAP_EXT):
+            write_map(self.path, *request)
+          else:
+            write_json(self.path, *request)
+        except (OSError, ValueError) as e:
+          print('Error saving map:', e)
+          self.failed = True
+      for i in range(done):
+        self.requests.task_done()
+      if closing:
+        return
+
+  def dirty(self):
+    """
+    Whether the tilemap has edits not handed to the background thread yet, or the last write failed.
+    """
+    return self.tilemap.version != self.saved or self.failed
+
+  def update(self):
+    """
+    Save the tilemap if it changed and has not been edited for `delay` seconds. Call once per frame.
+    """
+    if self.tilemap.version != self.seen:
+      self.seen = self.tilemap.version
+      self.changed = time.monotonic()
+    if self.changed is not None and time.monotonic() - self.changed >= self.delay:
+      self.save()
+
+  def save(self):
+    """
+    Hand a copy of the tilemap to the background thread, if it has unsaved edits.
+    """
+    if self.dirty():
+      self.failed = False
+      self.requests.put((self.tilemap.size, dict(self.tilemap.tilemap), list(self.tilemap.offgrid)))
+      self.saved = self.tilemap.version
+    self.changed = None
+
+  def flush(self):
+    """
+    Save the tilemap now and wait until every save is on disk.
+    """
+    self.save()
+    self.requests.join()
+
+  def close(self):
+    """
+    Flush the tilemap and stop the background thread.
+    """
+    self.flush()
+    self.requests.put(None)
+    self.thread.join()
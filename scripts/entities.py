@@ -23,7 +23,10 @@ class Entity:
   hit(self, dmg): Handles the entity being hit.
   set_action(self, action): Sets the current action of the entity.
   rect(self): Sets the rectangle
+  sees(self, tilemap, entity): Checks whether another entity is in sight.
   """
+  sight = 400
+  always_active = False  # updated and drawn however far from the camera, see ActivationRegions
 
   def __init__(self, game, type, pos, size, hp = 100, dmg = 25, speed=1, attack_speed = 60, coin = 0):
     self.game = game
@@ -68,6 +71,26 @@ class Entity:
     """
     return pygame.Rect(self.pos[0], self.pos[1], self.size[0], self.size[1])
 
+  def sees(self, tilemap, entity):
+    """
+    Check whether another entity is within sight distance, standing on about the same floor,
+    with no solid tile between their centers.
+
+    Parameters:
+    -----------
+    tilemap : Tilemap
+        The tilemap the entities are on.
+    entity : Entity
+        The entity to look for, usually the player.
+    """
+    rect = self.rect()
+    other = entity.rect()
+    if abs(rect.bottom - other.bottom) > tilemap.size:
+      return False
+    if abs(rect.centerx - other.centerx) > self.sight:
+      return False
+    return tilemap.raycast(rect.center, other.center)[0] is None
+
   def set_action(self, action):
     """
     Sets the action of the entity and updates the animation.
@@ -100,7 +123,7 @@ class Entity:
     # Update entity position x ----------------------------------------------------------------
     self.pos[0] += movement[0] * self.speed
     entity_rect = self.rect()
-    for rect in tilemap.physics_rects_around(self.pos):
+    for rect in tilemap.physics_rects_in(entity_rect):
       if entity_rect.colliderect(rect):
         if movement[0] >= 0:
           entity_rect.right = rect.left
@@ -113,7 +136,7 @@ class Entity:
     # Update entity position y ----------------------------------------------------------------
     self.pos[1] += movement[1]
     entity_rect = self.rect()
-    for rect in tilemap.physics_rects_around(self.pos):
+    for rect in tilemap.physics_rects_in(entity_rect):
       if entity_rect.colliderect(rect):
         if movement[1] >= 0:
           entity_rect.bottom = rect.top
@@ -150,9 +173,14 @@ class Entity:
     -----------
     surf (pygame.Surface): The surface to render the entity to.
     offset (tuple): The offset to apply to the position of the entity when rendering.
+
+    Returns:
+    -----------
+    pygame.Rect: The area of the surface drawn on, or a list of areas for entities drawing
+        more than their image, like the health bar of the Minotaur.
     """
-    asset = pygame.transform.flip(self.animation.img(), self.flip, False)
-    surf.blit(asset, (self.pos[0] - offset[0] + self.animation_offset[0], self.pos[1] - offset[1] + self.animation_offset[1]))
+    asset = self.animation.img(self.flip)
+    return surf.blit(asset, (self.pos[0] - offset[0] + self.animation_offset[0], self.pos[1] - offset[1] + self.animation_offset[1]))
  
   def hit(self, dmg, nock = 0):
     """
@@ -171,7 +199,7 @@ class Entity:
     coin : int
         The amount of coin the entity gives.
     """
-    self.game.sfx['hit'].play()
+    self.game.sfx.play('hit', self.rect().center)
     self.velocity[0] += nock
     self.velocity[1] -= abs(nock/2)
     self.hp -= dmg
@@ -234,11 +262,11 @@ class Player(Entity):
       self.dead -= 1
 
     if self.spawn > 0:
-      self.game.sfx['spawn'].play()
+      self.game.sfx.play('spawn')
       self.spawn -= 1
       self.set_action('spawn')
     elif self.hp <= 0:
-      self.game.sfx['end'].play(0)
+      self.game.sfx.play('end')
       self.set_action('death')
     elif self.air_time > 1 and self.jumps == 0 and self.velocity[1] < 5:
       self.set_action('jump_double')
@@ -249,7 +277,7 @@ class Player(Entity):
     elif self.hitting > 0:
       self.set_action('hit')
     elif movement[0] != 0:
-      self.game.sfx['grass'].play()
+      self.game.sfx.play('grass')
       self.set_action('run')
     elif self.flashing != 0 and self.velocity[0] != 0:
       self.set_action('flash')
@@ -275,7 +303,7 @@ class Player(Entity):
   def jump(self):
     if self.jumps == 2:
       self.jumps -= 1
-      self.game.sfx['jump'].play()
+      self.game.sfx.play('jump')
       self.velocity[1] -= 18
     elif self.jumps == 1 and self.mana >= 75:   
       self.jumps -= 1
@@ -300,7 +328,7 @@ class Player(Entity):
 
   def regen(self):
     if self.game.potions > 0:
-      self.game.sfx['coin'].play()
+      self.game.sfx.play('coin')
       self.game.potions -= 1
       self.hp += 30
       if self.hp < 100:
@@ -320,12 +348,17 @@ class Player(Entity):
         The surface on which the player attacks.
     offset : tuple
         The offset of the surface.
+
+    Returns
+    -------
+    pygame.Rect
+        The area of the surface the sword was drawn on, or None if the player did not attack.
     """
     if self.attack_cd < 0:
       self.attack_cd = self.attack_speed
       if self.attacking <= -1:
         self.attacking = 10
-        self.game.sfx['sword'].play()
+        self.game.sfx.play('sword')
 
         if self.flip:
           sw = Sword(self.game, (self.pos[0] - self.size[0], self.pos[1]), self.size)
@@ -334,13 +367,15 @@ class Player(Entity):
           sw = Sword(self.game, (self.pos[0] + self.size[0], self.pos[1]), self.size)
 
         sw_rect = pygame.Rect(sw.pos[0], sw.pos[1], sw.size[0], sw.size[1])
-        sw.render(surf, offset)
+        drawn = sw.render(surf, offset)
 
         for enemy in enemies:
           if enemy.type in ENEMIES:
             e_rect=enemy.rect()
             if sw_rect.colliderect(e_rect):
               enemy.hit(self.dmg, 10 if self.pos[0] < enemy.pos[0] else -10)
+        return drawn
+    return None
 
 class Sword(Entity):
   """
@@ -490,6 +525,8 @@ class Bomb(Entity):
   update(self, tilemap, movement)
       Updates the bomb entity.
   """
+  always_active = True  # a bomb flies until it explodes, even out of view
+
   def __init__(self, game, pos, d_pos):
     """
     Initializes the bomb entity.
@@ -544,7 +581,7 @@ class Bomb(Entity):
       self.size = (100,100)
       self.pos[0] = pos[0] + self.size[0]
     elif self.exploding  == -5:
-      self.game.sfx['explosion'].play()
+      self.game.sfx.play('explosion', self.rect().center)
       rect = self.rect()
       player = self.game.player
       if rect.colliderect(player.rect()):
@@ -601,7 +638,7 @@ class Goblin(Entity):
     self.attack_cd -= 1
     self.attacking -= 1
 
-    if self.pos[1] == player.pos[1]:
+    if self.sees(tilemap, player):
       if self.pos[0]+ self.size[0] < player.pos[0] :
         self.flipped = True
         movement = (movement[0] - 0.5 if movement[0] > 0 else 0.5, movement[1])
@@ -835,7 +872,7 @@ class SavePoint(Entity):
     if p_rect.colliderect(self.rect()):
       self.set_action('save')
       self.game.coin += 100
-      self.game.sfx['spawn'].play()
+      self.game.sfx.play('spawn', self.rect().center)
       self.game.complete_level = True
     
     super().update(tilemap, movement)
@@ -883,7 +920,7 @@ class Coin(Entity):
       if self.pickup <= 0:
         self.game.coin += self.coin
         self.game.player.coin += self.coin
-        self.game.sfx['coin'].play()
+        self.game.sfx.play('coin', self.rect().center)
         self.game.enemies.remove(self)
     super().update(tilemap, movement=movement)
 
@@ -900,7 +937,7 @@ class Orb(Entity):
       if self.pickup <= 0:
         hp_loss = 100 - self.game.player.hp
         self.game.player.hp += self.hp if hp_loss > self.hp else hp_loss 
-        self.game.sfx['coin'].play()
+        self.game.sfx.play('coin', self.rect().center)
         self.game.enemies.remove(self)
     super().update(tilemap, movement=movement)
 
@@ -996,6 +1033,9 @@ class Spike_fall(Entity):
         self.game.enemies.remove(self)
 
 class Minotaur(Entity):
+  sight = 800
+  always_active = True
+
   def __init__(self, game, pos, size):
     super().__init__(game, type='minotaur', pos=pos, size=size, 
                      hp=1000, dmg=20, attack_speed=180, speed=3,
@@ -1008,7 +1048,7 @@ class Minotaur(Entity):
     self.attack_cd -= 1
     self.attacking -= 1
 
-    if self.pos[1] + (self.size[1] - player.size[1]== player.pos[1] ):
+    if self.sees(tilemap, player):
       if self.pos[0] < player.pos[0] :
         self.flipped = True
         movement = (movement[0] - 0.5 if movement[0] > 0 else 0.5, movement[1])
@@ -1072,12 +1112,13 @@ class Minotaur(Entity):
       player.hit(self.dmg, 20 if self.pos[0] < player.pos[0] else -20)
 
   def render(self, surf, offset):
-    super().render(surf, offset)
+    rect = super().render(surf, offset)
     hp_percent = (self.hp)/1000
     hp_size = (500, 20)
     hp_pos = ((surf.get_width() - hp_size[0])/2, 30)
-    pygame.draw.rect(surf, (40,40,40), (hp_pos[0]-2, hp_pos[1]-2, hp_size[0]+4, hp_size[1]+4), 0, 10)
+    bar = pygame.draw.rect(surf, (40,40,40), (hp_pos[0]-2, hp_pos[1]-2, hp_size[0]+4, hp_size[1]+4), 0, 10)
     pygame.draw.rect(surf, 'red', (hp_pos[0], hp_pos[1], hp_size[0]*hp_percent, hp_size[1]), 0, 10)
+    return [rect, bar]
 
 class Vase(Entity):
   def __init__(self, game, pos, size):
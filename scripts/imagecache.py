@@ -0,0 +1,368 @@
+import collections
+import json
+import mmap
+import os
+import pygame
+
+BASE_IMG_PATH = 'data/imgs/'
+ATLAS_PATH = 'data/atlas/'
+ATLAS_MANIFEST = 'manifest.json'
+SPRITE_CACHE_PATH = 'data/cache/'
+SPRITE_CACHE_PACK = 'sprites.pack'
+SPRITE_CACHE_INDEX = 'sprites.json'
+SPRITE_CACHE_WASTE = 4 * 1024 * 1024  # bytes of stale pixels in the pack before it is rewritten without them
+ASSET_CACHE_LIMIT = 64 * 1024 * 1024  # most bytes of pixels kept by the asset cache
+
+def surface_bytes(img):
+  """
+  Get the bytes of pixels held by a surface.
+  """
+  return img.get_width() * img.get_height() * img.get_bytesize()
+
+class AssetCache:
+  def __init__(self, limit=ASSET_CACHE_LIMIT):
+    """
+    Keep the images loaded by load_img and load_imgs for the whole process, so levels and
+    menus loaded again reuse them instead of reading, decoding and scaling the files again.
+
+    Images are keyed by (path, size). Once their pixels take more than limit bytes,
+    the least recently used ones are dropped.
+    The cached surfaces are shared, so they must not be drawn on or changed. Copy them first.
+
+    Parameters:
+    ----------
+    limit (int): The most bytes of pixels to keep.
+    images (OrderedDict): The cached surfaces keyed by (path, size), least recently used first.
+    listings (dict): The sorted file names of each directory loaded by load_imgs.
+    bytes (int): The bytes of pixels held by the cached surfaces.
+    hits (int): The images found in the cache.
+    misses (int): The images loaded from disk.
+    evictions (int): The images dropped to stay under the limit.
+    """
+    self.limit = limit
+    self.images = collections.OrderedDict()
+    self.listings = {}
+    self.bytes = 0
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+
+  def get(self, key):
+    """
+    Get a cached surface and mark it as recently used, or None if it is not cached.
+    """
+    img = self.images.get(key)
+    if img is None:
+      self.misses += 1
+      return None
+    self.hits += 1
+    self.images.move_to_end(key)
+    return img
+
+  def put(self, key, img):
+    """
+    Cache a surface, dropping the least recently used ones if the cache goes over its limit.
+    """
+    if key in self.images:
+      self.bytes -= surface_bytes(self.images.pop(key))
+    self.images[key] = img
+    self.bytes += surface_bytes(img)
+    while self.bytes > self.limit and len(self.images) > 1:
+      self.bytes -= surface_bytes(self.images.popitem(last=False)[1])
+      self.evictions += 1
+
+  def listing(self, path):
+    """
+    Get the sorted file names of a directory, listing it only the first time.
+    """
+    if path not in self.listings:
+      self.listings[path] = sorted(os.listdir(path))
+    return self.listings[path]
+
+  def stats(self):
+    """
+    Get the counters of the cache, to report how much loading it saved.
+    """
+    return {'images': len(self.images), 'bytes': self.bytes, 'hits': self.hits,
+            'misses': self.misses, 'evictions': self.evictions}
+
+  def clear(self):
+    """
+    Drop every cached image and listing and reset the counters.
+    """
+    self.images.clear()
+    self.listings.clear()
+    self.bytes = 0
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+
+ASSETS = AssetCache()
+
+class Atlas:
+  def __init__(self, path=ATLAS_PATH):
+    """
+    Images packed into a few sheets by scripts/atlas.py, read from the sheets instead of one file each.
+
+    Each image is a subsurface of its sheet, at the size it was packed for, so drawing it
+    blits straight from the sheet. Images without a packed frame, or whose file changed
+    after the atlas was built, are loaded from their own file as before.
+    The manifest and the sheets are read the first time an image is looked up.
+
+    Parameters:
+    ----------
+    path (str): The directory holding the manifest and the sheets.
+    frames (dict): The sheet and rect of each packed image, keyed by "path@widthxheight", or None before the manifest is read.
+    built (float): The time the atlas was built.
+    sheets (list): The file names of the sheets.
+    surfaces (dict): The sheets read so far, by index.
+    served (int): The images read from the sheets.
+    """
+    self.path = path
+    self.frames = None
+    self.built = 0
+    self.sheets = []
+    self.surfaces = {}
+    self.served = 0
+
+  def read_manifest(self):
+    """
+    Read the manifest of the atlas, or leave it empty if the atlas has not been built.
+    """
+    self.frames = {}
+    try:
+      f = open(os.path.join(self.path, ATLAS_MANIFEST), 'r')
+    except OSError:
+      return
+    manifest = json.load(f)
+    f.close()
+    self.frames = manifest['frames']
+    self.built = manifest['built']
+    self.sheets = manifest['sheets']
+
+  def frame(self, path, size):
+    """
+    Get a packed image as a subsurface of its sheet, with the colorkey set to black.
+
+    Parameters:
+    ----------
+    path (str): The relative path to the image file within the BASE_IMG_PATH directory.
+    size (tuple): The size of the image.
+
+    Returns:
+    ----------
+    pygame.Surface: The image, or None if it is not packed or is out of date.
+    """
+    if self.frames is None:
+      self.read_manifest()
+    entry = self.frames.get(path + '@' + str(size[0]) + 'x' + str(size[1]))
+    if entry is None or os.path.getmtime(BASE_IMG_PATH + path) > self.built:
+      return None
+    sheet, x, y, w, h = entry
+    if sheet not in self.surfaces:
+      self.surfaces[sheet] = pygame.image.load(os.path.join(self.path, self.sheets[sheet])).convert()
+      self.surfaces[sheet].set_colorkey((0,0,0))
+    self.served += 1
+    return self.surfaces[sheet].subsurface((x, y, w, h))
+
+ATLAS = Atlas()
+
+class SpriteCache:
+  def __init__(self, path=SPRITE_CACHE_PATH):
+    """
+    Keep the scaled pixels of every image loaded from its own file on disk, so the next run
+    copies them straight into a surface instead of decoding and scaling the file again.
+
+    The pixels of every image are appended to a single pack file, which is mapped in memory,
+    since opening one file per image costs more than decoding small images does. An index
+    maps "path@widthxheight" to the modification time of the source file when it was cached
+    and to the place of its pixels in the pack. An entry whose source file changed since is
+    ignored and replaced on the next load. The whole cache is ignored if the display format
+    differs from the one it was written in.
+    The index is read the first time an image is looked up, and written by `save`.
+
+    Parameters:
+    ----------
+    path (str): The directory holding the pack and its index, or None to cache nothing.
+    entries (dict): The [mtime_ns, offset, length] of each cached image, keyed like the atlas frames,
+        or None before the index is read.
+    format (list): The bytes per pixel and the color masks of the display the pixels were written for.
+    data (mmap.mmap): The pack file mapped in memory, or None if it is empty or not read yet.
+    size (int): The bytes written to the pack, including stale ones.
+    stale (int): The bytes of the pack no entry points to anymore.
+    pending (list): The (key, mtime_ns, pixels) of the images put since the last `save`.
+    served (int): The images read from the pack.
+    written (int): The images added to the pack.
+    """
+    self.path = path
+    self.entries = None
+    self.format = None
+    self.data = None
+    self.size = 0
+    self.stale = 0
+    self.pending = []
+    self.served = 0
+    self.written = 0
+
+  def display_format(self):
+    """
+    Get the bytes per pixel and the color masks of the display, or None if no display mode is set.
+    """
+    display = pygame.display.get_surface()
+    if display is None:
+      return None
+    return [display.get_bytesize()] + list(display.get_masks())
+
+  def read_index(self):
+    """
+    Read the index and map the pack, or start empty if there is no cache or it was written
+    for another display format.
+    """
+    self.entries = {}
+    self.format = self.display_format() if self.path is not None else None
+    self.data = None
+    self.size = self.stale = 0
+    if self.format is None:
+      return
+    try:
+      f = open(os.path.join(self.path, SPRITE_CACHE_INDEX), 'r')
+      index = json.load(f)
+      f.close()
+      f = open(os.path.join(self.path, SPRITE_CACHE_PACK), 'rb')
+      self.size = os.fstat(f.fileno()).st_size
+      if self.size:
+        self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+      f.close()
+    except (OSError, ValueError):
+      self.size = 0
+      return
+    if index['format'] != self.format or index['size'] != self.size:
+      # Written for another display, or the pack was cut short: start over
+      self.close()
+      self.size = 0
+      return
+    self.entries = index['entries']
+    self.stale = self.size - sum(entry[2] for entry in self.entries.values())
+
+  def frame(self, path, size):
+    """
+    Get a cached image as a new surface in the display format, with the colorkey set to black.
+
+    Parameters:
+    ----------
+    path (str): The relative path to the image file within the BASE_IMG_PATH directory.
+    size (tuple): The size of the image.
+
+    Returns:
+    ----------
+    pygame.Surface: The image, or None if it is not cached, its file changed, or no display mode is set.
+    """
+    if self.entries is None:
+      self.read_index()
+    entry = self.entries.get(path + '@' + str(size[0]) + 'x' + str(size[1]))
+    if entry is None or self.format is None or os.stat(BASE_IMG_PATH + path).st_mtime_ns != entry[0]:
+      return None
+    mtime, offset, length = entry
+    if self.data is None or offset + length > len(self.data):
+      self.remap()
+    img = pygame.Surface(size, 0, pygame.display.get_surface())
+    if img.get_pitch() * img.get_height() != length:
+      return None
+    # Copy straight from the mapped pack into the pixels, without a bytes object in between
+    with memoryview(img.get_buffer()) as pixels, memoryview(self.data) as data:
+      pixels[:] = data[offset:offset + length]
+    img.set_colorkey((0,0,0))
+    self.served += 1
+    return img
+
+  def remap(self):
+    """
+    Map the pack again, to see the pixels appended to it since it was mapped.
+    """
+    if self.data is not None:
+      self.data.close()
+    f = open(os.path.join(self.path, SPRITE_CACHE_PACK), 'rb')
+    self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    f.close()
+
+  def put(self, path, size, img):
+    """
+    Queue the pixels of a scaled image to be appended to the pack by the next `save`,
+    replacing the entry it had. Does nothing without a display mode, or if the image is
+    not in the display format.
+    """
+    if self.entries is None:
+      self.read_index()
+    if self.format is None or [img.get_bytesize()] + list(img.get_masks()) != self.format:
+      return
+    key = path + '@' + str(size[0]) + 'x' + str(size[1])
+    self.pending.append((key, os.stat(BASE_IMG_PATH + path).st_mtime_ns, img.get_buffer().raw))
+
+  def save(self):
+    """
+    Append the queued pixels to the pack and write the index, first rewriting the pack
+    without its stale pixels if they take more than SPRITE_CACHE_WASTE bytes.
+    """
+    if not self.pending:
+      return
+    os.makedirs(self.path, exist_ok=True)
+    f = open(os.path.join(self.path, SPRITE_CACHE_PACK), 'ab' if self.size else 'wb')
+    for key, mtime, pixels in self.pending:
+      f.write(pixels)
+      if key in self.entries:
+        self.stale += self.entries[key][2]
+      self.entries[key] = [mtime, self.size, len(pixels)]
+      self.size += len(pixels)
+    f.close()
+    self.written += len(self.pending)
+    self.pending = []
+    if self.stale > SPRITE_CACHE_WASTE:
+      self.compact()
+    index = os.path.join(self.path, SPRITE_CACHE_INDEX)
+    f = open(index + '.tmp', 'w')
+    json.dump({'format': self.format, 'size': self.size, 'entries': self.entries}, f)
+    f.close()
+    os.replace(index + '.tmp', index)
+
+  def compact(self):
+    """
+    Rewrite the pack with only the pixels the entries point to.
+    """
+    self.remap()
+    pack = os.path.join(self.path, SPRITE_CACHE_PACK)
+    f = open(pack + '.tmp', 'wb')
+    offset = 0
+    for entry in self.entries.values():
+      f.write(self.data[entry[1]:entry[1] + entry[2]])
+      entry[1] = offset
+      offset += entry[2]
+    f.close()
+    self.close()
+    os.replace(pack + '.tmp', pack)
+    self.size = offset
+    self.stale = 0
+
+  def close(self):
+    """
+    Unmap the pack.
+    """
+    if self.data is not None:
+      self.data.close()
+      self.data = None
+
+  def clear(self):
+    """
+    Delete the pack and its index, and start over empty.
+    """
+    self.close()
+    for name in (SPRITE_CACHE_PACK, SPRITE_CACHE_INDEX) if self.path is not None else ():
+      try:
+        os.remove(os.path.join(self.path, name))
+      except OSError:
+        pass
+    self.entries = None
+    self.pending = []
+    self.served = 0
+    self.written = 0
+
+SPRITES = SpriteCache()
@@ -0,0 +1,125 @@
+import atexit
+import concurrent.futures
+import os
+import time
+import pygame
+
+from scripts import imagecache
+from scripts.imagecache import BASE_IMG_PATH, ASSETS
+from scripts.profiler import PROFILER
+
+LOADER_THREADS = min(8, os.cpu_count() or 1)  # threads decoding and scaling images in load_many, none if 1
+LOADER_BATCHES = 4  # batches of images handed to each loader thread, few so the threads do not wait on each other
+
+def save_sprites():
+  """
+  Write the images queued in the SPRITES cache since it was last saved. Images loaded one by one
+  through load_img are only queued, this writes them all at once, and runs at exit.
+  """
+  imagecache.SPRITES.save()
+
+atexit.register(save_sprites)
+
+def decode_img(path):
+  """
+  Read an image file, without converting it to the display format.
+  Safe to run off the main thread. pygame releases the GIL while it decodes the file,
+  so decoding runs in parallel across loader threads.
+  """
+  return pygame.image.load(BASE_IMG_PATH + path)
+
+def decode_imgs(paths):
+  """
+  Decode a batch of image files, see `decode_img`.
+  """
+  return [decode_img(path) for path in paths]
+
+def finish_img(img, size):
+  """
+  Convert a decoded image to the display format, resize it and set the colorkey to black.
+  Main thread only. Scaling holds the GIL, so it would not run in parallel on the loader threads either.
+  """
+  img = pygame.transform.scale(img.convert(), size)
+  img.set_colorkey((0,0,0))
+  return img
+
+LOADER = None
+
+def loader():
+  """
+  Get the thread pool of load_many, starting it the first time.
+  """
+  global LOADER
+  if LOADER is None:
+    LOADER = concurrent.futures.ThreadPoolExecutor(max_workers=LOADER_THREADS, thread_name_prefix='loader')
+  return LOADER
+
+def load_many(imgs):
+  """
+  Load many images at once, like load_img. The ones not cached, packed in the ATLAS or in the
+  SPRITES cache on disk are decoded in batches on LOADER_THREADS threads, then converted and
+  resized on the calling thread as each batch comes back. With a single loader thread they are
+  decoded on the calling thread. The time of each step is added to the open PROFILER section.
+
+  Parameters:
+  ----------
+  imgs (list): The (path, size) of each image to load.
+
+  Returns:
+  ----------
+  list: The loaded images, in the order given.
+  """
+  loaded = [None] * len(imgs)
+  pending = {}
+  start = time.perf_counter()
+  read_time = 0
+  read = 0
+  for i in range(len(imgs)):
+    path, size = imgs[i]
+    key = (path, tuple(size))
+    if key in pending:
+      pending[key].append(i)
+      continue
+    img = ASSETS.get(key)
+    if img is None:
+      read_start = time.perf_counter()
+      img = imagecache.ATLAS.frame(path, size)
+      if img is None:
+        img = imagecache.SPRITES.frame(path, size)
+      read_time += time.perf_counter() - read_start
+      if img is None:
+        pending[key] = [i]
+        continue
+      read += 1
+      ASSETS.put(key, img)
+    loaded[i] = img
+  PROFILER.add('asset cache', time.perf_counter() - start - read_time, len(imgs) - read - len(pending))
+  PROFILER.add('atlas and sprite cache', read_time, read)
+
+  keys = list(pending)
+  decode_time = finish_time = 0
+  if LOADER_THREADS > 1 and len(keys) > 1:
+    count = min(len(keys), LOADER_THREADS * LOADER_BATCHES)
+    batches = [keys[i * len(keys) // count:(i + 1) * len(keys) // count] for i in range(count)]
+    futures = [loader().submit(decode_imgs, [key[0] for key in batch]) for batch in batches]
+  else:
+    batches = [keys]
+    futures = None
+  for b in range(len(batches)):
+    start = time.perf_counter()
+    decoded = futures[b].result() if futures else decode_imgs([key[0] for key in batches[b]])
+    decode_time += time.perf_counter() - start
+    for key, img in zip(batches[b], decoded):
+      start = time.perf_counter()
+      img = finish_img(img, key[1])
+      finish_time += time.perf_counter() - start
+      imagecache.SPRITES.put(key[0], key[1], img)
+      ASSETS.put(key, img)
+      for i in pending[key]:
+        loaded[i] = img
+  PROFILER.add('decode', decode_time, len(keys))
+  PROFILER.add('convert and scale', finish_time, len(keys))
+  start = time.perf_counter()
+  imagecache.SPRITES.save()
+  PROFILER.add('sprite cache write', time.perf_counter() - start, len(keys))
+  return loaded
@@ -0,0 +1,254 @@
+import json
+import os
+import struct
+import sys
+
+MAP_EXT = '.map'
+MAGIC = b'THMP'
+VERSION = 1
+EMPTY = 0xFF
+
+# magic, version, tile size, origin x, origin y, width, height, number of types, number of offgrid tiles
+HEADER = struct.Struct('<4sHHiiIIHI')
+# type id, variant, x, y
+OFFGRID = struct.Struct('<BBii')
+
+def encode(size, tilemap, offgrid):
+  """
+  Pack a tilemap into the binary map format.
+
+  Layout:
+  ----------
+  header : HEADER
+  types : for each type, its length as one byte followed by the name in utf-8
+  grid : width * height cells of two bytes, the type id (EMPTY if there is no tile) and the variant,
+      row by row from the origin
+  offgrid : for each offgrid tile, an OFFGRID record with its position in pixel coordinates
+
+  Parameters:
+  ----------
+  size : int
+      The size of each tile.
+  tilemap : dict
+      The ongrid tiles, keyed by (x, y) tile coordinates.
+  offgrid : list of dict
+      The offgrid tiles.
+
+  Returns:
+  ----------
+  bytes: The packed map.
+
+  Raises:
+  ----------
+  ValueError: If a tile does not fit in the format: a type past the first EMPTY types,
+      a type name over 255 bytes or a variant outside 0 to 255.
+  """
+  types = []
+  for tile in list(tilemap.values()) + offgrid:
+    if tile['type'] not in types:
+      # Type ids are one byte and EMPTY marks the cells without a tile
+      if len(types) == EMPTY:
+        raise ValueError('Tile ' + str(tile) + ' has one of more than ' + str(EMPTY) + ' tile types')
+      if len(tile['type'].encode('utf-8')) > 255:
+        raise ValueError('Tile ' + str(tile) + ' has a type name longer than 255 bytes')
+      types.append(tile['type'])
+    if not 0 <= tile['variant'] <= 255:
+      raise ValueError('Tile ' + str(tile) + ' has a variant outside 0 to 255')
+  type_ids = {tile_type: i for i, tile_type in enumerate(types)}
+
+  if tilemap:
+    origin = (min(loc[0] for loc in tilemap), min(loc[1] for loc in tilemap))
+    width = max(loc[0] for loc in tilemap) - origin[0] + 1
+    height = max(loc[1] for loc in tilemap) - origin[1] + 1
+  else:
+    origin, width, height = (0, 0), 0, 0
+
+  grid = bytearray([EMPTY, 0]) * (width * height)
+  for loc in tilemap:
+    i = ((loc[1] - origin[1]) * width + loc[0] - origin[0]) * 2
+    grid[i] = type_ids[tilemap[loc]['type']]
+    grid[i + 1] = tilemap[loc]['variant']
+
+  data = [HEADER.pack(MAGIC, VERSION, size, origin[0], origin[1], width, height, len(types), len(offgrid))]
+  for tile_type in types:
+    name = tile_type.encode('utf-8')
+    data.append(bytes([len(name)]) + name)
+  data.append(bytes(grid))
+  for tile in offgrid:
+    data.append(OFFGRID.pack(type_ids[tile['type']], tile['variant'], int(tile['pos'][0]), int(tile['pos'][1])))
+  return b''.join(data)
+
+def decode(buffer):
+  """
+  Unpack a map packed by `encode`.
+
+  Parameters:
+  ----------
+  buffer : bytes-like
+      The packed map, for example the contents of a map file.
+
+  Returns:
+  ----------
+  tuple: The tile size, the ongrid tiles keyed by (x, y) tile coordinates and the list of offgrid tiles,
+      in the same form as a map loaded from JSON.
+  """
+  magic, version, size, origin_x, origin_y, width, height, num_types, num_offgrid = HEADER.unpack_from(buffer, 0)
+  if magic != MAGIC or version != VERSION:
+    raise ValueError('Not a version ' + str(VERSION) + ' map file')
+  offset = HEADER.size
+
+  types = []
+  for i in range(num_types):
+    length = buffer[offset]
+    types.append(bytes(buffer[offset + 1:offset + 1 + length]).decode('utf-8'))
+    offset += 1 + length
+
+  tilemap = {}
+  grid = memoryview(buffer)[offset:offset + width * height * 2]
+  for i in range(0, len(grid), 2):
+    if grid[i] != EMPTY:
+      cell = i // 2
+      x = origin_x + cell % width
+      y = origin_y + cell // width
+      tilemap[(x, y)] = {'type': types[grid[i]], 'variant': grid[i + 1], 'pos': [x, y]}
+  grid.release()
+  offset += width * height * 2
+
+  offgrid = []
+  for type_id, variant, x, y in OFFGRID.iter_unpack(buffer[offset:offset + num_offgrid * OFFGRID.size]):
+    offgrid.append({'type': types[type_id], 'variant': variant, 'pos': [x, y]})
+  return size, tilemap, offgrid
+
+def read_map(path):
+  """
+  Load a binary map file, read whole in one call before it is decoded.
+
+  Parameters:
+  ----------
+  path : str
+      The path to the map file.
+
+  Returns:
+  ----------
+  tuple: The tile size, the ongrid tiles and the offgrid tiles, see `decode`.
+  """
+  with open(path, 'rb') as f:
+    return decode(f.read())
+
+def write_map(path, size, tilemap, offgrid):
+  """
+  Write a tilemap to a binary map file, atomically (see `replace_file`).
+  """
+  replace_file(path, encode(size, tilemap, offgrid))
+
+def replace_file(path, data):
+  """
+  Write a file through a temporary file renamed over it, so a reader or a crash
+  never sees it half written.
+
+  Parameters:
+  ----------
+  path : str
+      The path to the file.
+  data : bytes
+      The new contents of the file.
+  """
+  tmp_path = path + '.tmp'
+  with open(tmp_path, 'wb') as f:
+    f.write(data)
+  os.replace(tmp_path, path)
+
+def read_json(path):
+  """
+  Load a JSON map file, converting its "x;y" keys to (x, y) tuples of int.
+
+  Returns:
+  ----------
+  tuple: The tile size, the ongrid tiles and the offgrid tiles, see `decode`.
+  """
+  f = open(path, 'r')
+  map_data = json.load(f)
+  f.close()
+
+  tilemap = {}
+  for loc in map_data['tilemap']:
+    x, y = loc.split(';')
+    tilemap[(int(x), int(y))] = map_data['tilemap'][loc]
+  return map_data['size'], tilemap, map_data['offgrid']
+
+def write_json(path, size, tilemap, offgrid):
+  """
+  Write a tilemap to a JSON map file, with its (x, y) keys written as "x;y" strings,
+  atomically (see `replace_file`).
+  """
+  json_tilemap = {}
+  for loc in tilemap:
+    json_tilemap[str(loc[0]) + ';' + str(loc[1])] = tilemap[loc]
+
+  replace_file(path, json.dumps({'tilemap': json_tilemap, 'size': size, 'offgrid': offgrid}).encode('utf-8'))
+
+def json_to_map(json_path, map_path):
+  """
+  Convert a JSON map file to the binary map format.
+  """
+  write_map(map_path, *read_json(json_path))
+
+def map_to_json(map_path, json_path):
+  """
+  Convert a binary map file back to a JSON map file.
+  """
+  write_json(json_path, *read_map(map_path))
+
+def compiled_map(json_path):
+  """
+  Get a binary copy of a JSON map, converting it again if the JSON file is newer.
+
+  The JSON files stay the maps edited by editor.py. The binary copy next to them
+  is what the game loads.
+
+  Parameters:
+  ----------
+  json_path : str
+      The path to the JSON map file.
+
+  Returns:
+  ----------
+  str: The path to the binary map file.
+  """
+  map_path = os.path.splitext(json_path)[0] + MAP_EXT
+  if not os.path.exists(map_path) or os.path.getmtime(map_path) < os.path.getmtime(json_path):
+    json_to_map(json_path, map_path)
+  return map_path
+
+def built_map(json_path):
+  """
+  Get the path to load a JSON map from: its binary copy if one was built and is at least as new
+  as the JSON file, else the JSON file itself.
+
+  Unlike `compiled_map`, nothing is written, so the game also runs from a read-only install.
+  The binary copies are built ahead with `python -m scripts.mapfile`.
+
+  Parameters:
+  ----------
+  json_path : str
+      The path to the JSON map file.
+
+  Returns:
+  ----------
+  str: The path to the binary map file, or json_path.
+  """
+  map_path = os.path.splitext(json_path)[0] + MAP_EXT
+  if os.path.exists(map_path) and os.path.getmtime(map_path) >= os.path.getmtime(json_path):
+    return map_path
+  return json_path
+
+if __name__ == '__main__':
+  # python -m scripts.mapfile data/maps/map3.json  ->  data/maps/map3.map, and the other way around
+  for path in sys.argv[1:]:
+    name, ext = os.path.splitext(path)
+    if ext == MAP_EXT:
+      map_to_json(path, name + '.json')
+      print(path, '->', name + '.json')
+    else:
+      json_to_map(path, name + MAP_EXT)
+      print(path, '->', name + MAP_EXT)
@@ -0,0 +1,124 @@
+import contextlib
+import json
+import time
+
+PROFILE_RUNS = 10  # most recent runs kept, older ones are dropped
+
+class LoadProfiler:
+  def __init__(self, runs=PROFILE_RUNS):
+    """
+    Record where the time of loading the game and its levels goes, as a tree of timed sections.
+
+    Each load, like a level, is a run: a node of its own under the root, so loading a map twice
+    shows the cold and the warm load side by side. Sections nest within the section open when
+    they start, and a section started again under the same parent adds to the same node.
+    Code timing many small pieces, like each image of load_many, adds their total at once
+    with `add` instead.
+
+    Every node is a dict with a name, the milliseconds spent in it, the times it ran and its
+    children, so the tree dumps to JSON as is.
+    Only the last few runs are kept, so a long session neither grows the tree nor the dumps.
+
+    Parameters:
+    ----------
+    runs (int): The most recent runs kept.
+    root (dict): The node holding the runs kept, oldest first.
+    stack (list): The sections open, innermost last.
+    """
+    self.runs = runs
+    self.root = {'name': 'load', 'ms': 0.0, 'count': 0, 'children': []}
+    self.stack = []
+
+  def node(self, parent, name):
+    """
+    Get the child of a node with the given name, adding it if there is none.
+    """
+    for child in parent['children']:
+      if child['name'] == name:
+        return child
+    child = {'name': name, 'ms': 0.0, 'count': 0, 'children': []}
+    parent['children'].append(child)
+    return child
+
+  def run(self, name):
+    """
+    Start a new run under the root and return its node, to pass as the parent of its sections.
+
+    Nothing is left open, so a run can span code that yields between its sections,
+    like a loading screen drawing frames. Call `end` once it is done.
+    The oldest run is dropped beyond the runs kept.
+    """
+    node = {'name': name, 'ms': 0.0, 'count': 1, 'children': []}
+    self.root['children'].append(node)
+    del self.root['children'][:-self.runs]
+    return node
+
+  def end(self, run):
+    """
+    Set the time of a run to the time of its sections, leaving out the time between them.
+    """
+    run['ms'] = sum(child['ms'] for child in run['children'])
+    self.root['ms'] = sum(child['ms'] for child in self.root['children'])
+    self.root['count'] = len(self.root['children'])
+
+  @contextlib.contextmanager
+  def section(self, name, parent=None):
+    """
+    Time the code of a with block as a section.
+
+    Parameters:
+    ----------
+    name (str): The name of the section.
+    parent (dict, optional): The node to add the section to. Defaults to the innermost open
+        section, or the root if none is open.
+    """
+    if parent is None:
+      parent = self.stack[-1] if self.stack else self.root
+    node = self.node(parent, name)
+    self.stack.append(node)
+    start = time.perf_counter()
+    try:
+      yield node
+    finally:
+      node['ms'] += (time.perf_counter() - start) * 1000
+      node['count'] += 1
+      self.stack.pop()
+
+  def add(self, name, seconds, count=1):
+    """
+    Add time spent outside of a with block to a section of the innermost open section.
+    Does nothing if no section is open.
+    """
+    if not self.stack or not count:
+      return
+    node = self.node(self.stack[-1], name)
+    node['ms'] += seconds * 1000
+    node['count'] += count
+
+  def report(self, node=None, depth=0):
+    """
+    Get the tree as indented text, one section per line with its milliseconds and its count.
+    """
+    node = self.root if node is None else node
+    lines = ['%s%-*s %8.2f ms  x%d' % ('  ' * depth, 32 - 2 * depth, node['name'], node['ms'], node['count'])]
+    for child in node['children']:
+      lines.append(self.report(child, depth + 1))
+    return '\n'.join(lines)
+
+  def dump(self, path):
+    """
+    Write the tree to a JSON file.
+    """
+    f = open(path, 'w')
+    json.dump(self.root, f, indent=2)
+    f.close()
+
+  def clear(self):
+    """
+    Drop every run recorded so far.
+    """
+    self.root['children'] = []
+    self.root['ms'] = 0.0
+    self.stack = []
+
+PROFILER = LoadProfiler()
@@ -0,0 +1,136 @@
+import pygame
+
+class DirtyRenderer:
+  def __init__(self, screen, display, enabled=True):
+    """
+    Draw and present only the parts of a frame that changed, while the scene behind them stays still.
+
+    A scene is a static layer, like the background and the tiles seen by the camera, with
+    moving things drawn over it, like the entities and the HUD. The static layer is identified
+    by a key, like the camera offset. While the key changes every frame, as when the camera
+    scrolls, every frame is drawn and presented whole. Once the key stays the same for a frame,
+    the static layer is kept, and the next frames only restore it under the rects drawn the
+    frame before, then present those rects and the ones drawn this frame.
+    Presenting rects needs the screen to be the size of the display; a scaled window always
+    presents whole frames.
+
+    Parameters:
+    ----------
+    screen (pygame.Surface): The window surface frames are presented on.
+    display (pygame.Surface): The surface frames are drawn on, scaled to the screen when presented.
+    enabled (bool): Whether to track changed rects at all, False draws and presents every frame whole.
+    static (pygame.Surface): The static layer kept once the key stopped changing, or None.
+    key: The key of the static layer last drawn.
+    settled (bool): Whether the static layer was kept for the current key.
+    full (bool): Whether the current frame is presented whole.
+    restored (list): The rects restored from the static layer this frame.
+    drawn (list): The rects drawn over the static layer this frame.
+    kept (list): The rects drawn this frame that stay on the display until drawn over.
+    full_frames (int): The frames presented whole.
+    dirty_frames (int): The frames presented as rects.
+    presented (int): The pixels presented so far.
+    """
+    self.screen = screen
+    self.display = display
+    self.enabled = enabled
+    self.static = None
+    self.key = None
+    self.settled = False
+    self.full = True
+    self.restored = []
+    self.drawn = []
+    self.kept = []
+    self.full_frames = 0
+    self.dirty_frames = 0
+    self.presented = 0
+
+  def forget(self):
+    """
+    Draw the static layer again on the next frame, after it changed without its key changing,
+    like when chunks streamed in.
+    """
+    self.key = None
+    self.settled = False
+
+  def invalidate(self):
+    """
+    Present the next frame whole, after something else drew on the screen, like a pause menu.
+    """
+    self.full = True
+
+  def begin(self, key, draw_static):
+    """
+    Start a frame: draw the static layer onto the display if it changed, or restore it under
+    the rects drawn the frame before.
+
+    Parameters:
+    ----------
+    key: What the static layer shows, frames with the same key share it. Compared with ==.
+    draw_static (function): Takes a surface and draws the static layer on it.
+    """
+    drawn = self.drawn
+    self.drawn = []
+    self.kept = []
+    self.restored = []
+    if not self.enabled or key != self.key:
+      self.key = key
+      self.settled = False
+      self.full = True
+      draw_static(self.display)
+    elif not self.settled:
+      if self.static is None or self.static.get_size() != self.display.get_size():
+        self.static = pygame.Surface(self.display.get_size()).convert()
+      draw_static(self.static)
+      self.display.blit(self.static, (0, 0))
+      self.settled = True
+      self.full = True
+    else:
+      for rect in drawn:
+        self.display.blit(self.static, rect, rect)
+      self.restored = drawn
+
+  def mark(self, rect, keep=False):
+    """
+    Record a rect drawn over the static layer this frame, as returned by blit or pygame.draw,
+    or a list of them. None and rects outside the display are ignored.
+
+    Parameters:
+    ----------
+    rect (pygame.Rect): The area drawn on.
+    keep (bool): Whether what was drawn stays until drawn over again, like a menu that draws
+        only the buttons that changed, instead of being restored from the static layer on the
+        next frame. Whatever keeps drawings must draw them whole again after a full frame.
+    """
+    if rect is None:
+      return
+    if isinstance(rect, list):
+      for part in rect:
+        self.mark(part, keep)
+      return
+    rect = pygame.Rect(rect).clip(self.display.get_rect())
+    if rect.width and rect.height:
+      (self.kept if keep else self.drawn).append(rect)
+
+  def present(self):
+    """
+    Present the frame on the screen: whole, or only the rects restored and drawn this frame.
+    """
+    # Things that stood still are restored and drawn at the same rect, present it once
+    rects = self.restored + [rect for rect in self.drawn + self.kept if rect not in self.restored]
+    whole = self.display.get_width() * self.display.get_height()
+    if self.full or not self.enabled or self.screen.get_size() != self.display.get_size() \
+        or sum(rect.width * rect.height for rect in rects) >= whole:
+      if self.screen.get_size() == self.display.get_size():
+        self.screen.blit(self.display, (0, 0))
+      else:
+        self.screen.blit(pygame.transform.scale(self.display, self.screen.get_size()), (0, 0))
+      pygame.display.update()
+      self.full_frames += 1
+      self.presented += self.screen.get_width() * self.screen.get_height()
+    else:
+      for rect in rects:
+        self.screen.blit(self.display, rect, rect)
+      pygame.display.update(rects)
+      self.dirty_frames += 1
+      self.presented += sum(rect.width * rect.height for rect in rects)
+    self.full = False
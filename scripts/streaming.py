@@ -0,0 +1,184 @@
+import json
+import os
+import queue
+import sys
+import threading
+
+from scripts.mapfile import MAP_EXT, encode, read_map, read_json
+
+INDEX = 'index.json'
+
+def chunk_path(path, chunk):
+  """
+  Get the path of the file holding a chunk of a chunked map.
+  """
+  return os.path.join(path, str(chunk[0]) + '_' + str(chunk[1]) + MAP_EXT)
+
+def write_chunked(path, size, tilemap, offgrid, chunk_size):
+  """
+  Write a tilemap as a chunked map: a directory with one binary map file per chunk
+  and an index of the chunks.
+
+  Each offgrid tile is stored in the chunk holding its position.
+  The index also records the player spawner, so the game knows which chunks to load first.
+
+  Parameters:
+  ----------
+  path : str
+      The directory to write the chunked map to.
+  size : int
+      The size of each tile.
+  tilemap : dict
+      The ongrid tiles, keyed by (x, y) tile coordinates.
+  offgrid : list of dict
+      The offgrid tiles.
+  chunk_size : int
+      The number of tiles on each side of a chunk.
+  """
+  chunks = {}
+  for loc in tilemap:
+    chunk = (loc[0] // chunk_size, loc[1] // chunk_size)
+    if chunk not in chunks:
+      chunks[chunk] = ({}, [])
+    chunks[chunk][0][loc] = tilemap[loc]
+
+  start = None
+  for tile in offgrid:
+    chunk = (int(tile['pos'][0]) // (chunk_size * size), int(tile['pos'][1]) // (chunk_size * size))
+    if chunk not in chunks:
+      chunks[chunk] = ({}, [])
+    chunks[chunk][1].append(tile)
+    if (tile['type'], tile['variant']) == ('spawners', 0):
+      start = list(tile['pos'])
+
+  os.makedirs(path, exist_ok=True)
+  for chunk in chunks:
+    with open(chunk_path(path, chunk), 'wb') as f:
+      f.write(encode(size, chunks[chunk][0], chunks[chunk][1]))
+
+  f = open(os.path.join(path, INDEX), 'w')
+  json.dump({'size': size, 'chunk_size': chunk_size, 'start': start, 'chunks': sorted(chunks)}, f)
+  f.close()
+
+class ChunkStreamer:
+  def __init__(self, path):
+    """
+    Load the chunks of a chunked map on a background thread.
+
+    Chunks are requested with `request` and picked up on the main thread with `poll`,
+    so the tilemap itself is only ever touched by the main thread.
+
+    Parameters:
+    ----------
+    path (str): The directory of the chunked map.
+    size (int): The size of each tile.
+    chunk_size (int): The number of tiles on each side of a chunk.
+    chunks (set): The (x, y) chunk coordinates of every chunk stored on disk.
+    start (list): The position of the player spawner in pixel coordinates, or None.
+    pending (set): The chunks requested and not picked up yet.
+    error (tuple): The chunk that failed to load and its error, kept until `poll` raises it, or None.
+    """
+    f = open(os.path.join(path, INDEX), 'r')
+    index = json.load(f)
+    f.close()
+
+    self.path = path
+    self.size = index['size']
+    self.chunk_size = index['chunk_size']
+    self.chunks = set(tuple(chunk) for chunk in index['chunks'])
+    self.start = index['start']
+    self.pending = set()
+    self.error = None
+    self.closed = False
+    self.requests = queue.Queue()
+    self.results = queue.Queue()
+    self.thread = threading.Thread(target=self.work, daemon=True)
+    self.thread.start()
+
+  def work(self):
+    """
+    Read requested chunks until `close` is called. Runs on the background thread.
+
+    A chunk that cannot be read is posted with its error instead of its tiles,
+    so the thread keeps serving the next requests and `poll` raises it on the main thread.
+    """
+    while True:
+      chunk = self.requests.get()
+      if self.closed:
+        return
+      try:
+        self.results.put(self.read(chunk))
+      except Exception as error:
+        self.results.put((chunk, error, None))
+
+  def read(self, chunk):
+    """
+    Read a chunk from disk.
+
+    Returns:
+    ----------
+    tuple: The (x, y) chunk coordinates, the ongrid tiles and the offgrid tiles of the chunk.
+    """
+    size, tilemap, offgrid = read_map(chunk_path(self.path, chunk))
+    return chunk, tilemap, offgrid
+
+  def request(self, chunk):
+    """
+    Ask the background thread to load a chunk, unless it is already pending.
+    """
+    if chunk not in self.pending:
+      self.pending.add(chunk)
+      self.requests.put(chunk)
+
+  def poll(self, limit):
+    """
+    Pick up at most limit chunks loaded by the background thread.
+
+    A chunk that failed to load is no longer pending, so it can be requested again.
+    Its error is raised once the chunks picked up before it are returned, at the latest on the next call.
+
+    Returns:
+    ----------
+    list: The loaded chunks, see `read`.
+
+    Raises:
+    ----------
+    ValueError: If a chunk could not be read, naming its file.
+    """
+    if self.error is not None:
+      self.raise_error()
+    loaded = []
+    while len(loaded) < limit:
+      try:
+        result = self.results.get_nowait()
+      except queue.Empty:
+        break
+      self.pending.discard(result[0])
+      if isinstance(result[1], Exception):
+        self.error = (result[0], result[1])
+        break
+      loaded.append(result)
+    if self.error is not None and not loaded:
+      self.raise_error()
+    return loaded
+
+  def raise_error(self):
+    """
+    Raise the failure of a chunk read on the main thread, and forget it.
+    """
+    chunk, error = self.error
+    self.error = None
+    raise ValueError('Could not read chunk ' + chunk_path(self.path, chunk) + ': ' + str(error)) from error
+
+  def close(self):
+    """
+    Stop the background thread, dropping the requests still queued.
+    """
+    self.closed = True
+    self.requests.put(None)
+
+if __name__ == '__main__':
+  # python -m scripts.streaming data/maps/map5.json data/maps/map5
+  from scripts.tilemap import CHUNK_SIZE
+  write_chunked(sys.argv[2], *read_json(sys.argv[1]), CHUNK_SIZE)
+  print(sys.argv[1], '->', sys.argv[2])
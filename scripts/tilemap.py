@@ -1,5 +1,11 @@
+import os
+import math
+import collections
 import pygame
-import json
+
+from scripts.assets import image_size
+from scripts.mapfile import MAP_EXT, read_map, write_map, read_json, write_json
+from scripts.streaming import ChunkStreamer
 
 NEIGHBOR_OFFSET = [ (-4, -4), (-4, -3), (-4, -2), (-4, -1), (-4, 0), (-4, 1), (-4, 2), (-4, 3), (-4, 4),
                     (-3, -4), (-3, -3), (-3, -2), (-3, -1), (-3, 0), (-3, 1), (-3, 2), (-3, 3), (-3, 4),
@@ -11,6 +17,12 @@ NEIGHBOR_OFFSET = [ (-4, -4), (-4, -3), (-4, -2), (-4, -1), (-4, 0), (-4, 1), (-
                     (3, -4), (3, -3), (3, -2), (3, -1), (3, 0), (3, 1), (3, 2), (3, 3), (3, 4),
                     (4, -4), (4, -3), (4, -2), (4, -1), (4, 0), (4, 1), (4, 2), (4, 3), (4, 4)]
 PHYSICS_TILES = {'grass', 'stone', 'grass_new', 'dungeon', 'slab', 'cave'}
+CHUNK_SIZE = 16
+STREAM_MARGIN = 1     # chunks kept loaded around the view of a streamed map
+STREAM_BUDGET = 32    # most chunks of a streamed map resident at once, 20 cover the view and margin
+STREAM_PER_FRAME = 2  # most loaded chunks added to the tilemap in one frame
+STREAM_BAKES_PER_FRAME = 1  # most chunks around the view baked ahead in one frame
+BAKED_BUDGET = 24     # most baked chunk surfaces kept at once, a 1280x720 view and its stream margin cover 20
 
 class Tilemap:
   def __init__(self, game, size=50):
@@ -21,14 +33,43 @@ class Tilemap:
     ----------
     game (Game): The game instance that the tilemap belongs to.
     size (int): The size of each tile in the tilemap.
-    tilemap (dict): A dictionary to store the tile data for the tilemap.
-    offgrid (dict): A dictionary to store the offgrid tile data.
+    tilemap (dict): A dictionary to store the tile data for the tilemap, keyed by (x, y) tile coordinates.
+    offgrid (list): A list to store the offgrid tile data.
+    chunks (OrderedDict): Baked surfaces of CHUNK_SIZE x CHUNK_SIZE tiles, keyed by (x, y) chunk coordinates,
+        least recently drawn first. None marks a chunk with nothing to draw.
+        A baked surface of 50 pixel tiles is 800x800 pixels, about 2.5 MB, so at most BAKED_BUDGET
+        of them are kept and the least recently drawn is dropped and baked again when it comes back.
+    solid (dict): Solidity grid of each chunk, a bytearray of CHUNK_SIZE x CHUNK_SIZE cells
+        where 1 marks a PHYSICS_TILES tile. Keyed by (x, y) chunk coordinates.
+    merged (dict): Collision rects of each chunk, its solid cells greedily merged into
+        maximal rectangles in pixel coordinates. Keyed by (x, y) chunk coordinates.
+    offgrid_index (dict): The offgrid tiles overlapping each chunk, in offgrid order.
+        Keyed by (x, y) chunk coordinates.
+    kinds (dict): The ongrid tiles of each kind, keyed by (type, variant) and then by (x, y) tile coordinates.
+    offgrid_kinds (dict): The offgrid tiles of each kind, keyed by (type, variant).
+    version (int): The number of edits made since the tilemap was created, to tell when it needs saving.
+    stream (ChunkStreamer): The loader of a streamed map, or None if the whole map is loaded.
+    loaded (OrderedDict): The resident chunks of a streamed map, least recently in view first.
+    stream_offgrid (dict): The offgrid tiles of each resident chunk of a streamed map.
+    removed (dict): The tiles extracted from each chunk of a streamed map, left out when it loads again.
+        They are kept for every chunk visited, evicted or not, one small tuple per extracted tile.
     """
     
     self.game = game
     self.size = size
     self.tilemap = {}
-    self.offgrid = {}
+    self.offgrid = []
+    self.chunks = collections.OrderedDict()
+    self.solid = {}
+    self.merged = {}
+    self.offgrid_index = {}
+    self.kinds = {}
+    self.offgrid_kinds = {}
+    self.version = 0
+    self.stream = None
+    self.loaded = collections.OrderedDict()
+    self.stream_offgrid = {}
+    self.removed = {}
   
   def extract(self, id_pairs, keep=False):
     """
@@ -51,47 +92,606 @@ class Tilemap:
         If the tile is from the offgrid, the position is in absolute coordinates.
         If the tile is from the tilemap, the position is in tile coordinates.
 
+    The tiles come in map order, as a scan of the map would find them: the offgrid ones in
+    offgrid order, then the ongrid ones in tilemap order. Entities are spawned in this order,
+    and the last player spawner found is the one used.
+
+    Offgrid tiles are looked up in `offgrid_kinds`, so finding them costs time in the number
+    of matches rather than the size of the map, plus one pass over the offgrid list to put
+    the matches of several kinds back in order. Ongrid tiles are checked for in `kinds`, and
+    only if there are any, which the levels do not have, is the tilemap scanned for them in order.
+    Removing offgrid matches takes one more pass over the offgrid list.
     """
-    matches = []
-    for tile in self.offgrid.copy():
-      if (tile['type'], tile['variant']) in id_pairs:
-        matches.append(tile.copy())
-        if not keep:
-          self.offgrid.remove(tile)
-                  
-    for loc in self.tilemap:
-      tile = self.tilemap[loc]
-      if (tile['type'], tile['variant']) in id_pairs:
-        matches.append(tile.copy())
-        matches[-1]['pos'] = matches[-1]['pos'].copy()
-        matches[-1]['pos'][0] *= self.size
-        matches[-1]['pos'][1] *= self.size
-        if not keep:
-          del self.tilemap[loc]
+    kinds = list(dict.fromkeys(id_pairs))
+    offgrid_found = [kind for kind in kinds if self.offgrid_kinds.get(kind)]
+    offgrid = [tile for kind in offgrid_found for tile in self.offgrid_kinds[kind]]
+    if len(offgrid_found) > 1:
+      # Each list of offgrid_kinds is in offgrid order, merge them back into it
+      order = {id(tile): i for i, tile in enumerate(self.offgrid)}
+      offgrid.sort(key=lambda tile: order[id(tile)])
+    matches = [tile.copy() for tile in offgrid]
+    ongrid_found = set(kind for kind in kinds if self.kinds.get(kind))
+    if ongrid_found:
+      # The kinds index loses the tilemap order when tiles are replaced, so scan for it
+      for tile in self.tilemap.values():
+        if (tile['type'], tile['variant']) in ongrid_found:
+          matches.append(tile.copy())
+          matches[-1]['pos'] = [tile['pos'][0] * self.size, tile['pos'][1] * self.size]
+    if keep:
+      return matches
+
+    extracted = set()
+    for kind in kinds:
+      for tile in self.offgrid_kinds.pop(kind, []):
+        extracted.add(id(tile))
+        self.unindex_offgrid(tile)
+        self.invalidate(self.offgrid_rect(tile))
+        self.forget(tile, tile['pos'][0] // self.size, tile['pos'][1] // self.size, False)
+    if extracted:
+      self.offgrid[:] = [tile for tile in self.offgrid if id(tile) not in extracted]
+      self.version += 1
+    for kind in kinds:
+      for loc, tile in list(self.kinds.get(kind, {}).items()):
+        self.remove_tile(loc)
+        self.forget(tile, loc[0], loc[1], True)
     return matches
 
+  def forget(self, tile, x, y, ongrid):
+    """
+    Remember that a tile was extracted from a streamed map, so it stays removed
+    when its chunk is evicted and loaded again.
+
+    Parameters:
+    ----------
+    tile : dict
+        The extracted tile.
+    x, y : int
+        The tile coordinates of the cell holding the tile.
+    ongrid : bool
+        Whether the tile was an ongrid tile.
+    """
+    if self.stream is None:
+      return
+    chunk = (int(x) // CHUNK_SIZE, int(y) // CHUNK_SIZE)
+    if chunk not in self.removed:
+      self.removed[chunk] = set()
+    self.removed[chunk].add((ongrid, tile['type'], tile['variant'], tile['pos'][0], tile['pos'][1]))
+
+  def set_tile(self, loc, tile):
+    """
+    Place a tile on the grid, replacing the tile at the same location.
+
+    Parameters:
+    ----------
+    loc : tuple of int
+        The (x, y) tile coordinates of the tile.
+    tile : dict
+        The tile, with its type, variant, and position in tile coordinates.
+    """
+    old = self.tilemap.get(loc)
+    if old and old['type'] == tile['type'] and old['variant'] == tile['variant']:
+      return
+    if old:
+      self.unindex_tile(loc, old)
+    self.tilemap[loc] = tile
+    self.index_tile(loc, tile)
+    self.version += 1
+    if self.set_solid(loc, tile['type'] in PHYSICS_TILES):
+      self.merge_chunk((loc[0] // CHUNK_SIZE, loc[1] // CHUNK_SIZE))
+    self.invalidate(pygame.Rect(loc[0] * self.size, loc[1] * self.size, self.size, self.size))
+
+  def remove_tile(self, loc):
+    """
+    Remove the tile at the given tile coordinates, if there is one.
+
+    Parameters:
+    ----------
+    loc : tuple of int
+        The (x, y) tile coordinates of the tile.
+    """
+    if loc in self.tilemap:
+      self.unindex_tile(loc, self.tilemap.pop(loc))
+      self.version += 1
+      if self.set_solid(loc, False):
+        self.merge_chunk((loc[0] // CHUNK_SIZE, loc[1] // CHUNK_SIZE))
+      self.invalidate(pygame.Rect(loc[0] * self.size, loc[1] * self.size, self.size, self.size))
+
+  def index_tile(self, loc, tile):
+    """
+    Add an ongrid tile to the locations of its kind.
+    """
+    kind = (tile['type'], tile['variant'])
+    if kind not in self.kinds:
+      self.kinds[kind] = {}
+    self.kinds[kind][loc] = tile
+
+  def unindex_tile(self, loc, tile):
+    """
+    Remove an ongrid tile from the locations of its kind.
+    """
+    kind = (tile['type'], tile['variant'])
+    locs = self.kinds.get(kind)
+    if locs is not None:
+      locs.pop(loc, None)
+      if not locs:
+        del self.kinds[kind]
+
+  def build_kinds(self):
+    """
+    Build the locations of each kind of ongrid tile from the tilemap. Called once when the map is loaded.
+    """
+    self.kinds = {}
+    for loc in self.tilemap:
+      self.index_tile(loc, self.tilemap[loc])
+
+  def build_solid(self):
+    """
+    Build the solidity grid and the merged collision rects from the tilemap.
+    Called once when the map is loaded.
+    """
+    self.solid = {}
+    self.merged = {}
+    for loc in self.tilemap:
+      if self.tilemap[loc]['type'] in PHYSICS_TILES:
+        self.set_solid(loc, True)
+    for chunk in self.solid:
+      self.merge_chunk(chunk)
+
+  def set_solid(self, loc, solid):
+    """
+    Mark a cell of the solidity grid as solid or empty.
+
+    Parameters:
+    ----------
+    loc : tuple of int
+        The (x, y) tile coordinates of the cell.
+    solid : bool
+        Whether the cell holds a PHYSICS_TILES tile.
+
+    Returns:
+    -------
+    bool
+        True if the cell changed, meaning the chunk has to be merged again.
+    """
+    chunk = (loc[0] // CHUNK_SIZE, loc[1] // CHUNK_SIZE)
+    if chunk not in self.solid:
+      if not solid:
+        return False
+      self.solid[chunk] = bytearray(CHUNK_SIZE * CHUNK_SIZE)
+    index = (loc[1] % CHUNK_SIZE) * CHUNK_SIZE + loc[0] % CHUNK_SIZE
+    value = 1 if solid else 0
+    if self.solid[chunk][index] == value:
+      return False
+    self.solid[chunk][index] = value
+    return True
+
+  def merge_chunk(self, chunk):
+    """
+    Greedily merge the solid cells of a chunk into maximal rectangles.
+
+    Each unmerged solid cell, in row order, starts a rectangle that grows right
+    as far as the row is solid, then down while the whole span below is solid.
+    Only the given chunk is merged again, so editing a tile stays cheap.
+
+    Parameters:
+    ----------
+    chunk : tuple of int
+        The (x, y) chunk coordinates.
+    """
+    rects = []
+    if chunk in self.solid:
+      unmerged = bytearray(self.solid[chunk])
+      for y in range(CHUNK_SIZE):
+        x = 0
+        while x < CHUNK_SIZE:
+          start = y * CHUNK_SIZE + x
+          if not unmerged[start]:
+            x += 1
+            continue
+          w = 1
+          while x + w < CHUNK_SIZE and unmerged[start + w]:
+            w += 1
+          h = 1
+          span = b'\x01' * w
+          while y + h < CHUNK_SIZE and unmerged[start + h * CHUNK_SIZE:start + h * CHUNK_SIZE + w] == span:
+            h += 1
+          for row in range(h):
+            unmerged[start + row * CHUNK_SIZE:start + row * CHUNK_SIZE + w] = bytes(w)
+          rects.append(pygame.Rect((chunk[0] * CHUNK_SIZE + x) * self.size, (chunk[1] * CHUNK_SIZE + y) * self.size,
+                                   w * self.size, h * self.size))
+          x += w
+    if rects:
+      self.merged[chunk] = rects
+    else:
+      self.merged.pop(chunk, None)
+
+  def is_solid(self, x, y):
+    """
+    Check the solidity grid at the given tile coordinates.
+    """
+    cells = self.solid.get((x // CHUNK_SIZE, y // CHUNK_SIZE))
+    return cells is not None and cells[(y % CHUNK_SIZE) * CHUNK_SIZE + x % CHUNK_SIZE] == 1
+
+  def add_offgrid(self, tile):
+    """
+    Add an offgrid tile. Its position is in pixel coordinates.
+    """
+    self.offgrid.append(tile)
+    self.index_offgrid(tile)
+    self.version += 1
+    self.invalidate(self.offgrid_rect(tile))
+
+  def remove_offgrid(self, tile):
+    """
+    Remove an offgrid tile previously added to the tilemap.
+    """
+    for i in range(len(self.offgrid)):
+      if self.offgrid[i] is tile:
+        del self.offgrid[i]
+        self.version += 1
+        break
+    self.unindex_offgrid(tile)
+    self.invalidate(self.offgrid_rect(tile))
+
+  def offgrid_rect(self, tile):
+    """
+    Get the area covered by an offgrid tile, in pixel coordinates.
+    The size comes from the image specs, which every image of a tile set is scaled to, so no
+    image is loaded for it. Tiles of no spec cover one tile.
+    """
+    size = image_size(tile['type'])
+    if size is None:
+      return pygame.Rect(tile['pos'][0], tile['pos'][1], self.size, self.size)
+    return pygame.Rect(tile['pos'], size)
+
+  def offgrid_chunks(self, tile):
+    """
+    Get the (x, y) chunk coordinates of every chunk an offgrid tile overlaps.
+    """
+    rect = self.offgrid_rect(tile)
+    chunk_px = CHUNK_SIZE * self.size
+    chunks = []
+    for cx in range(rect.left // chunk_px, (rect.right - 1) // chunk_px + 1):
+      for cy in range(rect.top // chunk_px, (rect.bottom - 1) // chunk_px + 1):
+        chunks.append((cx, cy))
+    return chunks
+
+  def index_offgrid(self, tile):
+    """
+    Add an offgrid tile to the bucket of every chunk it overlaps and to the tiles of its kind.
+    """
+    for chunk in self.offgrid_chunks(tile):
+      if chunk not in self.offgrid_index:
+        self.offgrid_index[chunk] = []
+      self.offgrid_index[chunk].append(tile)
+    kind = (tile['type'], tile['variant'])
+    if kind not in self.offgrid_kinds:
+      self.offgrid_kinds[kind] = []
+    self.offgrid_kinds[kind].append(tile)
+
+  def unindex_offgrid(self, tile):
+    """
+    Remove an offgrid tile from the chunk buckets and the tiles of its kind, wherever it is still listed.
+    """
+    for chunk in self.offgrid_chunks(tile):
+      bucket = self.offgrid_index.get(chunk, [])
+      for i in range(len(bucket)):
+        if bucket[i] is tile:
+          del bucket[i]
+          break
+      if not bucket:
+        self.offgrid_index.pop(chunk, None)
+    kind = (tile['type'], tile['variant'])
+    tiles = self.offgrid_kinds.get(kind, [])
+    for i in range(len(tiles)):
+      if tiles[i] is tile:
+        del tiles[i]
+        break
+    if not tiles:
+      self.offgrid_kinds.pop(kind, None)
+
+  def build_offgrid_index(self):
+    """
+    Build the offgrid index and the offgrid tiles of each kind from the offgrid tiles.
+    Called once when the map is loaded.
+    """
+    self.offgrid_index = {}
+    self.offgrid_kinds = {}
+    for tile in self.offgrid:
+      self.index_offgrid(tile)
+
+  def offgrid_in(self, rect):
+    """
+    Get the offgrid tiles overlapping an area.
+
+    Parameters:
+    ----------
+    rect : pygame.Rect
+        The area in pixel coordinates, for example the camera view.
+
+    Returns:
+    -------
+    list of dict
+        The offgrid tiles overlapping the area, chunk by chunk, each in offgrid order.
+    """
+    tiles = []
+    seen = set()
+    chunk_px = CHUNK_SIZE * self.size
+    for cx in range(rect.left // chunk_px, (rect.right - 1) // chunk_px + 1):
+      for cy in range(rect.top // chunk_px, (rect.bottom - 1) // chunk_px + 1):
+        for tile in self.offgrid_index.get((cx, cy), []):
+          if id(tile) not in seen and rect.colliderect(self.offgrid_rect(tile)):
+            seen.add(id(tile))
+            tiles.append(tile)
+    return tiles
+
+  def offgrid_at(self, pos):
+    """
+    Get the offgrid tiles under a point, for picking.
+
+    Parameters:
+    ----------
+    pos : tuple of int
+        The point in pixel coordinates.
+
+    Returns:
+    -------
+    list of dict
+        The offgrid tiles whose area contains the point.
+    """
+    return self.offgrid_in(pygame.Rect(pos[0], pos[1], 1, 1))
+
+  def invalidate(self, rect=None):
+    """
+    Drop the baked chunks overlapping an area so they are baked again on the next render.
+
+    Parameters:
+    ----------
+    rect : pygame.Rect, optional
+        The edited area in pixel coordinates. If None, every chunk is dropped.
+    """
+    if rect is None:
+      self.chunks = collections.OrderedDict()
+      return
+    chunk_px = CHUNK_SIZE * self.size
+    for cx in range(rect.left // chunk_px, (rect.right - 1) // chunk_px + 1):
+      for cy in range(rect.top // chunk_px, (rect.bottom - 1) // chunk_px + 1):
+        self.chunks.pop((cx, cy), None)
+
+  def baked(self, chunk):
+    """
+    Get the baked surface of a chunk, baking it if it is not cached, and drop the least recently
+    drawn surfaces beyond BAKED_BUDGET.
+
+    Parameters:
+    ----------
+    chunk : tuple of int
+        The (x, y) chunk coordinates.
+
+    Returns:
+    -------
+    pygame.Surface or None
+        The baked surface, or None if the chunk has nothing to draw.
+    """
+    if chunk in self.chunks:
+      self.chunks.move_to_end(chunk)
+      return self.chunks[chunk]
+    surf = self.chunks[chunk] = self.bake_chunk(chunk)
+    while len(self.chunks) > BAKED_BUDGET:
+      self.chunks.popitem(last=False)
+    return surf
+
+  def bake_view(self, rect):
+    """
+    Bake the chunks `render` draws for a view ahead of the first frame, like when a level starts.
+
+    Parameters:
+    ----------
+    rect : pygame.Rect
+        The view, in pixel coordinates.
+    """
+    chunk_px = CHUNK_SIZE * self.size
+    for cx in range(rect.left // chunk_px, rect.right // chunk_px + 1):
+      for cy in range(rect.top // chunk_px, rect.bottom // chunk_px + 1):
+        self.baked((cx, cy))
+
+  def bake_chunk(self, chunk):
+    """
+    Draw the offgrid and ongrid tiles of a chunk onto a single surface.
+
+    Parameters:
+    ----------
+    chunk : tuple of int
+        The (x, y) chunk coordinates.
+
+    Returns:
+    -------
+    pygame.Surface or None
+        The baked chunk, with black as the colorkey like the tile images,
+        or None if the chunk has nothing to draw.
+    """
+    chunk_px = CHUNK_SIZE * self.size
+    origin = (chunk[0] * chunk_px, chunk[1] * chunk_px)
+    area = pygame.Rect(origin[0], origin[1], chunk_px, chunk_px)
+    surf = None
+
+    # Offgrid tiles are drawn first, then ongrid tiles, like Tilemap.render always did
+    tiles = []
+    for tile in self.offgrid_index.get(chunk, []):
+      tiles.append((tile, tile['pos'][0] - origin[0], tile['pos'][1] - origin[1]))
+    for x in range(chunk[0] * CHUNK_SIZE, (chunk[0] + 1) * CHUNK_SIZE):
+      for y in range(chunk[1] * CHUNK_SIZE, (chunk[1] + 1) * CHUNK_SIZE):
+        if (x, y) in self.tilemap:
+          tile = self.tilemap[(x, y)]
+          tiles.append((tile, tile['pos'][0] * self.size - origin[0], tile['pos'][1] * self.size - origin[1]))
+
+    if tiles:
+      surf = pygame.Surface((chunk_px, chunk_px))
+      if pygame.display.get_surface():
+        surf = surf.convert()
+      for tile, x, y in tiles:
+        surf.blit(self.game.assets[tile['type']][tile['variant']], (x, y))
+      surf.set_colorkey((0, 0, 0))
+    return surf
+
   def save(self, path):
-    f = open(path, 'w')
-    json.dump({'tilemap': self.tilemap, 'size': self.size, 'offgrid': self.offgrid}, f)
-    f.close()
+    """
+    Save the current state of the tilemap to a map file.
+
+    Paths ending in MAP_EXT are written in the binary map format, anything else as JSON
+    with the (x, y) keys written back as "x;y" strings.
+
+    Parameters:
+    ----------
+    path : str
+        The path to the map file where the tilemap data will be saved.
+    """
+    if path.endswith(MAP_EXT):
+      write_map(path, self.size, self.tilemap, self.offgrid)
+    else:
+      write_json(path, self.size, self.tilemap, self.offgrid)
 
   def load(self, path):
     """
-    Save the current state of the tilemap to a JSON file.
+    Load the tilemap from a map file.
+
+    Paths ending in MAP_EXT are read in the binary map format,
+    anything else as JSON, with its "x;y" string keys converted to (x, y) tuples of int
+    so lookups do not have to build a string for every probed cell.
+
+    A directory is a chunked map (see `scripts.streaming`). Nothing is loaded up front,
+    chunks are loaded and evicted around the camera by `stream_around`.
 
     Parameters:
     ----------
     path : str
-        The path to the JSON file where the tilemap data will be saved.
+        The path to the map file to load the tilemap data from.
+    """
+    self.close()
+    self.loaded.clear()
+    self.stream_offgrid = {}
+    self.removed = {}
+    if os.path.isdir(path):
+      self.stream = ChunkStreamer(path)
+      if self.stream.chunk_size != CHUNK_SIZE:
+        raise ValueError('Chunked map ' + path + ' does not use chunks of ' + str(CHUNK_SIZE) + ' tiles')
+      self.size, self.tilemap, self.offgrid = self.stream.size, {}, []
+    elif path.endswith(MAP_EXT):
+      self.size, self.tilemap, self.offgrid = read_map(path)
+    else:
+      self.size, self.tilemap, self.offgrid = read_json(path)
+    self.invalidate()
+    self.build_solid()
+    self.build_kinds()
+    self.build_offgrid_index()
+
+  def close(self):
+    """
+    Stop loading chunks of a streamed map in the background.
+    """
+    if self.stream is not None:
+      self.stream.close()
+      self.stream = None
+
+  def stream_around(self, rect, wait=False):
+    """
+    Load the chunks of a streamed map around an area and evict the ones out of view.
+
+    Chunks within STREAM_MARGIN chunks of the area are requested from the background thread.
+    At most STREAM_PER_FRAME loaded chunks are added and STREAM_BAKES_PER_FRAME resident
+    chunks are baked ahead per call, so a frame never stalls on a burst of them before
+    they scroll into view. When more than STREAM_BUDGET chunks are resident, the ones
+    least recently in view are evicted.
+
+    Parameters:
+    ----------
+    rect : pygame.Rect
+        The area to load, usually the camera view, in pixel coordinates.
+    wait : bool, optional
+        If True, every chunk around the area is read right away instead, like when a level starts.
+        Nothing is baked then, see `bake_view`.
+
+    Returns:
+    -------
+    list of tuple
+        The chunks added to the tilemap by this call, in (x, y) chunk coordinates.
+    """
+    chunk_px = CHUNK_SIZE * self.size
+    unbaked = []
+    for cx in range(rect.left // chunk_px - STREAM_MARGIN, (rect.right - 1) // chunk_px + STREAM_MARGIN + 1):
+      for cy in range(rect.top // chunk_px - STREAM_MARGIN, (rect.bottom - 1) // chunk_px + STREAM_MARGIN + 1):
+        if (cx, cy) in self.loaded:
+          self.loaded.move_to_end((cx, cy))
+          if (cx, cy) not in self.chunks:
+            unbaked.append((cx, cy))
+        elif (cx, cy) in self.stream.chunks:
+          if wait:
+            self.add_chunk(*self.stream.read((cx, cy)))
+          else:
+            self.stream.request((cx, cy))
+
+    added = []
+    for chunk, tilemap, offgrid in self.stream.poll(STREAM_PER_FRAME):
+      if chunk not in self.loaded:
+        self.add_chunk(chunk, tilemap, offgrid)
+        added.append(chunk)
+    if wait:
+      added = list(self.loaded)
+    else:
+      for chunk in unbaked[:STREAM_BAKES_PER_FRAME]:
+        self.baked(chunk)
+
+    while len(self.loaded) > STREAM_BUDGET:
+      self.evict_chunk(next(iter(self.loaded)))
+    return added
+
+  def add_chunk(self, chunk, tilemap, offgrid):
+    """
+    Add the tiles of a chunk read from a streamed map, leaving out the ones extracted before.
     """
+    removed = self.removed.get(chunk, ())
+    for loc in tilemap:
+      tile = tilemap[loc]
+      if (True, tile['type'], tile['variant'], tile['pos'][0], tile['pos'][1]) not in removed:
+        self.tilemap[loc] = tile
+        self.index_tile(loc, tile)
+        if tile['type'] in PHYSICS_TILES:
+          self.set_solid(loc, True)
+    self.merge_chunk(chunk)
 
-    f = open(path, 'r')
-    map_data = json.load(f)
-    f.close()
+    self.stream_offgrid[chunk] = []
+    for tile in offgrid:
+      if (False, tile['type'], tile['variant'], tile['pos'][0], tile['pos'][1]) not in removed:
+        self.offgrid.append(tile)
+        self.index_offgrid(tile)
+        self.stream_offgrid[chunk].append(tile)
 
-    self.tilemap = map_data['tilemap']
-    self.size = map_data['size']
-    self.offgrid = map_data['offgrid']
+    self.loaded[chunk] = True
+    chunk_px = CHUNK_SIZE * self.size
+    self.invalidate(pygame.Rect(chunk[0] * chunk_px, chunk[1] * chunk_px, chunk_px, chunk_px))
+    # Offgrid tiles can hang over the neighbouring chunks
+    for tile in self.stream_offgrid[chunk]:
+      self.invalidate(self.offgrid_rect(tile))
+
+  def evict_chunk(self, chunk):
+    """
+    Drop every tile of a resident chunk of a streamed map, with its collision data and baked surface.
+    """
+    for x in range(chunk[0] * CHUNK_SIZE, (chunk[0] + 1) * CHUNK_SIZE):
+      for y in range(chunk[1] * CHUNK_SIZE, (chunk[1] + 1) * CHUNK_SIZE):
+        if (x, y) in self.tilemap:
+          self.unindex_tile((x, y), self.tilemap.pop((x, y)))
+    self.solid.pop(chunk, None)
+    self.merged.pop(chunk, None)
+    evicted = set()
+    for tile in self.stream_offgrid.pop(chunk, []):
+      evicted.add(id(tile))
+      self.unindex_offgrid(tile)
+      self.invalidate(self.offgrid_rect(tile))
+    if evicted:
+      self.offgrid[:] = [tile for tile in self.offgrid if id(tile) not in evicted]
+    self.chunks.pop(chunk, None)
+    del self.loaded[chunk]
 
   def tiles_around(self, pos):
     """
@@ -112,7 +712,7 @@ class Tilemap:
     tiles = []
     tile_loc = (int(pos[0] // self.size), int(pos[1] // self.size))
     for offset in NEIGHBOR_OFFSET:
-      check_loc = str(tile_loc[0] + offset[0]) + ";" + str(tile_loc[1] + offset[1])
+      check_loc = (tile_loc[0] + offset[0], tile_loc[1] + offset[1])
       if check_loc in self.tilemap:
         tiles.append(self.tilemap[check_loc])
     return tiles
@@ -146,6 +746,58 @@ class Tilemap:
         rects.append(pygame.Rect(tile['pos'][0] * self.size, tile['pos'][1] * self.size, self.size, self.size))
     return rects
 
+  def physics_rects_in(self, rect):
+    """
+    Get the collision rects overlapped by a bounding box.
+
+    Only the merged rects of the chunks the box covers are tested, usually one chunk,
+    so a collision pass checks a few rects instead of the 81 cells of `physics_rects_around`.
+    Entities of any size, like the 200x200 Minotaur, get every rect they overlap.
+    On a streamed map, a chunk that is not loaded yet is one solid rect, so nothing
+    walks or falls into it before its tiles are there.
+
+    Parameters:
+    ----------
+    rect : pygame.Rect
+        The bounding box, in pixel coordinates.
+
+    Returns:
+    -------
+    list of pygame.Rect
+        The merged rects of solid tiles overlapping the bounding box, in pixel coordinates.
+        They are shared with the tilemap, so they must not be modified.
+    """
+    rects = []
+    chunk_px = CHUNK_SIZE * self.size
+    for cx in range(rect.left // chunk_px, (rect.right - 1) // chunk_px + 1):
+      for cy in range(rect.top // chunk_px, (rect.bottom - 1) // chunk_px + 1):
+        merged = self.merged.get((cx, cy))
+        if merged:
+          for i in rect.collidelistall(merged):
+            rects.append(merged[i])
+        elif self.stream is not None and (cx, cy) in self.stream.chunks and (cx, cy) not in self.loaded:
+          rects.append(pygame.Rect(cx * chunk_px, cy * chunk_px, chunk_px, chunk_px))
+    return rects
+
+  def resident(self, rect):
+    """
+    Check whether the tiles under an area are loaded: always on a map loaded whole, and on a
+    streamed map when every chunk of the map the area overlaps is loaded.
+
+    Parameters:
+    ----------
+    rect : pygame.Rect
+        The area, in pixel coordinates.
+    """
+    if self.stream is None:
+      return True
+    chunk_px = CHUNK_SIZE * self.size
+    for cx in range(rect.left // chunk_px, (rect.right - 1) // chunk_px + 1):
+      for cy in range(rect.top // chunk_px, (rect.bottom - 1) // chunk_px + 1):
+        if (cx, cy) in self.stream.chunks and (cx, cy) not in self.loaded:
+          return False
+    return True
+
   def solid_check(self, pos):
     """
     Check if a tile at a given position is a solid physics tile.
@@ -170,11 +822,89 @@ class Tilemap:
     PHYSICS_TILES set. If both conditions are met, the function returns the tile dictionary.
     Otherwise, it returns None.
     """
-    tile_loc = str(int(pos[0] // self.size)) + ';' + str(int(pos[1] // self.size))
+    tile_loc = (int(pos[0] // self.size), int(pos[1] // self.size))
     if tile_loc in self.tilemap:
       if self.tilemap[tile_loc]['type'] in PHYSICS_TILES:
         return self.tilemap[tile_loc]
 
+  def raycast(self, start, end):
+    """
+    Cast a ray through the tile grid and find the first solid tile in its way.
+
+    Parameters:
+    ----------
+    start : tuple of float
+        The start (x, y) of the ray in pixel coordinates.
+    end : tuple of float
+        The end (x, y) of the ray in pixel coordinates.
+
+    Returns:
+    -------
+    tuple
+        The (x, y) tile coordinates of the first solid tile the ray enters, or None if
+        it reaches end unblocked, and the distance in pixels the ray travelled.
+    """
+    return self.raycasts([(start, end)])[0]
+
+  def raycasts(self, rays):
+    """
+    Cast many rays through the tile grid, see `raycast`.
+
+    Each ray steps from cell to cell along the grid lines it crosses (a DDA walk), checking
+    the solidity grid, so its cost grows with its length in tiles and not the size of the map.
+    On a streamed map, a chunk stored on disk but not loaded blocks the ray, so nothing is
+    seen through parts of the map that have not been loaded.
+
+    Parameters:
+    ----------
+    rays : list of tuple
+        The (start, end) pairs of the rays in pixel coordinates.
+
+    Returns:
+    -------
+    list of tuple
+        The hit tile coordinates or None and the distance of each ray, in the same order.
+    """
+    size = self.size
+    solid = self.solid
+    loaded = self.loaded
+    stored = set() if self.stream is None else self.stream.chunks
+    hits = []
+    for start, end in rays:
+      x0, y0 = start[0] / size, start[1] / size
+      dx, dy = end[0] / size - x0, end[1] / size - y0
+      length = math.hypot(dx, dy) * size
+      x, y = math.floor(x0), math.floor(y0)
+      # Fraction of the ray to cross one cell, and to reach the next grid line, on each axis
+      step_x = 1 if dx > 0 else -1
+      step_y = 1 if dy > 0 else -1
+      delta_x = abs(1 / dx) if dx else math.inf
+      delta_y = abs(1 / dy) if dy else math.inf
+      next_x = ((x + 1 - x0) if dx > 0 else (x0 - x)) * delta_x if dx else math.inf
+      next_y = ((y + 1 - y0) if dy > 0 else (y0 - y)) * delta_y if dy else math.inf
+      t = 0
+      hit = None
+      while t <= 1:
+        chunk = (x // CHUNK_SIZE, y // CHUNK_SIZE)
+        cells = solid.get(chunk)
+        if cells is not None:
+          blocked = cells[(y % CHUNK_SIZE) * CHUNK_SIZE + x % CHUNK_SIZE]
+        else:
+          blocked = chunk in stored and chunk not in loaded
+        if blocked:
+          hit = (x, y)
+          break
+        if next_x < next_y:
+          x += step_x
+          t = next_x
+          next_x += delta_x
+        else:
+          y += step_y
+          t = next_y
+          next_y += delta_y
+      hits.append((hit, t * length if hit else length))
+    return hits
+
   def render(self, surf, offset = (0, 0)):
     """
     Renders the tilemap onto a surface.
@@ -194,18 +924,15 @@ class Tilemap:
     Note:
     -----
     This method renders both offgrid and ongrid tiles onto the given surface.
-    Offgrid tiles are rendered first, followed by ongrid tiles.
-    The rendering is optimized by only rendering the tiles that are within the visible area.
+    Tiles are baked into one surface per chunk the first time the chunk is visible
+    (see `bake_chunk`), so a frame only blits the few chunks that overlap the visible area.
+    Edits through `set_tile`, `remove_tile`, `add_offgrid` and `remove_offgrid` drop the
+    affected chunks so they are baked again, and so does `baked` for the chunks left out of view longest.
     The offset parameter is used to adjust the position of the tilemap on the surface.
     """
-    # Render offgrid tiles
-    for tile in self.offgrid:
-        surf.blit(self.game.assets[tile['type']][tile['variant']], (tile['pos'][0] - offset[0], tile['pos'][1] - offset[1]))
-    
-    # Render ongrid tiles within the visible range
-    for x in range(int(offset[0]//self.size), int((offset[0] + surf.get_width())//self.size +1)):
-      for y in range(int(offset[1]//self.size), int((offset[1] + surf.get_height())//self.size +1)):
-        loc = str(x) + ';' + str(y)
-        if loc in self.tilemap:
-          tile = self.tilemap[loc] 
-          surf.blit(self.game.assets[tile['type']][tile['variant']], (tile['pos'][0]*self.size - offset[0], tile['pos'][1]*self.size - offset[1]))
+    chunk_px = CHUNK_SIZE * self.size
+    for cx in range(int(offset[0]//chunk_px), int((offset[0] + surf.get_width())//chunk_px +1)):
+      for cy in range(int(offset[1]//chunk_px), int((offset[1] + surf.get_height())//chunk_px +1)):
+        baked = self.baked((cx, cy))
+        if baked is not None:
+          surf.blit(baked, (cx * chunk_px - offset[0], cy * chunk_px - offset[1]))
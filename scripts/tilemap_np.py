@@ -0,0 +1,246 @@
+import math
+import numpy as np
+
+from scripts.tilemap import Tilemap, PHYSICS_TILES, CHUNK_SIZE
+
+EMPTY = 0             # type id of a cell without a tile
+SPARSE_RATIO = 16     # most grid cells per tile before a map is held sparse
+SPARSE_LIMIT = 1 << 24  # most grid cells held at all, 3 bytes each
+
+class ArrayTilemap(Tilemap):
+  def __init__(self, game, size=50, sparse_ratio=SPARSE_RATIO):
+    """
+    A Tilemap that also holds the type and variant of every ongrid tile in 2D NumPy arrays
+    covering the bounds of the map, for vectorized region queries.
+
+    The tile dicts stay the tiles of the map, so everything Tilemap does (tiles_around,
+    solid_check, render, the edit API, streaming) works as before. The arrays follow every
+    tile placed or removed through `index_tile` and `unindex_tile`.
+
+    A map spread out so far that its bounds hold more than sparse_ratio cells per tile is
+    held sparse instead: no arrays, and the queries fall back to looking up the tile dicts.
+
+    Parameters:
+    ----------
+    game (Game): The game instance that the tilemap belongs to.
+    size (int): The size of each tile in the tilemap.
+    sparse_ratio (int): The most grid cells per tile before the map is held sparse.
+    types (numpy.ndarray): The type id of each cell, indexed [y, x] from origin, EMPTY where there is no tile.
+        None when the map is held sparse.
+    variants (numpy.ndarray): The variant of each cell, indexed like types.
+    origin (tuple): The (x, y) tile coordinates of the cell at types[0, 0].
+    type_ids (dict): The id of each tile type, from 1 up in the order they were first placed.
+    physics (numpy.ndarray): Whether each type id is one of PHYSICS_TILES, indexed by type id.
+    """
+    super().__init__(game, size)
+    self.sparse_ratio = sparse_ratio
+    self.types = None
+    self.variants = None
+    self.origin = (0, 0)
+    self.type_ids = {}
+    self.physics = np.zeros(1, dtype=bool)
+
+  def type_id(self, tile_type):
+    """
+    Get the id of a tile type, giving it the next id if it is new.
+    """
+    if tile_type not in self.type_ids:
+      self.type_ids[tile_type] = len(self.type_ids) + 1
+      self.physics = np.append(self.physics, tile_type in PHYSICS_TILES)
+    return self.type_ids[tile_type]
+
+  def dense(self, cells, tiles):
+    """
+    Check whether a grid of cells is small enough to hold a map of tiles in arrays.
+    """
+    return cells <= SPARSE_LIMIT and cells <= self.sparse_ratio * max(tiles, CHUNK_SIZE * CHUNK_SIZE)
+
+  def allocate(self, left, top, right, bottom):
+    """
+    Replace the arrays with empty ones covering the given bounds in tile coordinates,
+    copying over the cells of the old arrays.
+    """
+    types = np.zeros((bottom - top, right - left), dtype=np.uint16)
+    variants = np.zeros((bottom - top, right - left), dtype=np.uint8)
+    if self.types is not None and self.types.size:
+      h, w = self.types.shape
+      x, y = self.origin[0] - left, self.origin[1] - top
+      types[y:y + h, x:x + w] = self.types
+      variants[y:y + h, x:x + w] = self.variants
+    self.types, self.variants, self.origin = types, variants, (left, top)
+
+  def build_kinds(self):
+    """
+    Build the locations of each kind of ongrid tile, then the arrays of the map, or hold it
+    sparse if it is too spread out. Called once when the map is loaded.
+
+    A streamed map gets arrays covering every chunk stored on disk, filled as chunks load.
+    """
+    # Drop the arrays of the map loaded before, so indexing the new tiles does not write into them
+    self.types = self.variants = None
+    self.origin = (0, 0)
+    super().build_kinds()
+    if self.stream is not None:
+      chunks = self.stream.chunks
+      if not chunks:
+        self.allocate(0, 0, 0, 0)
+        return
+      bounds = (min(chunk[0] for chunk in chunks) * CHUNK_SIZE, min(chunk[1] for chunk in chunks) * CHUNK_SIZE,
+                (max(chunk[0] for chunk in chunks) + 1) * CHUNK_SIZE, (max(chunk[1] for chunk in chunks) + 1) * CHUNK_SIZE)
+      tiles = len(chunks) * CHUNK_SIZE * CHUNK_SIZE
+    else:
+      if not self.tilemap:
+        self.allocate(0, 0, 0, 0)
+        return
+      bounds = (min(loc[0] for loc in self.tilemap), min(loc[1] for loc in self.tilemap),
+                max(loc[0] for loc in self.tilemap) + 1, max(loc[1] for loc in self.tilemap) + 1)
+      tiles = len(self.tilemap)
+    if not self.dense((bounds[2] - bounds[0]) * (bounds[3] - bounds[1]), tiles):
+      return
+    self.allocate(*bounds)
+
+    count = len(self.tilemap)
+    xs = np.fromiter((loc[0] for loc in self.tilemap), dtype=np.int64, count=count) - self.origin[0]
+    ys = np.fromiter((loc[1] for loc in self.tilemap), dtype=np.int64, count=count) - self.origin[1]
+    self.types[ys, xs] = np.fromiter((self.type_id(tile['type']) for tile in self.tilemap.values()), dtype=np.uint16, count=count)
+    self.variants[ys, xs] = np.fromiter((tile['variant'] for tile in self.tilemap.values()), dtype=np.uint8, count=count)
+
+  def index_tile(self, loc, tile):
+    """
+    Add an ongrid tile to the locations of its kind and to the arrays, growing them if
+    the tile is out of their bounds, or holding the map sparse from then on if that would
+    make them too large.
+    """
+    super().index_tile(loc, tile)
+    if self.types is None:
+      return
+    h, w = self.types.shape
+    x, y = loc[0] - self.origin[0], loc[1] - self.origin[1]
+    if not (0 <= x < w and 0 <= y < h):
+      # Grow by a chunk past the tile, so painting along an edge does not reallocate every cell
+      left = min(self.origin[0], loc[0] - CHUNK_SIZE) if w else loc[0] - CHUNK_SIZE
+      top = min(self.origin[1], loc[1] - CHUNK_SIZE) if h else loc[1] - CHUNK_SIZE
+      right = max(self.origin[0] + w, loc[0] + CHUNK_SIZE + 1) if w else loc[0] + CHUNK_SIZE + 1
+      bottom = max(self.origin[1] + h, loc[1] + CHUNK_SIZE + 1) if h else loc[1] + CHUNK_SIZE + 1
+      if not self.dense((right - left) * (bottom - top), len(self.tilemap)):
+        self.types = self.variants = None
+        return
+      self.allocate(left, top, right, bottom)
+      x, y = loc[0] - self.origin[0], loc[1] - self.origin[1]
+    self.types[y, x] = self.type_id(tile['type'])
+    self.variants[y, x] = tile['variant']
+
+  def unindex_tile(self, loc, tile):
+    """
+    Remove an ongrid tile from the locations of its kind and from the arrays.
+    """
+    super().unindex_tile(loc, tile)
+    if self.types is None:
+      return
+    h, w = self.types.shape
+    x, y = loc[0] - self.origin[0], loc[1] - self.origin[1]
+    if 0 <= x < w and 0 <= y < h:
+      self.types[y, x] = EMPTY
+      self.variants[y, x] = 0
+
+  def cell_range(self, rect):
+    """
+    Get the tile coordinates range of the cells overlapping an area in pixel coordinates,
+    as (left, top, right, bottom) with right and bottom excluded.
+    """
+    return (rect.left // self.size, rect.top // self.size,
+            (rect.right - 1) // self.size + 1, (rect.bottom - 1) // self.size + 1)
+
+  def grid_in(self, rect):
+    """
+    Get the part of the arrays overlapping an area in pixel coordinates.
+
+    Returns:
+    -------
+    tuple
+        The (x, y) tile coordinates of the first cell of the part, and views of the types and
+        variants arrays over it. The views are empty if the area is outside the map.
+    """
+    left, top, right, bottom = self.cell_range(rect)
+    h, w = self.types.shape
+    x0 = min(max(left - self.origin[0], 0), w)
+    x1 = min(max(right - self.origin[0], x0), w)
+    y0 = min(max(top - self.origin[1], 0), h)
+    y1 = min(max(bottom - self.origin[1], y0), h)
+    return (x0 + self.origin[0], y0 + self.origin[1]), self.types[y0:y1, x0:x1], self.variants[y0:y1, x0:x1]
+
+  def cells_where(self, rect, test):
+    """
+    Get the tile coordinates of the cells in an area whose tile passes a test.
+
+    Parameters:
+    ----------
+    rect : pygame.Rect
+        The area in pixel coordinates.
+    test : function
+        Takes the types array of the area and returns a boolean array of the cells to keep.
+        With the map held sparse, it is called with the type id of a single tile instead.
+
+    Returns:
+    -------
+    numpy.ndarray
+        An (n, 2) array of the (x, y) tile coordinates of the cells, row by row.
+    """
+    if self.types is not None:
+      start, types, variants = self.grid_in(rect)
+      ys, xs = np.nonzero(test(types))
+      return np.column_stack((xs + start[0], ys + start[1]))
+
+    left, top, right, bottom = self.cell_range(rect)
+    cells = []
+    for y in range(top, bottom):
+      for x in range(left, right):
+        tile = self.tilemap.get((x, y))
+        if tile and test(self.type_id(tile['type'])):
+          cells.append((x, y))
+    return np.array(cells, dtype=np.int64).reshape(len(cells), 2)
+
+  def solid_cells_in(self, rect):
+    """
+    Get the tile coordinates of every solid tile in an area, see `cells_where`.
+    """
+    return self.cells_where(rect, lambda types: self.physics[types])
+
+  def visible_cells(self, rect):
+    """
+    Get the tile coordinates of every ongrid tile a camera view shows, see `cells_where`.
+    """
+    return self.cells_where(rect, lambda types: types != EMPTY)
+
+  def column_heights(self, left, right):
+    """
+    Get the height of the ground in a range of tile columns.
+
+    Parameters:
+    ----------
+    left, right : int
+        The first and the one past the last tile column, in tile coordinates.
+
+    Returns:
+    -------
+    numpy.ndarray
+        For each column, the tile y of its highest solid tile, or nan if it has none.
+    """
+    heights = np.full(max(right - left, 0), math.nan)
+    if self.types is not None:
+      h, w = self.types.shape
+      x0 = min(max(left - self.origin[0], 0), w)
+      x1 = min(max(right - self.origin[0], x0), w)
+      solid = self.physics[self.types[:, x0:x1]]
+      ground = solid.any(axis=0)
+      tops = solid.argmax(axis=0) + self.origin[1]
+      start = x0 + self.origin[0] - left
+      heights[start:start + x1 - x0] = np.where(ground, tops, math.nan)
+      return heights
+
+    for loc in self.tilemap:
+      if left <= loc[0] < right and self.tilemap[loc]['type'] in PHYSICS_TILES:
+        i = loc[0] - left
+        if not heights[i] <= loc[1]:
+          heights[i] = loc[1]
+    return heights
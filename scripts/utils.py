@@ -1,11 +1,19 @@
 import pygame 
 import os
-BASE_IMG_PATH = 'data/imgs/'
+
+from scripts import imagecache
+from scripts.imagecache import BASE_IMG_PATH, ASSETS
+from scripts.loader import decode_img, finish_img, load_many
+
 DEFFAULT_SIZE = (50,50)
 
 def load_img(path, size=DEFFAULT_SIZE):
   """
   Load and resize an image from the specified path, and set the colorkey to black.
+  The image is kept in the ASSETS cache, and loading it again at the same size returns the same surface.
+  If the image is packed in the ATLAS at this size, it is a subsurface of its sheet instead.
+  Otherwise its scaled pixels are read from the SPRITES cache on disk, or queued to be cached
+  there once loaded, by the next `save_sprites`.
 
   Parameters:
   ----------
@@ -16,16 +24,28 @@ def load_img(path, size=DEFFAULT_SIZE):
   ----------
   pygame.Surface: The loaded and resized image with the colorkey set to black.
   """
-  imgs =pygame.image.load(BASE_IMG_PATH + path).convert()
-  img = pygame.transform.scale(imgs, size)
-  img.set_colorkey((0,0,0))
+  key = (path, tuple(size))
+  img = ASSETS.get(key)
+  if img is None:
+    img = imagecache.ATLAS.frame(path, size)
+    if img is None:
+      img = imagecache.SPRITES.frame(path, size)
+    if img is None:
+      img = finish_img(decode_img(path), size)
+      imagecache.SPRITES.put(path, size, img)
+    ASSETS.put(key, img)
   return img
 
+def img_paths(path):
+  """
+  Get the paths of the images in a directory, sorted alphabetically, as load_imgs loads them.
+  """
+  return [path + '/' + imgname for imgname in ASSETS.listing(BASE_IMG_PATH + path)]
 
 def load_imgs(path, size=DEFFAULT_SIZE):
   """
   Load and resize multiple images from the specified path, and set the colorkey to black.
-  The images are sorted alphabetically before loading.
+  The images are sorted alphabetically before loading, and decoded in parallel (see `load_many`).
 
   Parameters:
   ----------
@@ -36,13 +56,10 @@ def load_imgs(path, size=DEFFAULT_SIZE):
   ----------
   list: A list of pygame.Surface objects representing the loaded and resized images with the colorkey set to black.
   """
-  imgs = []
-  for imgname in sorted(os.listdir(BASE_IMG_PATH + path)):
-    imgs.append(load_img(path + '/' + imgname, size))
-  return imgs
+  return load_many([(img_path, size) for img_path in img_paths(path)])
 
 class Animation:
-  def __init__(self, img, duration, loop=True):
+  def __init__(self, img, duration, loop=True, flipped=None):
     """
     Initialize an Animation object.
 
@@ -54,8 +71,12 @@ class Animation:
         The number of frames to display each image for.
     loop : bool, optional
         Whether the animation should loop continuously. Defaults to True.
+    flipped : list, optional
+        The horizontally mirrored frames, None until a frame is first drawn mirrored.
+        Shared by every copy of the animation, so each frame is mirrored once per clip.
     """
     self.imgs = img
+    self.flipped = flipped if flipped is not None else [None] * len(img)
     self.loop = loop
     self.duration = duration
     self.done = False
@@ -69,7 +90,7 @@ class Animation:
     ----------
     Animation: A new Animation object with the same attributes as the current object.
     """
-    return Animation(self.imgs, self.duration, self.loop)
+    return Animation(self.imgs, self.duration, self.loop, self.flipped)
 
   def update(self):
     """
@@ -100,12 +121,15 @@ class Animation:
       if self.frame >= maxframe:
         self.done = True
 
-  def img(self):
+  def img(self, flip=False):
     """
     Get the current image of the animation based on the frame and duration.
 
     Parameters:
     ----------
+    flip : bool, optional
+        Whether to get the image mirrored horizontally. The mirrored image is made
+        the first time it is asked for and kept in self.flipped. Defaults to False.
     self.frame : int
         The current frame of the animation.
     self.duration : int
@@ -117,7 +141,9 @@ class Animation:
     ----------
     pygame.Surface: The current image of the animation.
     """
-    return self.imgs[int(self.frame / self.duration)]
-  
-
-  
\ No newline at end of file
+    i = int(self.frame / self.duration)
+    if not flip:
+      return self.imgs[i]
+    if self.flipped[i] is None:
+      self.flipped[i] = pygame.transform.flip(self.imgs[i], True, False)
+    return self.flipped[i]
@@ -0,0 +1,77 @@
+import pygame
+
+from scripts.activation import ActivationRegions
+from scripts.entities import Entity
+from scripts.streaming import write_chunked
+from scripts.tilemap import Tilemap, CHUNK_SIZE, STREAM_BUDGET
+from scripts.utils import Animation
+
+SIZE = 50
+FLOOR = 10  # the row of the floor, in tiles
+CHUNKS = STREAM_BUDGET + 8  # chunks of the map, side by side
+
+class StubGame:
+  """
+  Stand-in for the Game object: the images the tilemap bakes and the entities animate with.
+  """
+  def __init__(self):
+    tile = pygame.Surface((SIZE, SIZE))
+    tile.fill('green')
+    self.assets = {'grass': [tile] * 9, 'boss/idle': Animation([tile], duration=1)}
+
+class Boss(Entity):
+  always_active = True
+
+def streamed_map(path):
+  """
+  Write a floor as wide as CHUNKS chunks as a chunked map, and load it.
+  """
+  tiles = {}
+  for x in range(CHUNKS * CHUNK_SIZE):
+    tiles[(x, FLOOR)] = {'type': 'grass', 'variant': 0, 'pos': [x, FLOOR]}
+  write_chunked(str(path), SIZE, tiles, [], CHUNK_SIZE)
+  game = StubGame()
+  tilemap = Tilemap(game, size=SIZE)
+  tilemap.load(str(path))
+  return game, tilemap
+
+def test_always_active_entity_waits_in_evicted_chunk(tmp_path):
+  game, tilemap = streamed_map(tmp_path)
+  try:
+    view = pygame.Rect(0, 0, 1280, 720)
+    tilemap.stream_around(view, wait=True)
+    boss = Boss(game, 'boss', (100, FLOOR * SIZE - SIZE), (SIZE, SIZE))
+    activation = ActivationRegions()
+    for frame in range(10):
+      activation.focus(view)
+      assert activation.updates(boss, tilemap)
+      boss.update(tilemap)
+    standing = list(boss.pos)
+    assert standing[1] == FLOOR * SIZE - SIZE
+
+    # Walk the view to the far end of the map, loading more chunks than the budget,
+    # so the chunk of the boss is evicted
+    for chunk in range(1, CHUNKS):
+      view.x = chunk * CHUNK_SIZE * SIZE
+      tilemap.stream_around(view, wait=True)
+    assert (0, 0) not in tilemap.loaded
+    assert not tilemap.resident(boss.rect())
+    for frame in range(10):
+      activation.focus(view)
+      if activation.updates(boss, tilemap):
+        boss.update(tilemap)
+    assert boss.pos == standing
+
+    # Once its chunk is back, it is updated again and still stands on the floor
+    view.x = 0
+    tilemap.stream_around(view, wait=True)
+    activation.focus(view)
+    assert activation.updates(boss, tilemap)
+    boss.update(tilemap)
+    assert boss.pos == standing
+  finally:
+    tilemap.close()
+
+def test_map_loaded_whole_is_always_resident():
+  tilemap = Tilemap(StubGame(), size=SIZE)
+  assert tilemap.resident(pygame.Rect(-10 ** 6, -10 ** 6, 100, 100))
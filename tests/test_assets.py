@@ -0,0 +1,72 @@
+import pygame
+import pytest
+
+from scripts import imagecache, utils
+from scripts.assets import LevelAssets, LEVEL_IMAGES, LEVEL_ANIMATIONS, level_manifest, entity_assets, spawner_entity
+from scripts.tilemap import Tilemap, CHUNK_SIZE
+
+MAPS = range(6)  # the shipped maps, data/maps/map<id>.json
+SPAWNERS = [('spawners', variant) for variant in range(9)] + [('boss', 0)]
+
+class StubGame:
+  """
+  Stand-in for the Game object: the assets of the level, which the tilemap bakes its chunks from.
+  """
+  def __init__(self):
+    self.assets = LevelAssets(LEVEL_IMAGES, LEVEL_ANIMATIONS)
+
+@pytest.fixture(autouse=True)
+def empty_caches(tmp_path, monkeypatch):
+  """
+  Decode every image from its file, without the atlas, the sprite cache or images loaded by other tests.
+  """
+  pygame.display.set_mode((64, 64))
+  monkeypatch.setattr(imagecache, 'SPRITES', imagecache.SpriteCache(None))
+  monkeypatch.setattr(imagecache, 'ATLAS', imagecache.Atlas(str(tmp_path / 'atlas')))
+  imagecache.ASSETS.clear()
+  yield
+  imagecache.ASSETS.clear()
+
+def test_keys_load_on_first_use():
+  assets = LevelAssets(LEVEL_IMAGES, LEVEL_ANIMATIONS)
+  assert 'coin' in assets and 'coin/idle' in assets
+  assert 'nothing' not in assets
+  assert len(assets) == 0
+
+  assets.load(['potion', 'coin/idle'])
+  assert sorted(assets.keys()) == ['coin/idle', 'potion']
+  assert isinstance(assets['coin/idle'], utils.Animation)
+  assert assets.lazy == 0
+
+  coin = assets['coin']
+  assert coin.get_size() == (30, 30)
+  assert assets.lazy == 1
+  assert assets['coin'] is coin
+  assert assets.lazy == 1
+
+  # Keys already loaded are not loaded again
+  potion = assets['potion']
+  assets.load(['potion', 'coin', 'hud_health'])
+  assert assets['potion'] is potion and assets['coin'] is coin
+  assert sorted(assets.keys()) == ['coin', 'coin/idle', 'hud_health', 'potion']
+
+  with pytest.raises(KeyError):
+    assets['nothing']
+
+@pytest.mark.parametrize('map_id', MAPS)
+def test_manifest_covers_what_the_level_draws(map_id):
+  game = StubGame()
+  tilemap = Tilemap(game)
+  tilemap.load('data/maps/map' + str(map_id) + '.json')
+  game.assets.load(level_manifest(tilemap, 'background1'))
+
+  # As Game.spawn_entities does, then bake every chunk of the map
+  spawners = tilemap.extract(SPAWNERS)
+  for spawner in spawners:
+    for key in entity_assets([spawner_entity((spawner['type'], spawner['variant']))]):
+      assert dict.__contains__(game.assets, key)
+  chunks = {(x // CHUNK_SIZE, y // CHUNK_SIZE) for x, y in tilemap.tilemap}
+  chunks |= {chunk for tile in tilemap.offgrid for chunk in tilemap.offgrid_chunks(tile)}
+  for chunk in chunks:
+    tilemap.bake_chunk(chunk)
+  assert game.assets.lazy == 0
@@ -0,0 +1,71 @@
+import builtins
+import shutil
+
+import pygame
+
+from scripts.autosave import AutoSaver
+from scripts.mapfile import read_json
+from scripts.tilemap import Tilemap
+
+class StubGame:
+  """
+  Stand-in for the Game object: the images of the offgrid tiles of map1.
+  """
+  def __init__(self):
+    self.assets = {'spawners': [pygame.Surface((50, 50))] * 9}
+
+class FailingFile:
+  """
+  A file that writes half of what it is given, then fails like a full disk.
+  """
+  def __init__(self, f):
+    self.f = f
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.f.close()
+
+  def write(self, data):
+    self.f.write(data[:len(data) // 2])
+    raise OSError('No space left on device')
+
+def edited_map(tmp_path):
+  path = str(tmp_path / 'map1.json')
+  shutil.copy('data/maps/map1.json', path)
+  tilemap = Tilemap(StubGame())
+  tilemap.load(path)
+  return tilemap, path
+
+def test_flush_writes_the_edits(tmp_path):
+  tilemap, path = edited_map(tmp_path)
+  saver = AutoSaver(tilemap, path)
+  try:
+    tilemap.set_tile((-100, -100), {'type': 'stone', 'variant': 0, 'pos': [-100, -100]})
+    saver.flush()
+    assert not saver.dirty()
+    assert read_json(path) == (tilemap.size, tilemap.tilemap, tilemap.offgrid)
+  finally:
+    saver.close()
+
+def test_interrupted_flush_leaves_the_last_save(tmp_path, monkeypatch):
+  tilemap, path = edited_map(tmp_path)
+  before = read_json(path)
+  saver = AutoSaver(tilemap, path)
+  try:
+    tilemap.set_tile((-100, -100), {'type': 'stone', 'variant': 0, 'pos': [-100, -100]})
+    def failing_open(path, mode='r'):
+      return FailingFile(builtins.open(path, mode)) if 'w' in mode else builtins.open(path, mode)
+    monkeypatch.setattr('scripts.mapfile.open', failing_open, raising=False)
+    saver.flush()
+    assert saver.dirty()
+    assert read_json(path) == before
+
+    # The edit is saved once the disk has room again, without editing again
+    monkeypatch.undo()
+    saver.flush()
+    assert not saver.dirty()
+    assert read_json(path) == (tilemap.size, tilemap.tilemap, tilemap.offgrid)
+  finally:
+    saver.close()
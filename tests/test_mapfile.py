@@ -0,0 +1,61 @@
+import os
+import shutil
+
+import pytest
+
+from scripts.mapfile import EMPTY, MAP_EXT, encode, decode, read_json, read_map, write_map, built_map
+
+MAPS = range(6)  # the shipped maps, data/maps/map<id>.json
+
+@pytest.mark.parametrize('map_id', MAPS)
+def test_encode_decode_round_trips_json(map_id):
+  loaded = read_json('data/maps/map' + str(map_id) + '.json')
+  assert decode(encode(*loaded)) == loaded
+
+@pytest.mark.parametrize('map_id', MAPS)
+def test_map_file_round_trips_json(map_id, tmp_path):
+  loaded = read_json('data/maps/map' + str(map_id) + '.json')
+  path = str(tmp_path / ('map' + MAP_EXT))
+  write_map(path, *loaded)
+  assert read_map(path) == loaded
+  assert not os.path.exists(path + '.tmp')
+
+def test_encode_takes_every_type_id_and_variant_it_can_store():
+  tilemap = {(i, 0): {'type': 'type' + str(i), 'variant': 255 if i % 2 else 0, 'pos': [i, 0]} for i in range(EMPTY)}
+  assert decode(encode(50, tilemap, [])) == (50, tilemap, [])
+
+@pytest.mark.parametrize('tile, match', [
+  ({'type': 'grass', 'variant': 256, 'pos': [3, 4]}, 'variant'),
+  ({'type': 'grass', 'variant': -1, 'pos': [3, 4]}, 'variant'),
+  ({'type': 'g' * 256, 'variant': 0, 'pos': [3, 4]}, 'type name'),
+])
+def test_encode_rejects_a_tile_it_cannot_store(tile, match):
+  with pytest.raises(ValueError, match=r"'pos': \[3, 4\].* " + match):
+    encode(50, {(0, 0): {'type': 'grass', 'variant': 0, 'pos': [0, 0]}}, [tile])
+
+def test_encode_rejects_a_type_past_the_type_ids():
+  tilemap = {(i, 0): {'type': 'type' + str(i), 'variant': 0, 'pos': [i, 0]} for i in range(EMPTY)}
+  with pytest.raises(ValueError, match=r"'pos': \[3, 4\].* tile types"):
+    encode(50, tilemap, [{'type': 'type' + str(EMPTY), 'variant': 0, 'pos': [3, 4]}])
+
+def test_corrupt_map_file_is_rejected(tmp_path):
+  path = str(tmp_path / ('map' + MAP_EXT))
+  with open(path, 'wb') as f:
+    f.write(b'JSON' + bytes(64))
+  with pytest.raises(ValueError):
+    read_map(path)
+
+def test_built_map_only_uses_a_fresh_binary_copy(tmp_path):
+  json_path = str(tmp_path / 'map1.json')
+  shutil.copy('data/maps/map1.json', json_path)
+  map_path = str(tmp_path / ('map1' + MAP_EXT))
+  assert built_map(json_path) == json_path
+  assert not os.path.exists(map_path)
+
+  write_map(map_path, *read_json(json_path))
+  assert built_map(json_path) == map_path
+
+  # An edit to the JSON map makes the binary copy stale
+  mtime = os.path.getmtime(map_path)
+  os.utime(json_path, (mtime + 10, mtime + 10))
+  assert built_map(json_path) == json_path
@@ -0,0 +1,17 @@
+import json
+
+from scripts.profiler import LoadProfiler
+
+def test_only_the_last_runs_are_kept(tmp_path):
+  profiler = LoadProfiler(runs=3)
+  for i in range(10):
+    run = profiler.run('map' + str(i))
+    with profiler.section('tiles', run):
+      pass
+    profiler.end(run)
+  assert [run['name'] for run in profiler.root['children']] == ['map7', 'map8', 'map9']
+  assert profiler.root['count'] == 3
+
+  path = tmp_path / 'profile.json'
+  profiler.dump(str(path))
+  assert [run['name'] for run in json.load(open(path))['children']] == ['map7', 'map8', 'map9']
@@ -0,0 +1,35 @@
+import os
+
+import pygame
+
+from scripts import imagecache, loader, utils
+
+IMAGES = [('tiles/grass/' + name, (50, 50)) for name in sorted(os.listdir(imagecache.BASE_IMG_PATH + 'tiles/grass'))]
+
+def test_load_img_queues_until_save(tmp_path, monkeypatch):
+  pygame.display.set_mode((64, 64))
+  monkeypatch.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+  cache = imagecache.SpriteCache(str(tmp_path))
+  monkeypatch.setattr(imagecache, 'SPRITES', cache)
+  monkeypatch.setattr(imagecache, 'ATLAS', imagecache.Atlas(str(tmp_path / 'atlas')))
+  imagecache.ASSETS.clear()
+  try:
+    loaded = [utils.load_img(path, size) for path, size in IMAGES]
+    assert not os.path.exists(os.path.join(str(tmp_path), imagecache.SPRITE_CACHE_INDEX))
+    assert len(cache.pending) == len(IMAGES)
+
+    loader.save_sprites()
+    assert cache.pending == []
+    assert cache.written == len(IMAGES)
+
+    # A new run reads every image back from the pack, pixel for pixel
+    warm = imagecache.SpriteCache(str(tmp_path))
+    for (path, size), img in zip(IMAGES, loaded):
+      frame = warm.frame(path, size)
+      assert frame is not None
+      assert frame.get_view('2').raw == img.get_view('2').raw
+    assert warm.served == len(IMAGES)
+    warm.close()
+  finally:
+    cache.close()
+    imagecache.ASSETS.clear()
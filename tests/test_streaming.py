@@ -0,0 +1,252 @@
+import os
+import time
+
+import pygame
+import pytest
+
+from game import Game
+from scripts.mapfile import read_json
+from scripts.streaming import ChunkStreamer, chunk_path, write_chunked
+from scripts.tilemap import Tilemap, CHUNK_SIZE, STREAM_BUDGET, PHYSICS_TILES
+
+COPIES = 5  # copies of map3 side by side, so the map is more chunks wide than STREAM_BUDGET
+
+class Images(dict):
+  """
+  Stand-in for the images of any tile type, a list of plain surfaces as long as any variant.
+  """
+  def __missing__(self, tile_type):
+    self[tile_type] = [pygame.Surface((50, 50))] * 100
+    return self[tile_type]
+
+class StubGame:
+  def __init__(self):
+    self.assets = Images()
+
+def chunk_of(loc):
+  return (loc[0] // CHUNK_SIZE, loc[1] // CHUNK_SIZE)
+
+def tile_key(tile):
+  return (tile['type'], tile['variant'], tile['pos'][0], tile['pos'][1])
+
+def wide_map(path):
+  """
+  Write COPIES copies of map3 side by side as a chunked map.
+
+  Returns:
+  ----------
+  tuple: The ongrid tiles and the offgrid tiles of the whole map.
+  """
+  size, tilemap, offgrid = read_json('data/maps/map3.json')
+  width = (max(loc[0] for loc in tilemap) // CHUNK_SIZE + 2) * CHUNK_SIZE
+  tiles, offgrid_tiles = {}, []
+  for copy in range(COPIES):
+    for loc, tile in tilemap.items():
+      x = loc[0] + copy * width
+      tiles[(x, loc[1])] = {'type': tile['type'], 'variant': tile['variant'], 'pos': [x, loc[1]]}
+    for tile in offgrid:
+      offgrid_tiles.append({'type': tile['type'], 'variant': tile['variant'],
+                            'pos': [tile['pos'][0] + copy * width * size, tile['pos'][1]]})
+  write_chunked(str(path), size, tiles, offgrid_tiles, CHUNK_SIZE)
+  return tiles, offgrid_tiles
+
+def test_streamer_reads_requested_chunks(tmp_path):
+  tiles, offgrid = wide_map(tmp_path)
+  streamer = ChunkStreamer(str(tmp_path))
+  try:
+    assert streamer.chunks >= {chunk_of(loc) for loc in tiles}
+    for chunk in sorted(streamer.chunks):
+      streamer.request(chunk)
+      streamer.request(chunk)
+    read = {}
+    deadline = time.monotonic() + 10
+    while len(read) < len(streamer.chunks) and time.monotonic() < deadline:
+      for chunk, chunk_tiles, chunk_offgrid in streamer.poll(4):
+        assert chunk not in read
+        read[chunk] = (chunk_tiles, chunk_offgrid)
+    assert set(read) == streamer.chunks
+    assert not streamer.pending
+    assert streamer.poll(4) == []
+
+    for chunk, (chunk_tiles, chunk_offgrid) in read.items():
+      assert chunk_tiles == {loc: tiles[loc] for loc in tiles if chunk_of(loc) == chunk}
+    assert sorted((tile_key(tile) for chunk_tiles, chunk_offgrid in read.values() for tile in chunk_offgrid)) == \
+      sorted(tile_key(tile) for tile in offgrid)
+  finally:
+    streamer.close()
+
+def poll_until(streamer, count):
+  loaded = []
+  deadline = time.monotonic() + 10
+  while len(loaded) < count and time.monotonic() < deadline:
+    loaded += streamer.poll(4)
+  return loaded
+
+def test_streamer_reports_a_chunk_it_cannot_read(tmp_path):
+  wide_map(tmp_path)
+  streamer = ChunkStreamer(str(tmp_path))
+  try:
+    corrupt, intact = sorted(streamer.chunks)[:2]
+    with open(chunk_path(str(tmp_path), corrupt), 'wb') as f:
+      f.write(b'not a map')
+    streamer.request(corrupt)
+    with pytest.raises(ValueError, match='Could not read chunk'):
+      poll_until(streamer, 1)
+    assert not streamer.pending
+    assert streamer.poll(4) == []
+
+    # The background thread survives the failure and serves the next requests
+    streamer.request(intact)
+    assert [chunk for chunk, chunk_tiles, chunk_offgrid in poll_until(streamer, 1)] == [intact]
+    assert not streamer.pending
+  finally:
+    streamer.close()
+
+def test_streamer_raises_after_the_chunks_read_before(tmp_path):
+  wide_map(tmp_path)
+  streamer = ChunkStreamer(str(tmp_path))
+  try:
+    intact, missing = sorted(streamer.chunks)[:2]
+    os.remove(chunk_path(str(tmp_path), missing))
+    streamer.request(intact)
+    streamer.request(missing)
+    deadline = time.monotonic() + 10
+    while streamer.results.qsize() < 2 and time.monotonic() < deadline:
+      time.sleep(0.01)
+    assert [chunk for chunk, chunk_tiles, chunk_offgrid in streamer.poll(4)] == [intact]
+    with pytest.raises(ValueError, match='Could not read chunk'):
+      streamer.poll(4)
+    assert not streamer.pending
+  finally:
+    streamer.close()
+
+def test_streamed_map_evicts_and_reloads_chunks(tmp_path):
+  tiles, offgrid = wide_map(tmp_path)
+  tilemap = Tilemap(StubGame())
+  tilemap.load(str(tmp_path))
+  try:
+    chunk_px = CHUNK_SIZE * tilemap.size
+    right = max(loc[0] for loc in tiles) * tilemap.size
+    # Map3 spans chunk rows -1 to 1, all within the margin of this view
+    view = pygame.Rect(0, -chunk_px // 2, 1280, 720)
+    seen = set()
+    # Walk the view across the map and back, past more chunks than the budget
+    for x in list(range(0, right, chunk_px // 2)) + list(range(right, -1, -chunk_px // 2)):
+      view.x = x
+      tilemap.stream_around(view, wait=True)
+      assert len(tilemap.loaded) <= STREAM_BUDGET
+      seen |= set(tilemap.loaded)
+      # The resident tiles are exactly the tiles of the resident chunks
+      assert tilemap.tilemap == {loc: tiles[loc] for loc in tiles if chunk_of(loc) in tilemap.loaded}
+      assert {id(tile) for tile in tilemap.offgrid} == {id(tile) for chunk in tilemap.loaded
+                                                       for tile in tilemap.stream_offgrid[chunk]}
+      for x0, y0 in tilemap.tilemap:
+        assert tilemap.is_solid(x0, y0) == (tiles[(x0, y0)]['type'] in PHYSICS_TILES)
+    assert len(seen) > STREAM_BUDGET
+
+    # Chunks are also picked up from the background thread, a few per call
+    view.x = right
+    edge = {chunk_of(loc) for loc in tiles if loc[0] * tilemap.size >= right - chunk_px}
+    deadline = time.monotonic() + 10
+    while not edge <= set(tilemap.loaded) and time.monotonic() < deadline:
+      tilemap.stream_around(view)
+    assert edge <= set(tilemap.loaded)
+    assert tilemap.tilemap == {loc: tiles[loc] for loc in tiles if chunk_of(loc) in tilemap.loaded}
+  finally:
+    tilemap.close()
+
+def test_extracted_tiles_stay_removed_after_reload(tmp_path):
+  tiles, offgrid = wide_map(tmp_path)
+  tilemap = Tilemap(StubGame())
+  tilemap.load(str(tmp_path))
+  try:
+    view = pygame.Rect(0, -400, 1280, 720)
+    tilemap.stream_around(view, wait=True)
+    spawners = [('spawners', variant) for variant in range(9)]
+    extracted = tilemap.extract(spawners)
+    assert extracted
+    assert tilemap.extract(spawners, keep=True) == []
+
+    # Walk away until the chunks of the view are evicted, then bring them back
+    right = max(loc[0] for loc in tiles) * tilemap.size
+    for x in range(0, right, CHUNK_SIZE * tilemap.size):
+      view.x = x
+      tilemap.stream_around(view, wait=True)
+    assert (0, 0) not in tilemap.loaded
+    view.x = 0
+    tilemap.stream_around(view, wait=True)
+    assert (0, 0) in tilemap.loaded
+    assert not {tile_key(tile) for tile in extracted} & {tile_key(tile) for tile in tilemap.offgrid}
+  finally:
+    tilemap.close()
+
+def test_view_is_baked_only_when_asked(tmp_path, monkeypatch):
+  wide_map(tmp_path)
+  tilemap = Tilemap(StubGame())
+  tilemap.load(str(tmp_path))
+  try:
+    view = pygame.Rect(0, -400, 1280, 720)
+    tilemap.stream_around(view, wait=True)
+    assert not tilemap.chunks
+    # As Game.load_steps does once the spawners are extracted
+    tilemap.extract([('spawners', variant) for variant in range(9)])
+    tilemap.bake_view(view)
+    baked = set(tilemap.chunks)
+    assert baked
+
+    # The first frame draws the baked chunks without baking any
+    bakes = []
+    bake_chunk = tilemap.bake_chunk
+    monkeypatch.setattr(tilemap, 'bake_chunk', lambda chunk: bakes.append(chunk) or bake_chunk(chunk))
+    tilemap.render(pygame.Surface(view.size), offset=view.topleft)
+    assert bakes == []
+    assert set(tilemap.chunks) == baked
+  finally:
+    tilemap.close()
+
+class Marker:
+  """
+  Stand-in for an entity: a 50x50 box at a position.
+  """
+  def __init__(self, pos):
+    self.pos = pos
+
+  def rect(self):
+    return pygame.Rect(self.pos[0], self.pos[1], 50, 50)
+
+def test_entities_of_evicted_chunks_are_parked(tmp_path):
+  tiles, offgrid = wide_map(tmp_path)
+  level = object.__new__(Game)
+  level.tilemap = Tilemap(StubGame())
+  level.tilemap.load(str(tmp_path))
+  try:
+    chunk_px = CHUNK_SIZE * level.tilemap.size
+    markers = [Marker(tile['pos']) for tile in offgrid]
+    level.enemies = list(markers)
+    level.parked = {}
+    view = pygame.Rect(0, -chunk_px // 2, 1280, 720)
+    level.tilemap.stream_around(view, wait=True)
+    level.park_entities()
+    start = list(level.enemies)
+    assert start
+
+    right = max(loc[0] for loc in tiles) * level.tilemap.size
+    for x in list(range(0, right, chunk_px // 2)) + list(range(right, -1, -chunk_px // 2)):
+      view.x = x
+      level.tilemap.stream_around(view, wait=True)
+      level.park_entities()
+      parked = [marker for markers_of_chunk in level.parked.values() for marker in markers_of_chunk]
+      # Every entity is either updated or parked, and only the ones over loaded chunks are updated
+      assert sorted(map(id, level.enemies + parked)) == sorted(map(id, markers))
+      for marker in level.enemies:
+        chunk = (marker.rect().centerx // chunk_px, marker.rect().centery // chunk_px)
+        assert chunk in level.tilemap.loaded or chunk not in level.tilemap.stream.chunks
+      for chunk in level.parked:
+        assert chunk not in level.tilemap.loaded
+      if x > right // 2:
+        assert not set(map(id, start)) & set(map(id, level.enemies))
+
+    # Back at the start, the same entities are there again
+    assert set(map(id, start)) <= set(map(id, level.enemies))
+  finally:
+    level.tilemap.close()
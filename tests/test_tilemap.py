@@ -0,0 +1,260 @@
+import random
+
+import pygame
+import pytest
+
+from scripts.mapfile import write_json
+from scripts.tilemap import Tilemap, CHUNK_SIZE, BAKED_BUDGET, PHYSICS_TILES
+
+MAPS = range(6)  # the shipped maps, data/maps/map<id>.json
+SIZE = 50
+CHUNKS = BAKED_BUDGET + 8  # chunks of the wide map, side by side
+
+class StubGame:
+  """
+  Stand-in for the Game object: the grass images the tilemap bakes, one colour per variant.
+  """
+  def __init__(self):
+    self.assets = {'grass': []}
+    for variant in range(9):
+      tile = pygame.Surface((SIZE, SIZE))
+      tile.fill((20 * variant, 200, 0))
+      self.assets['grass'].append(tile)
+
+def shipped_map(map_id):
+  tilemap = Tilemap(StubGame())
+  tilemap.load('data/maps/map' + str(map_id) + '.json')
+  return tilemap
+
+def edit(tilemap, seed, edits=200):
+  """
+  Place and remove random solid and decor tiles around the tiles of the map.
+  """
+  rng = random.Random(seed)
+  locs = sorted(tilemap.tilemap)
+  for i in range(edits):
+    loc = rng.choice(locs)
+    loc = (loc[0] + rng.randint(-2, 2), loc[1] + rng.randint(-2, 2))
+    if rng.random() < 0.5:
+      tilemap.remove_tile(loc)
+    else:
+      tilemap.set_tile(loc, {'type': rng.choice(['stone', 'decor']), 'variant': 0, 'pos': list(loc)})
+
+def solid_tiles(tilemap):
+  return {loc for loc, tile in tilemap.tilemap.items() if tile['type'] in PHYSICS_TILES}
+
+def cells_in(rect, size):
+  """
+  The (x, y) tile coordinates of the cells an area in pixel coordinates overlaps.
+  """
+  return {(x, y) for x in range(rect.left // size, (rect.right - 1) // size + 1)
+                 for y in range(rect.top // size, (rect.bottom - 1) // size + 1)}
+
+def assert_grid_matches_tiles(tilemap):
+  solid = solid_tiles(tilemap)
+  for x, y in tilemap.tilemap:
+    assert tilemap.is_solid(x, y) == ((x, y) in solid)
+  for chunk, cells in tilemap.solid.items():
+    for i, cell in enumerate(cells):
+      if cell:
+        assert (chunk[0] * CHUNK_SIZE + i % CHUNK_SIZE, chunk[1] * CHUNK_SIZE + i // CHUNK_SIZE) in solid
+
+@pytest.mark.parametrize('map_id', MAPS)
+def test_solid_grid_matches_the_tiles(map_id):
+  tilemap = shipped_map(map_id)
+  assert_grid_matches_tiles(tilemap)
+  edit(tilemap, map_id)
+  assert_grid_matches_tiles(tilemap)
+
+@pytest.mark.parametrize('map_id', MAPS)
+def test_physics_rects_in_finds_the_solid_tiles_overlapped(map_id):
+  tilemap = shipped_map(map_id)
+  solid = solid_tiles(tilemap)
+  xs = [loc[0] for loc in tilemap.tilemap]
+  ys = [loc[1] for loc in tilemap.tilemap]
+  rng = random.Random(map_id)
+  found = 0
+  for i in range(500):
+    w, h = rng.choice([(50, 50), (30, 45), (200, 200)])
+    box = pygame.Rect(rng.randint(min(xs), max(xs)) * tilemap.size + rng.randint(0, 49),
+                      rng.randint(min(ys), max(ys)) * tilemap.size + rng.randint(0, 49), w, h)
+    expected = cells_in(box, tilemap.size) & solid
+    rects = tilemap.physics_rects_in(box)
+    covered = set()
+    for rect in rects:
+      assert rect.colliderect(box)
+      covered |= cells_in(rect, tilemap.size)
+    assert covered & cells_in(box, tilemap.size) == expected
+    found += len(expected) > 0
+  assert found
+
+def merged_cells(tilemap):
+  """
+  The cells covered by the merged rects, each counted once per rect covering it.
+  """
+  cells = []
+  for chunk, rects in tilemap.merged.items():
+    for rect in rects:
+      assert rect.x % tilemap.size == 0 and rect.y % tilemap.size == 0
+      for x in range(rect.left // tilemap.size, rect.right // tilemap.size):
+        for y in range(rect.top // tilemap.size, rect.bottom // tilemap.size):
+          assert (x // CHUNK_SIZE, y // CHUNK_SIZE) == chunk
+          cells.append((x, y))
+  return cells
+
+@pytest.mark.parametrize('map_id', MAPS)
+def test_merged_rects_cover_exactly_the_solid_cells(map_id):
+  tilemap = shipped_map(map_id)
+  cells = merged_cells(tilemap)
+  assert len(cells) == len(set(cells))
+  assert set(cells) == solid_tiles(tilemap)
+
+  # Edits merge their chunk again
+  edit(tilemap, map_id)
+  cells = merged_cells(tilemap)
+  assert len(cells) == len(set(cells))
+  assert set(cells) == solid_tiles(tilemap)
+
+@pytest.mark.parametrize('map_id', MAPS)
+def test_offgrid_in_matches_a_full_scan(map_id):
+  tilemap = shipped_map(map_id)
+  xs = [int(tile['pos'][0]) for tile in tilemap.offgrid]
+  ys = [int(tile['pos'][1]) for tile in tilemap.offgrid]
+  rng = random.Random(map_id)
+  found = 0
+  for i in range(300):
+    w, h = rng.choice([(1280, 720), (200, 200), (1, 1)])
+    rect = pygame.Rect(rng.randint(min(xs) - w, max(xs)), rng.randint(min(ys) - h, max(ys)), w, h)
+    expected = [tile for tile in tilemap.offgrid if rect.colliderect(tilemap.offgrid_rect(tile))]
+    tiles = tilemap.offgrid_in(rect)
+    assert len(tiles) == len(expected)
+    assert {id(tile) for tile in tiles} == {id(tile) for tile in expected}
+    found += len(expected) > 0
+  assert found
+
+  point = tilemap.offgrid[0]['pos']
+  assert tilemap.offgrid[0] in tilemap.offgrid_at((int(point[0]) + 1, int(point[1]) + 1))
+
+def scan_extract(tilemap, id_pairs):
+  """
+  What extract gives by looking at every tile of the map, the way it did before the tiles were indexed.
+  """
+  matches = []
+  for tile in tilemap.offgrid:
+    if (tile['type'], tile['variant']) in id_pairs:
+      matches.append(tile.copy())
+  for tile in tilemap.tilemap.values():
+    if (tile['type'], tile['variant']) in id_pairs:
+      matches.append(tile.copy())
+      matches[-1]['pos'] = [tile['pos'][0] * tilemap.size, tile['pos'][1] * tilemap.size]
+  return matches
+
+@pytest.mark.parametrize('map_id', MAPS)
+def test_extract_matches_a_full_scan(map_id):
+  tilemap = shipped_map(map_id)
+  spawners = [('spawners', variant) for variant in range(9)] + [('boss', 0)]
+  kinds = spawners + [('decor', 0), ('large_decor', 2), ('grass', 1)]
+  # In map order, so entities spawn and the player spawner is picked as with a scan
+  assert tilemap.extract(kinds, keep=True) == scan_extract(tilemap, kinds)
+  assert tilemap.extract(list(reversed(kinds)), keep=True) == scan_extract(tilemap, kinds)
+
+  tiles = len(tilemap.tilemap) + len(tilemap.offgrid)
+  version = tilemap.version
+  expected = scan_extract(tilemap, spawners)
+  assert expected
+  assert tilemap.extract(spawners) == expected
+  assert len(tilemap.tilemap) + len(tilemap.offgrid) == tiles - len(expected)
+  assert tilemap.version > version
+  assert scan_extract(tilemap, spawners) == []
+  assert tilemap.extract(spawners) == []
+
+  # The index still matches the tiles left
+  assert tilemap.extract(kinds, keep=True) == scan_extract(tilemap, kinds)
+  for kind, locs in tilemap.kinds.items():
+    for loc, tile in locs.items():
+      assert tilemap.tilemap[loc] is tile and (tile['type'], tile['variant']) == kind
+  assert sum(len(locs) for locs in tilemap.kinds.values()) == len(tilemap.tilemap)
+
+  # Replacing tiles reorders the kinds index, not the tilemap
+  edit(tilemap, map_id)
+  edited = kinds + [('stone', 0)]
+  assert tilemap.extract(edited, keep=True) == scan_extract(tilemap, edited)
+
+def slab_raycast(tilemap, start, end):
+  """
+  The first solid tile a ray enters, found by intersecting the ray with every solid tile
+  within its bounds, rather than by walking the grid.
+  """
+  size = tilemap.size
+  x0, y0 = start[0] / size, start[1] / size
+  dx, dy = end[0] / size - x0, end[1] / size - y0
+  length = ((dx * dx + dy * dy) ** 0.5) * size
+  best = None
+  for x in range(int(min(x0, x0 + dx) // 1), int(max(x0, x0 + dx) // 1) + 1):
+    for y in range(int(min(y0, y0 + dy) // 1), int(max(y0, y0 + dy) // 1) + 1):
+      if not tilemap.is_solid(x, y):
+        continue
+      enter, leave = 0.0, 1.0
+      for origin, delta, low in [(x0, dx, x), (y0, dy, y)]:
+        if delta:
+          t1, t2 = sorted([(low - origin) / delta, (low + 1 - origin) / delta])
+          enter, leave = max(enter, t1), min(leave, t2)
+        elif not low <= origin < low + 1:
+          enter, leave = 1, 0
+      if enter <= leave and (best is None or enter < best[0]):
+        best = (enter, (x, y))
+  if best is None:
+    return None, length
+  return best[1], best[0] * length
+
+@pytest.mark.parametrize('map_id', MAPS)
+def test_raycast_agrees_with_slab_test(map_id):
+  tilemap = shipped_map(map_id)
+  xs = [loc[0] for loc in tilemap.tilemap]
+  ys = [loc[1] for loc in tilemap.tilemap]
+  rng = random.Random(map_id)
+  rays = []
+  for i in range(500):
+    start = (rng.uniform(min(xs), max(xs)) * tilemap.size, rng.uniform(min(ys), max(ys)) * tilemap.size)
+    end = (start[0] + rng.uniform(-600, 600), start[1] + rng.uniform(-600, 600))
+    rays.append((start, end))
+  # Straight along the axes, as enemies mostly look
+  rays += [(start, (end[0], start[1])) for start, end in rays[:100]]
+  rays += [(start, (start[0], end[1])) for start, end in rays[:100]]
+
+  hits = 0
+  for (start, end), (hit, distance) in zip(rays, tilemap.raycasts(rays)):
+    expected_hit, expected_distance = slab_raycast(tilemap, start, end)
+    assert hit == expected_hit
+    assert distance == pytest.approx(expected_distance, abs=1e-6)
+    assert tilemap.raycast(start, end) == (hit, distance)
+    hits += hit is not None
+  assert 0 < hits < len(rays)
+
+def wide_map(path):
+  """
+  Write a floor as wide as CHUNKS chunks, its variant changing every few tiles, and load it.
+  """
+  tiles = {}
+  for x in range(CHUNKS * CHUNK_SIZE):
+    tiles[(x, 10)] = {'type': 'grass', 'variant': x // 5 % 9, 'pos': [x, 10]}
+  write_json(str(path), SIZE, tiles, [])
+  tilemap = Tilemap(StubGame(), size=SIZE)
+  tilemap.load(str(path))
+  return tilemap
+
+def test_baked_chunks_stay_within_budget(tmp_path):
+  tilemap = wide_map(tmp_path / 'wide.json')
+  surf = pygame.Surface((1280, 720))
+  for x in range(0, CHUNKS * CHUNK_SIZE * SIZE, 400):
+    tilemap.render(surf, (x, 0))
+    assert len(tilemap.chunks) <= BAKED_BUDGET
+  assert (0, 0) not in tilemap.chunks
+
+  # A chunk dropped from the cache is baked again the same when it comes back in view
+  surf.fill('black')
+  tilemap.render(surf, (0, 0))
+  fresh = wide_map(tmp_path / 'fresh.json')
+  expected = pygame.Surface((1280, 720))
+  fresh.render(expected, (0, 0))
+  assert surf.get_buffer().raw == expected.get_buffer().raw
@@ -0,0 +1,154 @@
+import math
+import random
+
+import pygame
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from scripts.streaming import write_chunked
+from scripts.mapfile import read_json, write_json
+from scripts.tilemap import Tilemap, CHUNK_SIZE, PHYSICS_TILES
+from scripts.tilemap_np import ArrayTilemap
+
+MAPS = range(6)  # the shipped maps, data/maps/map<id>.json
+
+class Images(dict):
+  """
+  Stand-in for the images of any tile type: plain surfaces, one colour per type and variant.
+  """
+  def __missing__(self, tile_type):
+    self[tile_type] = []
+    for variant in range(100):
+      img = pygame.Surface((50, 50))
+      img.fill((len(tile_type) * 20 % 256, variant * 7 % 256, 90))
+      self[tile_type].append(img)
+    return self[tile_type]
+
+class StubGame:
+  def __init__(self):
+    self.assets = Images()
+
+def load(cls, path, **kwargs):
+  tilemap = cls(StubGame(), **kwargs)
+  tilemap.load(path)
+  return tilemap
+
+def bounds(tilemap):
+  xs = [loc[0] for loc in tilemap.tilemap]
+  ys = [loc[1] for loc in tilemap.tilemap]
+  return min(xs), min(ys), max(xs) + 1, max(ys) + 1
+
+def cells(tilemap, rect, keep):
+  """
+  The (x, y) tile coordinates of the tiles of a plain Tilemap in an area that pass a test, row by row.
+  """
+  found = []
+  for y in range(rect.top // tilemap.size, (rect.bottom - 1) // tilemap.size + 1):
+    for x in range(rect.left // tilemap.size, (rect.right - 1) // tilemap.size + 1):
+      tile = tilemap.tilemap.get((x, y))
+      if tile and keep(tile):
+        found.append((x, y))
+  return found
+
+def heights(tilemap, left, right):
+  """
+  The tile y of the highest solid tile of each column of a plain Tilemap, or nan.
+  """
+  tops = [math.nan] * (right - left)
+  for (x, y), tile in tilemap.tilemap.items():
+    if left <= x < right and tile['type'] in PHYSICS_TILES and not tops[x - left] <= y:
+      tops[x - left] = y
+  return tops
+
+def assert_queries_match(array_map, plain, seed):
+  left, top, right, bottom = bounds(plain)
+  size = plain.size
+  rng = random.Random(seed)
+  for i in range(50):
+    view = pygame.Rect(rng.randint(left - 10, right) * size + rng.randint(0, 49),
+                       rng.randint(top - 10, bottom) * size + rng.randint(0, 49), 1280, 720)
+    solid = cells(plain, view, lambda tile: tile['type'] in PHYSICS_TILES)
+    visible = cells(plain, view, lambda tile: True)
+    assert array_map.solid_cells_in(view).tolist() == [list(cell) for cell in solid]
+    assert array_map.visible_cells(view).tolist() == [list(cell) for cell in visible]
+  np.testing.assert_array_equal(array_map.column_heights(left - 5, right + 5), heights(plain, left - 5, right + 5))
+
+@pytest.mark.parametrize('sparse_ratio', [16, 0])
+@pytest.mark.parametrize('map_id', MAPS)
+def test_queries_match_the_plain_tilemap(map_id, sparse_ratio):
+  path = 'data/maps/map' + str(map_id) + '.json'
+  array_map = load(ArrayTilemap, path, sparse_ratio=sparse_ratio)
+  plain = load(Tilemap, path)
+  assert (array_map.types is None) == (sparse_ratio == 0)
+  assert_queries_match(array_map, plain, map_id)
+
+  # Edits, some of them past the bounds of the map, are followed by the arrays
+  rng = random.Random(map_id)
+  left, top, right, bottom = bounds(plain)
+  for i in range(200):
+    loc = (rng.randint(left - 20, right + 20), rng.randint(top - 20, bottom + 20))
+    if rng.random() < 0.3:
+      array_map.remove_tile(loc)
+      plain.remove_tile(loc)
+    else:
+      tile = {'type': rng.choice(['stone', 'decor', 'grass']), 'variant': rng.randint(0, 8), 'pos': list(loc)}
+      array_map.set_tile(loc, dict(tile))
+      plain.set_tile(loc, dict(tile))
+  assert_queries_match(array_map, plain, map_id + 100)
+
+@pytest.mark.parametrize('map_id', MAPS)
+def test_tilemap_contract_is_unchanged(map_id):
+  path = 'data/maps/map' + str(map_id) + '.json'
+  array_map = load(ArrayTilemap, path)
+  plain = load(Tilemap, path)
+  left, top, right, bottom = bounds(plain)
+  rng = random.Random(map_id)
+  for i in range(200):
+    pos = (rng.uniform(left, right) * plain.size, rng.uniform(top, bottom) * plain.size)
+    assert array_map.tiles_around(pos) == plain.tiles_around(pos)
+    assert array_map.solid_check(pos) == plain.solid_check(pos)
+    box = pygame.Rect(pos[0], pos[1], 50, 50)
+    assert array_map.physics_rects_in(box) == plain.physics_rects_in(box)
+
+  surf, expected = pygame.Surface((1280, 720)), pygame.Surface((1280, 720))
+  offset = (left * plain.size, top * plain.size)
+  array_map.render(surf, offset)
+  plain.render(expected, offset)
+  assert surf.get_buffer().raw == expected.get_buffer().raw
+
+def test_loading_another_map_replaces_the_arrays(tmp_path, monkeypatch):
+  # Map1 moved past the right edge of map4, so its tiles would grow the arrays of map4 if they were written into them
+  size, tilemap, offgrid = read_json('data/maps/map1.json')
+  moved = {(x + 60, y): {'type': tile['type'], 'variant': tile['variant'], 'pos': [x + 60, y]}
+           for (x, y), tile in tilemap.items()}
+  path = str(tmp_path / 'moved.json')
+  write_json(path, size, moved, [])
+
+  array_map = load(ArrayTilemap, 'data/maps/map4.json')
+  allocated = []
+  allocate = array_map.allocate
+  monkeypatch.setattr(array_map, 'allocate', lambda *bounds: (allocated.append(bounds), allocate(*bounds)))
+  array_map.load(path)
+  assert allocated == [bounds(array_map)]
+
+  fresh = load(ArrayTilemap, path)
+  assert array_map.origin == fresh.origin
+  np.testing.assert_array_equal(array_map.types != 0, fresh.types != 0)
+  np.testing.assert_array_equal(array_map.variants, fresh.variants)
+  assert_queries_match(array_map, load(Tilemap, path), 1)
+
+def test_streamed_map_fills_the_arrays_as_chunks_load(tmp_path):
+  write_chunked(str(tmp_path), *read_json('data/maps/map3.json'), CHUNK_SIZE)
+  array_map = load(ArrayTilemap, str(tmp_path))
+  plain = load(Tilemap, str(tmp_path))
+  try:
+    view = pygame.Rect(0, -400, 1280, 720)
+    array_map.stream_around(view, wait=True)
+    plain.stream_around(view, wait=True)
+    assert array_map.types is not None
+    assert array_map.solid_cells_in(view).tolist() == [list(cell) for cell in cells(plain, view, lambda tile: tile['type'] in PHYSICS_TILES)]
+    assert array_map.visible_cells(view).tolist() == [list(cell) for cell in cells(plain, view, lambda tile: True)]
+  finally:
+    array_map.close()
+    plain.close()
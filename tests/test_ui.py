@@ -0,0 +1,71 @@
+import pygame
+import pytest
+
+from scripts.UI import Menu, UI
+
+@pytest.fixture
+def surf():
+  # The window and the surface of the menus are the same size, so window and menu positions match
+  pygame.init()
+  pygame.display.set_mode((1280, 720))
+  return pygame.Surface((1280, 720))
+
+def center(button):
+  x, y, w, h = button.button_rect
+  return (x + w // 2, y + h // 2)
+
+def down(pos, button=1):
+  return pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=button, pos=pos)
+
+def up(pos, button=1):
+  return pygame.event.Event(pygame.MOUSEBUTTONUP, button=button, pos=pos)
+
+def test_click_is_press_and_release_on_the_same_button(surf):
+  menu = Menu(surf, (320, 200), (640, 400), ['PLAY', 'QUIT'])
+  play, quit = center(menu.buttons[0]), center(menu.buttons[1])
+  assert menu.click([]) is None
+  assert menu.click([down(play), up(play)]) == 'PLAY'
+  assert menu.click([down(quit), up(quit)]) == 'QUIT'
+
+  # Released on another button, or outside of any
+  assert menu.click([down(play), up(quit)]) is None
+  assert menu.click([down(play), up((0, 0))]) is None
+  # Other mouse buttons do not click
+  assert menu.click([down(play, 3), up(play, 3)]) is None
+
+def test_holding_the_mouse_button_clicks_once(surf):
+  menu = Menu(surf, (320, 200), (640, 400), ['PLAY', 'QUIT'])
+  play = center(menu.buttons[0])
+  assert menu.click([down(play)]) is None
+  for frame in range(10):
+    assert menu.click([]) is None
+  assert menu.click([up(play)]) == 'PLAY'
+  assert menu.click([]) is None
+  assert menu.click([up(play)]) is None
+
+def test_press_on_a_menu_does_not_click_the_next_one(surf):
+  ui = UI(surf)
+  ui.overlay('pause', 'PAUSE', (640, 400), ['RESUME', 'QUIT'])
+  resume = center(ui.menus['pause'].buttons[0])
+
+  # The press opens another menu with a button under the mouse, the release must not click it
+  ui.handle(down(resume))
+  assert ui.overlay('pause', 'PAUSE', (640, 400), ['RESUME', 'QUIT']) is None
+  ui.handle(up(resume))
+  assert ui.overlay('complete', 'LEVEL COMPLETE', (640, 400), ['NEXT', 'QUIT']) is None
+  assert center(ui.menus['complete'].buttons[0]) == resume
+
+  ui.handle(down(resume))
+  ui.handle(up(resume))
+  assert ui.overlay('complete', 'LEVEL COMPLETE', (640, 400), ['NEXT', 'QUIT']) == 'NEXT'
+
+def test_events_are_dropped_when_the_game_runs_again(surf):
+  ui = UI(surf)
+  ui.overlay('pause', 'PAUSE', (640, 400), ['RESUME', 'QUIT'])
+  resume = center(ui.menus['pause'].buttons[0])
+  ui.handle(down(resume))
+  ui.handle(up(resume))
+  ui.handle(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_ESCAPE))
+  assert len(ui.events) == 2
+  ui.thaw()
+  assert ui.overlay('pause', 'PAUSE', (640, 400), ['RESUME', 'QUIT']) is None